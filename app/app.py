@@ -1,8 +1,27 @@
 import os
 import configparser
+import queue
 import sqlite3
-from datetime import datetime, timedelta
-import googleapiclient.discovery
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Iterator
+import googleapiclient.errors
+from app.archive import Archive
+from app.batch import BatchSummary, DeadlineReached
+from app.client import PooledClient
+from app.etag import EtagCache
+from app.lease import LeaseTable
+from app.manifest import ImportManifest
+from app.model import FastJsonModel
+from app.quota import KeyPool, QuotaExhausted, QuotaLedger
+from app.scheduler import Scheduler
+from app.seed import SeedLoader
+from app.storage import StorageProfile
+from app.watcher import SeedWatcher
+from app.writer import Writer
 
 
 class App:
@@ -13,15 +32,81 @@ class App:
 
     Attributes:
         scopes (list[str]): The scopes required for accessing the YouTube API.
+        comment_fields (str): The partial response of a comment in yt_comment.
+        fields (dict[str, str]): The partial response of every endpoint, limited to
+            the values stored in the columns of the DDL file.
         __config (configparser.ConfigParser): The configuration object for the application.
-        __number_of_api_requests_left (int): The number of remaining API requests.
-        __youtube (googleapiclient.discovery.Resource): The YouTube API client.
+        __key_pool (KeyPool): The API keys and their budgets shared by all workers.
+        __number_of_workers (int): The number of videos fetched at the same time.
+        __write_queue_size (int): The number of fetched pages waiting to be written
+            before the workers block.
+        __executor (ThreadPoolExecutor): The worker threads fetching comments,
+            kept for all rounds with their API clients and database cursors.
+        __expand_replies (bool): True to fetch all replies of large comment threads.
+        __client (str): The kind of YouTube API client, either discovery or pooled.
+        __api_url (str): The root URL of the YouTube API, e.g. of a local mock
+            server, or an empty string for the default.
+        __youtube (dict[str, googleapiclient.discovery.Resource | PooledClient]): The
+            YouTube API client by API key.
+        __model (FastJsonModel): The JSON decoder of all YouTube API clients.
+        __local (threading.local): The YouTube API clients and database cursors of
+            the worker threads.
+        __db_path (str): The path of the SQLite database.
+        __storage (StorageProfile): The SQLite settings and the group commit budget.
+        __last_commit (float): The time.monotonic() of the last commit.
+        __changes_at_commit (int): The total changes of the connection at the last
+            commit.
         __connection (sqlite3.Connection): The connection to the SQLite database.
         __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        __writer (Writer): The batched write path into the database.
+        __ledger (QuotaLedger): The spent quota units persisted in the database.
+        __etags (EtagCache): The ETags of the fetched pages.
+        __manifest (ImportManifest): The imported state of the csv files.
+        __seeds (SeedLoader): The bulk import of the channel and video csv files.
+        __watcher (SeedWatcher): The watch of the import directories.
+        __archive (Archive): The archive of the raw API responses.
+        __full_responses (bool): True to request full responses without fields
+            masks while archiving.
+        __scheduler (Scheduler): The refresh schedule of the videos.
+        __leases (LeaseTable): The leases of the channels, videos and reply
+            expansions this process works on.
+        __lease_batch_size (int): The number of items of a kind claimed at once,
+            so the other processes get their share.
+        __batch (BatchSummary): The budgets and the time, rows and requests by
+            phase of a batch run.
     """
 
     scopes = ["https://www.googleapis.com/auth/youtube.readonly"]
 
+    # yt_comment
+    comment_fields = (
+        "id,kind,snippet(authorChannelId,authorDisplayName,parentId,publishedAt,"
+        "updatedAt,textOriginal,likeCount,videoId)"
+    )
+    fields = {
+        "commentThreads": (
+            f"etag,nextPageToken,items(kind,snippet(videoId,totalReplyCount,"
+            f"topLevelComment({comment_fields})),replies(comments({comment_fields})))"
+        ),
+        "comments": f"etag,nextPageToken,items({comment_fields})",
+        # yt_video
+        "playlistItems": (
+            "etag,nextPageToken,"
+            "items(snippet(title,description,publishedAt,channelId),"
+            "contentDetails(videoId,videoPublishedAt))"
+        ),
+        "videos": (
+            "etag,items(id,snippet(title,description),"
+            "statistics(viewCount,likeCount,commentCount))"
+        ),
+        # yt_channel
+        "channels": (
+            "etag,items(id,snippet(title,description),"
+            "contentDetails/relatedPlaylists/uploads,"
+            "statistics(subscriberCount,videoCount,viewCount))"
+        ),
+    }
+
     def __init__(self, config: configparser.ConfigParser) -> None:
         """Initialize the App object.
 
@@ -31,30 +116,285 @@ class App:
         self.__config = config
 
         try:
-            self.__number_of_api_requests_left = int(
-                self.__config["YOUTUBE"]["NUMBER_OF_TOKENS"]
-            )
+            number_of_api_requests = int(self.__config["YOUTUBE"]["NUMBER_OF_TOKENS"])
         except Exception:
             print("NUMBER_OF_TOKENS type problem! NUMBER_OF_TOKENS is set to 10_000")
-            self.__number_of_api_requests_left = 10_000
-
-        api_key = self.__config["YOUTUBE"]["API_SECRET"]
-        api_service_name = "youtube"
-        api_version = "v3"
-
-        self.__youtube = googleapiclient.discovery.build(
-            api_service_name, api_version, developerKey=api_key
+            number_of_api_requests = 10_000
+        api_keys = []
+        for api_key in self.__config["YOUTUBE"]["API_SECRET"].split(","):
+            if api_key.strip() != "":
+                api_keys.append(api_key.strip())
+        # processes sharing the API keys split their quota evenly
+        key_shares = self.get_config_number("YOUTUBE", "KEY_SHARES", 1)
+        if number_of_api_requests > 0:
+            number_of_api_requests = max(number_of_api_requests // key_shares, 1)
+        self.__key_pool = KeyPool(api_keys, number_of_api_requests)
+
+        self.__number_of_workers = self.get_config_number("APP", "NUMBER_OF_WORKERS", 1)
+        self.__write_queue_size = self.get_config_number(
+            "APP", "WRITE_QUEUE_SIZE", 2 * self.__number_of_workers
         )
+        self.__executor = ThreadPoolExecutor(max_workers=self.__number_of_workers)
+        self.__expand_replies = self.__config.getboolean(
+            "VIDEO", "EXPAND_REPLIES", fallback=True
+        )
+
+        self.__client = self.__config.get("YOUTUBE", "CLIENT", fallback="discovery")
+        self.__api_url = self.__config.get("YOUTUBE", "API_URL", fallback="")
+        self.__youtube = {}
+        self.__model = FastJsonModel()
+        self.__local = threading.local()
 
-        db_path = (
+        self.__db_path = (
             self.__config["APP"]["DATABASE_PATH"]
             + self.__config["APP"]["DATABASE_FILE"]
         )
+        self.__storage = StorageProfile(self.__config)
         try:
-            self.__connection = sqlite3.connect(db_path)
+            self.__connection = self.__storage.connect(self.__db_path)
             self.__cursor = self.__connection.cursor()
         except sqlite3.OperationalError:
             print("Connection to database: failed")
+        self.__last_commit = time.monotonic()
+        self.__changes_at_commit = 0
+        self.__scheduler = Scheduler(
+            self.__cursor,
+            self.get_config_number("VIDEO", "TARGET_NEW_COMMENTS_PER_FETCH", 100),
+            self.get_config_number("VIDEO", "MIN_REFRESH_INTERVAL", 5 * 60),
+        )
+        self.create_tables()
+        self.__writer = Writer(self.__cursor)
+        self.__ledger = QuotaLedger(self.__cursor)
+        self.__etags = EtagCache(
+            self.__cursor,
+            self.__config.getint("APP", "ETAG_CACHE_SIZE", fallback=100_000),
+        )
+        self.__manifest = ImportManifest(self.__cursor)
+        self.__seeds = SeedLoader(self.__cursor)
+        self.__watcher = SeedWatcher(
+            [
+                self.__config["DATA"]["IMPORT_CHANNELS_PATH"],
+                self.__config["DATA"]["IMPORT_VIDEOS_PATH"],
+            ],
+            self.__config.getfloat("DATA", "WATCH_INTERVAL", fallback=2.0),
+        )
+        self.__archive = Archive(
+            self.__config.get(
+                "ARCHIVE",
+                "PATH",
+                fallback=self.__config["APP"]["DATABASE_PATH"] + "archive/",
+            ),
+            self.get_config_number("ARCHIVE", "SEGMENT_SIZE", 100 * 1024 * 1024),
+            self.__config.getboolean("ARCHIVE", "ENABLED", fallback=False),
+        )
+        self.__full_responses = self.__archive.is_enabled() and (
+            self.__config.getboolean("ARCHIVE", "FULL_RESPONSES", fallback=True)
+        )
+        spent = self.__ledger.get_spent(
+            self.__key_pool.get_quota_day(), self.__key_pool.get_api_keys()
+        )
+        for api_key, units in spent.items():
+            spent[api_key] = units // key_shares
+        self.__key_pool.spend(spent)
+        self.__leases = LeaseTable(
+            self.__cursor,
+            self.__config.get("APP", "WORKER_ID", fallback=""),
+            self.get_config_number("APP", "LEASE_DURATION", 300),
+        )
+        self.__lease_batch_size = self.get_config_number(
+            "APP", "LEASE_BATCH_SIZE", 10 * self.__number_of_workers
+        )
+        self.__batch = BatchSummary(self.__connection, self.__key_pool)
+
+    def create_tables(self) -> None:
+        """Create missing tables of the DDL file in the database.
+
+        All statements of the DDL file are idempotent, so tables added in a newer
+            version are created in existing databases as well. Columns added in a
+            newer version are added to existing tables before.
+        """
+        self.add_missing_column("yt_video", "last_time_swept", "TEXT DEFAULT ''")
+        if self.add_missing_column("yt_video", "published_ts", "INTEGER"):
+            self.add_missing_column("yt_video", "next_fetch_ts", "INTEGER DEFAULT 0")
+            self.backfill_video_timestamps()
+        self.add_missing_column("yt_video", "comment_velocity", "REAL DEFAULT 0")
+        if self.add_missing_column("yt_channel", "next_fetch_ts", "INTEGER DEFAULT 0"):
+            self.backfill_channel_timestamps()
+        self.add_missing_column("yt_channel", "uploads_playlist_id", "TEXT DEFAULT ''")
+        for column in ("subscriberCount", "videoCount", "viewCount"):
+            self.add_missing_column("yt_channel", column, "INTEGER")
+        for column in ("viewCount", "likeCount", "commentCount", "fetched_commentCount"):
+            self.add_missing_column("yt_video", column, "INTEGER")
+        self.add_missing_column("yt_comment", "expanded_replyCount", "INTEGER")
+
+        ddl = open(self.__config["SETUP"]["DATABASE_DDL"], "r", encoding="utf-8")
+        self.__cursor.executescript(ddl.read())
+        ddl.close()
+
+    def backfill_video_timestamps(self) -> None:
+        """Fill published_ts and next_fetch_ts of videos from an older database.
+
+        The text timestamps are converted once, afterwards both columns are kept up
+            to date on every write.
+        """
+        print(f"{datetime.now()} migrate yt_video timestamps")
+        query = """UPDATE yt_video
+                    SET published_ts = CAST(strftime('%s', publishedAt) AS INTEGER)
+                """
+        self.__cursor.execute(query)
+
+        fetched_ts = "CAST(strftime('%s', last_time_fetched, 'utc') AS INTEGER)"
+        query = f"""UPDATE yt_video
+                    SET next_fetch_ts = CASE
+                        WHEN last_time_fetched = "" THEN 0
+                        ELSE {fetched_ts} + {self.__scheduler.get_refresh_interval_sql(fetched_ts)}
+                    END
+                """
+        self.__cursor.execute(query)
+        self.__connection.commit()
+
+    def backfill_channel_timestamps(self) -> None:
+        """Fill next_fetch_ts of channels from an older database."""
+        print(f"{datetime.now()} migrate yt_channel timestamps")
+        query = """UPDATE yt_channel
+                    SET next_fetch_ts = CASE
+                        WHEN last_time_fetched = "" THEN 0
+                        ELSE CAST(strftime('%s', last_time_fetched, 'utc') AS INTEGER) + ?
+                    END
+                """
+        self.__cursor.execute(query, (self.get_time_since_last_video_fetch(),))
+        self.__connection.commit()
+
+    def get_time_since_last_video_fetch(self) -> int:
+        """Returns the time in seconds between two fetches of a channel.
+
+        Returns:
+            int: The time in seconds.
+        """
+        return self.get_config_number("CHANNEL", "TIME_SINCE_LAST_VIDEO_FETCH", 900)
+
+    def add_missing_column(self, table: str, column: str, definition: str) -> bool:
+        """Add a column to an existing table of an older database.
+
+        Args:
+            table (str): The name of the table.
+            column (str): The name of the column.
+            definition (str): The type and constraints of the column.
+
+        Returns:
+            bool: True if the column was added, False otherwise.
+        """
+        result = self.__cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in result.fetchall()]
+        if len(columns) > 0 and column not in columns:
+            self.__cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+            )
+            return True
+        return False
+
+    def get_config_number(self, section: str, key: str, default: int) -> int:
+        """Returns a positive number from the configuration.
+
+        Args:
+            section (str): The section of the configuration.
+            key (str): The key of the value.
+            default (int): The value used if the key is missing or not a positive number.
+
+        Returns:
+            int: The number from the configuration or the default.
+        """
+        value = self.__config.get(section, key, fallback="")
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+        return default
+
+    def build_youtube_client(
+        self, api_key: str
+    ) -> "googleapiclient.discovery.Resource | PooledClient":
+        """Build a YouTube API client.
+
+        The underlying HTTP connection is not thread-safe, so every worker thread
+            needs its own client. With CLIENT=pooled, a thin client with a
+            keep-alive session is built instead of loading googleapiclient.discovery
+            and its discovery document. With API_URL, the requests are sent to
+            another server, e.g. the local mock server of mockserver.py.
+
+        Args:
+            api_key (str): The API key of the client.
+
+        Returns:
+            googleapiclient.discovery.Resource | PooledClient: The YouTube API client.
+        """
+        if self.__client == "pooled":
+            if self.__api_url != "":
+                return PooledClient(
+                    api_key, self.__model, self.__api_url.rstrip("/") + "/youtube/v3/"
+                )
+            return PooledClient(api_key, self.__model)
+
+        # imported on demand, it takes most of the start time
+        import googleapiclient.discovery
+
+        api_service_name = "youtube"
+        api_version = "v3"
+
+        client_options = None
+        if self.__api_url != "":
+            client_options = {"api_endpoint": self.__api_url.rstrip("/") + "/"}
+        return googleapiclient.discovery.build(
+            api_service_name,
+            api_version,
+            developerKey=api_key,
+            model=self.__model,
+            client_options=client_options,
+        )
+
+    def get_youtube_client(
+        self, api_key: str
+    ) -> "googleapiclient.discovery.Resource | PooledClient":
+        """Returns the YouTube API client of the current thread for an API key.
+
+        Args:
+            api_key (str): The API key of the client.
+
+        Returns:
+            googleapiclient.discovery.Resource | PooledClient: The YouTube API client.
+        """
+        if threading.current_thread() is threading.main_thread():
+            clients = self.__youtube
+        else:
+            if not hasattr(self.__local, "youtube"):
+                self.__local.youtube = {}
+            clients = self.__local.youtube
+        if api_key not in clients:
+            clients[api_key] = self.build_youtube_client(api_key)
+        return clients[api_key]
+
+    def is_quota_exceeded(self, error: googleapiclient.errors.HttpError) -> bool:
+        """Check if an API key was rejected because its quota is exceeded.
+
+        Args:
+            error (googleapiclient.errors.HttpError): The error of the request.
+
+        Returns:
+            bool: True if the quota of the key is exceeded, False otherwise.
+        """
+        return error.resp.status == 403 and b"quotaExceeded" in error.content
+
+    def get_database_cursor(self) -> sqlite3.Cursor:
+        """Returns a database cursor of the current thread.
+
+        Worker threads get their own connection, which they only use for reading.
+
+        Returns:
+            sqlite3.Cursor: The cursor for executing SQL queries.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.__cursor
+        if not hasattr(self.__local, "cursor"):
+            self.__local.cursor = self.__storage.connect(self.__db_path).cursor()
+        return self.__local.cursor
 
     def get_all_channel_files(self) -> list[str]:
         """Returns a list of channel files in the specified directory.
@@ -73,6 +413,8 @@ class App:
         """Load channels from files and process them.
 
         This method reads channel files from the specified path and processes each file.
+        Unchanged files are skipped and grown files are only read from their
+            last imported line.
         After processing each file, the changes are committed to the database.
 
         Returns:
@@ -80,38 +422,69 @@ class App:
         """
         files = self.get_all_channel_files()
         for file_name in files:
-            file = open(
-                self.__config["DATA"]["IMPORT_CHANNELS_PATH"] + file_name,
-                "r",
-                encoding="utf-8",
+            self.load_seed_file(
+                "channel", self.__config["DATA"]["IMPORT_CHANNELS_PATH"] + file_name
             )
-            self.process_channel_files(file)
-            self.__connection.commit()
-            file.close()
 
-    def process_channel_files(self, file: object) -> None:
-        """Process the channel files.
-
-        This method reads the contents of a file, skips the header line,
-            and processes each line of data.
-        If the channel is new, it inserts the channel data.
+    def load_seed_file(self, kind: str, path: str) -> int:
+        """Load the new lines of a channel or video file and commit them.
 
         Args:
-            file (object): The file object to be processed.
+            kind (str): Either channel or video.
+            path (str): The path of the file.
 
         Returns:
-            None
+            int: The number of inserted or changed channels or videos.
         """
-        file.readline()  # header
-        for line in file.readlines():
-            line = line.replace("\n", "")
-            data = line.split(",")
+        try:
+            lines = self.__manifest.read(path)
+        except FileNotFoundError:
+            return 0
+        if lines is None:
+            return 0
+        if kind == "channel":
+            number_of_seeds = self.process_channel_files(lines, path)
+        else:
+            number_of_seeds = self.process_video_files(lines, path)
+        self.__connection.commit()
+        return number_of_seeds
 
-            if data[0] == "":
-                continue
+    def load_changed_seeds(self) -> int:
+        """Load the channel and video files changed since the last call.
 
-            if self.is_channel_new(data[0]):
-                self.insert_channel(data)
+        New channels and videos are due at once, so they are picked up by the
+            next round of the main loop.
+
+        Returns:
+            int: The number of inserted or changed channels and videos.
+        """
+        channels_path = os.path.abspath(self.__config["DATA"]["IMPORT_CHANNELS_PATH"])
+        number_of_seeds = 0
+        for path in self.__watcher.pop_changed():
+            if os.path.dirname(os.path.abspath(path)) == channels_path:
+                number_of_seeds += self.load_seed_file("channel", path)
+            else:
+                number_of_seeds += self.load_seed_file("video", path)
+        if number_of_seeds > 0:
+            print(f"{datetime.now()} {number_of_seeds} channels and videos loaded")
+        return number_of_seeds
+
+    def process_channel_files(self, lines: list[str], file_name: str = "") -> int:
+        """Process the lines of a channel file.
+
+        All channels of the lines are inserted or updated in a single batch.
+
+        Args:
+            lines (list[str]): The lines of the file without the header.
+            file_name (str): The name of the file for the console.
+
+        Returns:
+            int: The number of inserted or changed channels.
+        """
+        counts = self.__seeds.load("channel", lines)
+        if counts["rejected"] > 0:
+            print(f"{datetime.now()} {counts['rejected']} lines rejected in {file_name}")
+        return counts["merged"]
 
     def get_all_video_files(self) -> list[str]:
         """Returns a list of video files in the specified directory.
@@ -131,747 +504,1398 @@ class App:
 
         This method retrieves all video files from the specified directory,
         processes each file, and commits the changes to the database.
+        Unchanged files are skipped and grown files are only read from their
+            last imported line.
 
         Returns:
             None
         """
         files: list = self.get_all_video_files()
         for file_name in files:
-            file = open(
-                self.__config["DATA"]["IMPORT_VIDEOS_PATH"] + file_name,
-                "r",
-                encoding="utf-8",
+            self.load_seed_file(
+                "video", self.__config["DATA"]["IMPORT_VIDEOS_PATH"] + file_name
             )
-            self.process_video_files(file)
-            self.__connection.commit()
-            file.close()
 
-    def process_video_files(self, file: object) -> None:
-        """Process video files and insert data into the database.
+    def process_video_files(self, lines: list[str], file_name: str = "") -> int:
+        """Insert the new videos of the lines of a video file in a single batch.
+
+        Known videos are kept unchanged.
 
         Args:
-            file (object): The file object containing video data.
+            lines (list[str]): The lines of the file without the header.
+            file_name (str): The name of the file for the console.
 
         Returns:
-            None
+            int: The number of inserted videos.
         """
-        file.readline()  # Skip header
-        for line in file.readlines():
-            line = line.replace("\n", "")
-            data = line.split(",")
+        counts = self.__seeds.load("video", lines)
+        if counts["rejected"] > 0:
+            print(f"{datetime.now()} {counts['rejected']} lines rejected in {file_name}")
+        return counts["merged"]
 
-            if data[0] == "":
-                continue
+    def import_seeds(self, kind: str, paths: list[str]) -> dict[str, int]:
+        """Import large channel or video csv files in bulk and close the database.
 
-            if self.is_video_new(data[0]):
-                query = """INSERT INTO yt_video
-                            (
-                                id,
-                                title,
-                                publishedAt,
-                                last_time_fetched,
-                                description,
-                                channel_id
-                            )
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """
-                self.__cursor.execute(query, data)
+        The files are streamed, so they do not need to fit into memory. They are
+            neither checked against nor recorded in the import manifest.
+
+        Args:
+            kind (str): Either channel or video.
+            paths (list[str]): The paths of the csv files.
+
+        Returns:
+            dict[str, int]: The number of read, rejected and merged rows of all
+                files.
+        """
+        total = {"read": 0, "rejected": 0, "merged": 0}
+        for path in paths:
+            file = open(path, "r", encoding="utf-8", newline="")
+            file.readline()  # header
+            counts = self.__seeds.load(kind, file)
+            file.close()
+            self.__connection.commit()
+            print(
+                f"{datetime.now()} {path}: {counts['read']} rows read, "
+                f"{counts['rejected']} rejected, {counts['merged']} merged"
+            )
+            for key, value in counts.items():
+                total[key] += value
+        self.__close_database()
+        return total
 
     def __close_database(self) -> None:
         """Close the cursor and the connection of the database.
 
-        This method commits any pending changes to the database, closes the cursor,
-        and then closes the connection to the database.
+        This method stops the worker threads, commits any pending changes to the
+        database, closes the cursor, and then closes the connection to the database.
 
         Returns:
             None
         """
-        self.__connection.commit()
+        self.__watcher.stop()
+        self.__executor.shutdown()
+        self.__leases.release_all()
+        self.commit(force=True)
+        self.__archive.close()
         self.__cursor.close()
         self.__connection.close()
 
+    def commit(self, force: bool = False) -> None:
+        """Save the spent quota units and the ETags and commit the database.
+
+        Commits are grouped: unless forced, the database is only committed after
+            COMMIT_INTERVAL seconds or COMMIT_ROWS changed rows of the STORAGE
+            section. Pages and their checkpoints are always committed together.
+            The leases of the process are renewed with a commit in time.
+
+        Args:
+            force (bool): True to commit regardless of the group commit budget.
+        """
+        changed_rows = self.__connection.total_changes - self.__changes_at_commit
+        if (
+            not force
+            and not self.__leases.is_renewal_due()
+            and not self.__storage.is_commit_due(self.__last_commit, changed_rows)
+        ):
+            return
+        if self.__leases.is_renewal_due():
+            self.__leases.renew()
+        self.__ledger.save(self.__key_pool.pop_spent())
+        self.__etags.save()
+        self.__connection.commit()
+        self.__last_commit = time.monotonic()
+        self.__changes_at_commit = self.__connection.total_changes
+
     def get_channels(self) -> list[str]:
-        """Retrieve a list of channel IDs based on the last time videos were fetched.
+        """Retrieve a list of channel IDs whose next fetch is due.
+
+        Channels with a checkpoint are always included. Channels leased by
+            another process are left out.
 
         Returns:
             list[str]: A list of channel IDs.
         """
-        if self.__config["CHANNEL"]["TIME_SINCE_LAST_VIDEO_FETCH"].isdigit():
-            time_since_last_video_fetch = int(
-                self.__config["CHANNEL"]["TIME_SINCE_LAST_VIDEO_FETCH"]
-            )
-        else:
-            time_since_last_video_fetch = 900
-
         query = """SELECT channel_id
-                    FROM yt_channel 
-                    WHERE 
-                        strftime('%s', ?) - strftime('%s', last_time_fetched) > ?
-                    OR 
-                        last_time_fetched = ""
+                    FROM yt_channel
+                    WHERE next_fetch_ts <= ?
+                        AND NOT EXISTS (
+                            SELECT 1
+                            FROM yt_lease
+                            WHERE kind = 'channel'
+                                AND yt_lease.id = yt_channel.channel_id
+                                AND lease_until >= ?
+                        )
                 """
-        result = self.__cursor.execute(
-            query, (datetime.now(), time_since_last_video_fetch)
-        )
+        now = int(datetime.now().timestamp())
+        result = self.__cursor.execute(query, (now, now))
         channels = []
         for channel in result.fetchall():
             channels.append(channel[0])
-        return channels
+        for channel_id in self.get_checkpoints("channel"):
+            if channel_id not in channels:
+                channels.append(channel_id)
+        return self.claim("channel", channels)
 
-    def is_channel_new(self, channel_id: str) -> bool:
-        """Check if a channel is new.
+    def claim(self, kind: str, ids: list[str]) -> list[str]:
+        """Claim the leases of channels, videos or reply expansions.
+
+        Without a WORKER_ID, all items are returned. Otherwise, at most
+            LEASE_BATCH_SIZE items not leased by another process are claimed, so
+            the other processes get their share. The claim is committed at once,
+            so the other processes see it.
 
         Args:
-            channel_id (str): The ID of the channel to check.
+            kind (str): Either channel, video or replies.
+            ids (list[str]): The IDs of the items.
 
         Returns:
-            bool: True if the channel is new, False otherwise.
+            list[str]: The IDs of the claimed items, in the given order.
         """
-        query = """SELECT channel_id 
-                    FROM yt_channel 
-                    WHERE channel_id = ?
-                """
+        if not self.__leases.is_enabled():
+            return ids
+        leased = self.__leases.get_leased(kind)
+        ids = [id for id in ids if id not in leased]
+        self.commit(force=True)
+        claimed = []
+        # items claimed by another process in the meantime are replaced by the next ones
+        while len(ids) > 0 and len(claimed) < self.__lease_batch_size:
+            batch = ids[: self.__lease_batch_size - len(claimed)]
+            ids = ids[len(batch):]
+            claimed += self.__leases.claim(kind, batch)
+            self.commit(force=True)
+        return claimed
+
+    def is_channel_due(self) -> bool:
+        """Check if the next fetch of a channel is due.
 
-        result = self.__cursor.execute(query, (channel_id,))
-        res = result.fetchone()
-        if res is None or len(res) == 0:
-            return True
-        if len(res) == 0:
-            return True
-        return False
-
-    def insert_channel(self, channel: dict | list) -> None:
-        """Inserts a channel into the database.
-
-        Args:
-            channel (dict | list): The channel information to be inserted.
-                If a dictionary is provided, it should contain the following keys:
-                    - channel_id: The ID of the channel.
-                    - person: The person associated with the channel.
-                    - channelTitle: The title of the channel.
-                    - last_time_fetched: The last time the channel was fetched.
-                    - about: Information about the channel.
-                If a list is provided, it should contain the values in the same order
-                    as mentioned above.
+        Returns:
+            bool: True if at least one channel is due, False otherwise.
         """
-        query = """INSERT INTO yt_channel
-                    (
-                        channel_id,
-                        person,
-                        channelTitle,
-                        last_time_fetched,
-                        about
-                    )
-                    VALUES (?, ?, ?, ?, ?);
+        query = """SELECT 1
+                    FROM yt_channel
+                    WHERE next_fetch_ts <= ?
+                    LIMIT 1
                 """
-        self.__cursor.execute(query, channel)
+        result = self.__cursor.execute(query, (int(datetime.now().timestamp()),))
+        return result.fetchone() is not None
 
-    def update_channel(self, channel_id: str) -> None:
-        """Update the last time fetched for a YouTube channel.
+    def get_fetched_channels(self, channel_ids: list[str]) -> set[str]:
+        """Returns the channels that were fetched completely before.
 
         Args:
-            channel_id (str): The ID of the YouTube channel.
+            channel_ids (list[str]): The IDs of the channels.
+
+        Returns:
+            set[str]: The IDs of the channels with a last time fetched.
         """
-        query = """UPDATE yt_channel 
-                    SET last_time_fetched = ?
+        query = """SELECT last_time_fetched
+                    FROM yt_channel
                     WHERE channel_id = ?
                 """
-        self.__cursor.execute(query, (channel_id, datetime.now()))
+        channels = set()
+        for channel_id in channel_ids:
+            result = self.__cursor.execute(query, (channel_id,)).fetchone()
+            if result is not None and result[0]:
+                channels.add(channel_id)
+        return channels
 
-    def get_videos(self) -> set[str]:
-        """Retrieve videos based on specified criteria.
+    def get_videos(self) -> list[str]:
+        """Retrieve videos whose next fetch is due, in the order of the schedule.
+
+        Videos with a checkpoint come first, then the due videos from the
+            scheduler, the longest overdue first. No more videos are planned than
+            the quota units left allow at least one request for. Videos leased by
+            another process are left out.
 
         Returns:
-            set[str]: A set of video IDs that meet the criteria.
+            list[str]: A list of video IDs that meet the criteria.
         """
-        # oldest newest diff(last_fetch)
-        deltas = [
-            [timedelta(days=3), timedelta(minutes=15), 30 * 60],
-            [timedelta(days=7), timedelta(days=3), 1 * 24 * 60 * 60],
-            [timedelta(days=30), timedelta(days=7), 7 * 24 * 60 * 60],
-            [timedelta(days=10 * 365), timedelta(days=30), 30 * 24 * 60 * 60],
-        ]
+        videos = list(self.get_checkpoints("video"))
+        budget = self.__key_pool.get_left()
+        if budget >= 0:
+            # at least one, so an exhausted quota stops main
+            budget = max(budget // self.__key_pool.get_cost("commentThreads"), 1)
+        else:
+            budget = None
+        for video_id in self.__scheduler.get_due_videos(budget):
+            if video_id not in videos:
+                videos.append(video_id)
+        return self.claim("video", videos)
 
-        query = """SELECT id
-            FROM yt_video 
-            WHERE 
-                (
-                    (publishedAt BETWEEN ? AND ?)
-                    AND
-                    strftime('%s', ?) - strftime('%s', last_time_fetched) > ?
-                )	
-                OR 
-                    last_time_fetched = ""
-        """
-        videos = set()
-        for delta in deltas:
-            now = datetime.now()
-            result = self.__cursor.execute(
-                query, (now - delta[0], now - delta[1], now, delta[2])
-            )
+    def fetch_videos(
+        self, channel_id: str, next_page_token: str = "", incremental: bool = False
+    ) -> Iterator[tuple[list, str]]:
+        """Fetches the uploaded videos of a YouTube channel page by page.
 
-            for video in result.fetchall():
-                videos.add(video[0])
-        return videos
+        The videos are read from the uploads playlist of the channel, the newest
+            first. For an incremental refresh, paging stops after the first page
+            that holds a known video, so a refresh mostly costs a single request.
 
-    def fetch_videos(self, channel_id: str) -> list:
-        """Fetches videos from a YouTube channel.
+        Args:
+            channel_id (str): The ID of the YouTube channel.
+            next_page_token (str): The token of the page to start with, e.g. from a
+                checkpoint.
+            incremental (bool): True to stop at the first known video.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
+        Yields:
+            tuple[list, str]: The uploaded videos of one page and the token of the
+                next page, which is empty after the last page.
+        """
+        playlist_id = self.get_uploads_playlist(channel_id)
+        if playlist_id == "":
+            print(f"{datetime.now()} no uploads playlist @channel_id {channel_id}")
+            return
+
+        while True:
+            response = self.send_request(
+                "playlistItems",
+                self.request_youtube_playlist_items,
+                playlist_id=playlist_id,
+                next_page_token=next_page_token,
+            )
+            if "items" not in response:
+                return
+
+            videos = response["items"]
+            next_page_token = response.get("nextPageToken", "")
+            if incremental and (
+                response.get("notModified") or self.is_video_page_known(videos)
+            ):
+                next_page_token = ""
+            yield videos, next_page_token
+            self.put_etag(response)
+            if next_page_token == "":
+                return
+
+    def get_uploads_playlist(self, channel_id: str) -> str:
+        """Returns the ID of the uploads playlist of a channel.
+
+        The playlist is cached in yt_channel by the metadata refresh, it is only
+            requested here for a channel without metadata.
 
         Args:
             channel_id (str): The ID of the YouTube channel.
 
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
         Returns:
-            list: A list of videos from the channel.
+            str: The ID of the uploads playlist, or an empty string if the channel
+                was not found.
         """
-        videos = []
-        self.check_api_requests_left()
-        response = self.request_youtube_channel_videos(
-            channel_id=channel_id, next_page_token=""
-        )
-        while True:
-            if "items" in response:
-                for video in response["items"]:
-                    if not self.is_video_upload(video):
-                        continue
-                    videos.append(video)
+        query = """SELECT uploads_playlist_id
+                    FROM yt_channel
+                    WHERE channel_id = ?
+                """
+        result = self.__cursor.execute(query, (channel_id,)).fetchone()
+        if result is not None and result[0]:
+            return result[0]
 
+        for channels in self.fetch_metadata("channels", [channel_id]):
+            self.__writer.update_channel_metadata(channels)
+            for channel in channels:
                 try:
-                    next_page_token = response["nextPageToken"]
-                    self.check_api_requests_left()
-                    response = self.request_youtube_channel_videos(
-                        channel_id=channel_id, next_page_token=next_page_token
-                    )
-
+                    return channel["contentDetails"]["relatedPlaylists"]["uploads"]
                 except KeyError:
-                    break
-            else:
-                break
+                    pass
+        return ""
 
-        return videos
+    def is_video_page_known(self, videos: list) -> bool:
+        """Check if a page of the uploads playlist holds a known video.
 
-    def request_youtube_channel_videos(
-        self, channel_id: str, next_page_token: str
-    ) -> dict:
-        """Request YouTube channel videos.
+        Args:
+            videos (list): The playlist items of one page.
 
-        This method sends a request to the YouTube API to retrieve channel videos
-        based on the provided channel ID and next page token.
+        Returns:
+            bool: True if at least one video is already in yt_video, False otherwise.
+        """
+        if len(videos) == 0:
+            return False
+        video_ids = [video["contentDetails"]["videoId"] for video in videos]
+        query = f"""SELECT COUNT(*)
+                    FROM yt_video
+                    WHERE id IN ({", ".join("?" * len(video_ids))})
+                """
+        return self.__cursor.execute(query, video_ids).fetchone()[0] > 0
+
+    def fetch_metadata(self, endpoint: str, ids: list[str]) -> Iterator[list]:
+        """Fetches the metadata of videos or channels in batches of 50 IDs.
+
+        Every batch costs a single request, no matter how many IDs it holds.
 
         Args:
-            channel_id (str): The ID of the YouTube channel.
-            next_page_token (str): The token for the next page of results.
+            endpoint (str): Either videos or channels.
+            ids (list[str]): The IDs of the videos or channels.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
+        Yields:
+            list: The videos or channels of one batch.
+        """
+        for start in range(0, len(ids), 50):
+            batch = ids[start : start + 50]
+            response = self.send_request(
+                endpoint, self.request_youtube_metadata, endpoint, batch
+            )
+            yield response.get("items", [])
+            self.put_etag(response)
+
+    def request_youtube_metadata(
+        self, endpoint: str, ids: list[str], api_key: str
+    ) -> dict:
+        """Request the metadata of up to 50 videos or channels.
+
+        Args:
+            endpoint (str): Either videos or channels.
+            ids (list[str]): The IDs of the videos or channels.
+            api_key (str): The API key to send the request with.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the quota of the API key is exceeded.
 
         Returns:
             dict: A dictionary containing the response from the YouTube API.
-
         """
-        self.__number_of_api_requests_left -= 1
-        request = self.__youtube.activities().list(
-            part="snippet,contentDetails",
-            channelId=channel_id,
-            maxResults=500,
-            pageToken=next_page_token,
-        )
+        if endpoint == "channels":
+            resource = self.get_youtube_client(api_key).channels()
+            part = "snippet,contentDetails,statistics"
+        else:
+            resource = self.get_youtube_client(api_key).videos()
+            part = "snippet,statistics"
+        params = {
+            "part": part,
+            "id": ",".join(ids),
+            "maxResults": 50,
+            **self.get_fields(endpoint),
+        }
+        request = resource.list(**params)
         try:
-            return request.execute()
+            return self.execute_request(endpoint, request, params)
+        except googleapiclient.errors.HttpError as error:
+            if self.is_quota_exceeded(error):
+                raise
+            return {}
         except Exception:
             return {}
 
-    def is_video_new(self, video_id: str) -> bool:
-        """Check if a video is new.
+    def refresh_channel_metadata(self, channel_ids: list[str]) -> None:
+        """Refresh the uploads playlist and statistics of channels in batches.
 
         Args:
-            video_id (str): The ID of the video.
+            channel_ids (list[str]): The IDs of the channels.
 
-        Returns:
-            bool: True if the video is new, False otherwise.
+        Raises:
+            QuotaExhausted: If no API requests are left.
         """
-        query = """SELECT id
-                    FROM yt_video
-                    WHERE id = ?
-                """
+        for channels in self.fetch_metadata("channels", channel_ids):
+            self.__writer.update_channel_metadata(channels)
 
-        result = self.__cursor.execute(query, (video_id,))
-        res = result.fetchone()
-        if res is None or len(res) == 0:
-            return True
-        if len(res) == 0:
-            return True
-        return False
+    def refresh_video_metadata(self, video_ids: list[str]) -> None:
+        """Refresh the title, description and statistics of videos in batches.
 
-    def is_video_upload(self, video: dict) -> bool:
+        Args:
+            video_ids (list[str]): The IDs of the videos.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
         """
-        Check if the given video is an upload.
+        for videos in self.fetch_metadata("videos", video_ids):
+            self.__writer.update_video_metadata(videos)
+
+    def skip_unchanged_videos(
+        self, video_ids: list[str], previous_fetches: dict[str, str]
+    ) -> list[str]:
+        """Reschedule incremental refreshes of videos whose comment count is unchanged.
+
+        A full sweep and a resumed fetch are never skipped.
 
         Args:
-            video (dict): A dictionary representing the video.
+            video_ids (list[str]): The IDs of the videos to fetch.
+            previous_fetches (dict[str, str]): The last time fetched by video ID of
+                the videos to refresh incrementally.
 
         Returns:
-            bool: True if the video is an upload, False otherwise.
+            list[str]: The IDs of the videos that still need their comments fetched.
         """
-        if video["snippet"]["type"] == "upload":
-            return True
-        return False
+        checkpoints = self.get_checkpoints("video")
+        query = """SELECT commentCount = fetched_commentCount
+                    FROM yt_video
+                    WHERE id = ?
+                """
+        videos = []
+        for video_id in video_ids:
+            if video_id in previous_fetches and video_id not in checkpoints:
+                result = self.__cursor.execute(query, (video_id,)).fetchone()
+                if result is not None and result[0] == 1:
+                    print(f"{datetime.now()} comment count unchanged: {video_id}")
+                    self.update_video_last_time_fetched(video_id)
+                    continue
+            videos.append(video_id)
+        return videos
 
-    def insert_video(self, video: dict) -> None:
-        """Inserts a video into the database.
+    def request_youtube_playlist_items(
+        self, playlist_id: str, next_page_token: str, api_key: str
+    ) -> dict:
+        """Request the items of a YouTube playlist.
 
         Args:
-            video (dict): A dictionary containing the video information.
+            playlist_id (str): The ID of the playlist.
+            next_page_token (str): The token for the next page of results.
+            api_key (str): The API key to send the request with.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the quota of the API key is exceeded.
 
         Returns:
-            None
+            dict: A dictionary containing the response from the YouTube API.
         """
-        video_id = self.get_video_id_from_fetch(video)
-        snippet = video["snippet"]
-        query = """INSERT INTO yt_video
-                    (
-                        id, 
-                        title, 
-                        publishedAt, 
-                        last_time_fetched, 
-                        description, 
-                        channel_id
-                    ) 
-                    VALUES (?, ?, ?, ?, ?, ?);
+        params = {
+            "part": "snippet,contentDetails",
+            "playlistId": playlist_id,
+            "maxResults": 50,
+            "pageToken": next_page_token,
+            **self.get_fields("playlistItems"),
+        }
+        request = self.get_youtube_client(api_key).playlistItems().list(**params)
+        try:
+            return self.execute_request("playlistItems", request, params)
+        except googleapiclient.errors.HttpError as error:
+            if self.is_quota_exceeded(error):
+                raise
+            return {}
+        except Exception:
+            return {}
+
+    def update_channel_last_time_fetched(self, channel_id: str) -> None:
+        """Update the last and the next time fetched for a specific channel.
+
+        Args:
+            channel_id (str): The ID of the channel to update.
+        """
+        query = """UPDATE yt_channel
+                    SET
+                        last_time_fetched = ?,
+                        next_fetch_ts = ?
+                    WHERE channel_id = ?
                 """
-        published_at = snippet["publishedAt"][:19] + ".000000"
+        now = datetime.now()
         self.__cursor.execute(
             query,
             (
-                video_id,
-                snippet["title"],
-                published_at,
-                "",
-                snippet["description"],
-                snippet["channelId"],
+                now,
+                int(now.timestamp()) + self.get_time_since_last_video_fetch(),
+                channel_id,
             ),
         )
 
-    def update_channel_last_time_fetched(self, channel_id: str) -> None:
-        """Update the last time fetched for a specific channel.
+    def update_video_last_time_fetched(self, video_id: str) -> None:
+        """Update the last and the next time a video is fetched.
+
+        The next time is set by the scheduler from the observed comment velocity.
+            The comment count of the video is kept to skip the next refresh if it
+            does not change.
 
         Args:
-            channel_id (str): The ID of the channel to update.
+            video_id (str): The ID of the video to update.
         """
-        query = """UPDATE yt_channel
-                    SET last_time_fetched = ?
-                    WHERE channel_id = ?
+        self.__scheduler.schedule_video(video_id)
+        query = """UPDATE yt_video
+                    SET fetched_commentCount = commentCount
+                    WHERE id = ?
                 """
-        self.__cursor.execute(query, (datetime.now(), channel_id))
+        self.__cursor.execute(query, (video_id,))
 
-    def update_video_last_time_fetched(self, video_id: str) -> None:
-        """Update the last time a video was fetched.
+    def update_video_last_time_swept(self, video_id: str) -> None:
+        """Update the last time all comment pages of a video were fetched.
 
         Args:
             video_id (str): The ID of the video to update.
         """
         query = """UPDATE yt_video
-                    SET last_time_fetched = ?
+                    SET last_time_swept = ?
                     WHERE id = ?
                 """
         self.__cursor.execute(query, (datetime.now(), video_id))
 
-    def check_api_requests_left(self) -> None:
-        """Check the number of API requests left and take appropriate actions.
+    def get_checkpoints(self, kind: str) -> dict[str, str]:
+        """Returns the page tokens of all unfinished fetches of a kind.
 
-        This method checks the value of `self.__number_of_api_requests_left` and
-        performs the following actions:
-        - If the number of requests left is 0, it prints a message, commits the
-        connection, and exits the program.
-        - If the number of requests left is a multiple of 100, it prints a message
-        with the current timestamp and the number of requests left.
+        Args:
+            kind (str): "channel", "video" or "replies".
 
         Returns:
-            None
+            dict[str, str]: The page token of the next page by channel, video or
+                comment ID, the oldest checkpoint first.
         """
-        if self.__number_of_api_requests_left >= 0:
-            if self.__number_of_api_requests_left == 0:
-                print(f"{datetime.now()} no token requests left")
-                self.__connection.commit()
-                print(f"Tokens left: {self.__number_of_api_requests_left}")
-                os._exit(0)
-            if self.__number_of_api_requests_left % 100 == 0:
-                print(
-                    f"{datetime.now()} token requests left {self.__number_of_api_requests_left}"
-                )
+        query = """SELECT id, next_page_token
+                    FROM yt_checkpoint
+                    WHERE kind = ?
+                    ORDER BY last_time_updated
+                """
+        result = self.__cursor.execute(query, (kind,))
+        return dict(result.fetchall())
 
-    def fetch_comments(self, video_id: str) -> list:
+    def save_checkpoint(self, kind: str, id: str, next_page_token: str) -> None:
+        """Store the page token where an unfinished fetch continues.
+
+        An empty page token means the fetch is finished and deletes the checkpoint.
+
+        Args:
+            kind (str): "channel", "video" or "replies".
+            id (str): The ID of the channel, video or comment.
+            next_page_token (str): The token of the next page.
         """
-        Fetches comments for a given YouTube video.
+        if next_page_token == "":
+            self.delete_checkpoint(kind, id)
+            return
+
+        query = """INSERT INTO yt_checkpoint
+                    (
+                        kind,
+                        id,
+                        next_page_token,
+                        last_time_updated
+                    )
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(kind, id) DO UPDATE SET
+                        next_page_token = excluded.next_page_token,
+                        last_time_updated = excluded.last_time_updated
+                """
+        self.__cursor.execute(query, (kind, id, next_page_token, datetime.now()))
+
+    def delete_checkpoint(self, kind: str, id: str) -> None:
+        """Delete the checkpoint of a finished fetch.
 
         Args:
-            video_id (str): The ID of the YouTube video.
+            kind (str): "channel", "video" or "replies".
+            id (str): The ID of the channel, video or comment.
+        """
+        query = """DELETE FROM yt_checkpoint
+                    WHERE kind = ? AND id = ?
+                """
+        self.__cursor.execute(query, (kind, id))
+
+    def check_api_requests_left(self, endpoint: str) -> str:
+        """Take the quota units of one API request from the budget before it is sent.
+
+        This method is safe to call from several worker threads and performs the
+        following actions:
+        - It takes the units of the endpoint from the API key with the most units left.
+        - If no key has requests left, it raises QuotaExhausted, which stops `main`.
+        - If the time budget of a batch run is used up, it raises DeadlineReached.
+        - If the number of requests left is a multiple of 100, it prints a message
+        with the current timestamp and the number of requests left.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+            DeadlineReached: If the time budget of a batch run is used up.
 
         Returns:
-            list: A list of comments for the video.
+            str: The API key to send the request with.
         """
-        comments = []
+        self.__batch.check_deadline()
+        api_key = self.__key_pool.take(endpoint)
+        number_of_api_requests_left = self.__key_pool.get_left()
+        if number_of_api_requests_left >= 0 and number_of_api_requests_left % 100 == 0:
+            print(f"{datetime.now()} token requests left {number_of_api_requests_left}")
+            print(f"{datetime.now()} {self.__model.get_statistics()}")
+        return api_key
+
+    def send_request(
+        self, endpoint: str, request: Callable[..., dict], *args, **kwargs
+    ) -> dict:
+        """Send a request with the API key that has the most quota units left.
 
-        try:
-            self.check_api_requests_left()
-            response = self.request_youtube_video_comment(
-                video_id=video_id, next_page_token=""
-            )
-        except googleapiclient.errors.HttpError:
-            print(f"{datetime.now()} comments disabled @video_id {video_id}")
-            return comments
-        except Exception:
-            # if e.g. comments are disabled
-            print(
-                f"{datetime.now()} error api_key: tried fetching @video_id {video_id}"
-            )
-            self.update_video_last_time_fetched(video_id)
-            return comments
+        An API key rejected with quotaExceeded is dropped until the quota resets,
+            and the request is sent again with the next key. Any other error is
+            raised.
 
-        while True:
-
-            for comment in response["items"]:
-                try:
-                    comments.append(comment)
-                except Exception:
-                    continue
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            request (Callable[..., dict]): The request_youtube_* method sending
+                the request, called with the arguments and the API key.
+            *args: The positional arguments of the request method.
+            **kwargs: The keyword arguments of the request method without the
+                API key.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+            DeadlineReached: If the time budget of a batch run is used up.
+            googleapiclient.errors.HttpError: If the request failed for another
+                reason than an exceeded quota.
 
+        Returns:
+            dict: A dictionary containing the response from the YouTube API.
+        """
+        while True:
+            api_key = self.check_api_requests_left(endpoint)
             try:
-                next_page_token = response["nextPageToken"]
-            except KeyError:
-                break
+                return request(*args, api_key=api_key, **kwargs)
+            except googleapiclient.errors.HttpError as error:
+                if not self.is_quota_exceeded(error):
+                    raise
+                print(f"{datetime.now()} quota exceeded, API key dropped until reset")
+                self.__key_pool.drop(api_key)
+
+    def fetch_comments(
+        self, video_id: str, next_page_token: str = "", last_time_fetched: str = ""
+    ) -> Iterator[tuple[list, str, dict]]:
+        """
+        Fetches comments for a given YouTube video page by page.
 
+        Every page is yielded as soon as it arrives, so the comments of a video
+            never have to be held in memory all at once.
+        If the token of a checkpoint is rejected, the video is fetched from the
+            first page.
+        For an incremental refresh, the newest comments come first and paging stops
+            after the first page that holds only known comments older than the
+            previous fetch.
+
+        Args:
+            video_id (str): The ID of the YouTube video.
+            next_page_token (str): The token of the page to start with, e.g. from a
+                checkpoint.
+            last_time_fetched (str): The last time fetched for an incremental
+                refresh, or empty to fetch all pages.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
+        Yields:
+            tuple[list, str, dict]: The comment threads of one page, the token of
+                the next page, which is empty after the last page, and the
+                response, whose ETag is remembered once the page is written.
+        """
+        resumed = next_page_token != ""
+        while True:
             try:
-                self.check_api_requests_left()
-                response = self.request_youtube_video_comment(
-                    video_id=video_id, next_page_token=next_page_token
+                response = self.send_request(
+                    "commentThreads",
+                    self.request_youtube_video_comment,
+                    video_id=video_id,
+                    next_page_token=next_page_token,
                 )
+            except QuotaExhausted:
+                # the quota and the deadline stop main
+                raise
             except googleapiclient.errors.HttpError:
+                if resumed:
+                    print(f"{datetime.now()} checkpoint expired @video_id {video_id}")
+                    resumed = False
+                    next_page_token = ""
+                    continue
                 print(f"{datetime.now()} comments disabled @video_id {video_id}")
-                return comments
+                return
             except Exception:
                 # if e.g. comments are disabled
                 print(
                     f"{datetime.now()} error api_key: tried fetching @video_id {video_id}"
                 )
-                self.update_video_last_time_fetched(video_id)
-                return comments
-
-        return comments
-
-    def request_youtube_video_comment(
-        self, video_id: str, next_page_token: str
-    ) -> dict:
-        """Request YouTube video comments.
-
-        This method sends a request to the YouTube API to retrieve comments for a specific video.
+                return
+            resumed = False
+
+            comments = response.get("items", [])
+            next_page_token = response.get("nextPageToken", "")
+            if last_time_fetched != "" and self.is_page_known(
+                comments, last_time_fetched
+            ):
+                next_page_token = ""
+            yield comments, next_page_token, response
+            if next_page_token == "":
+                return
+
+    def fetch_comments_into_queue(
+        self,
+        video_id: str,
+        next_page_token: str,
+        last_time_fetched: str,
+        pages: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        """Fetches the comments of a video in a worker thread and puts the pages into a queue.
+
+        After the last page, None is put into the queue for the video. The pages
+            are put with their responses, whose ETags are remembered by the
+            consumer once the pages are written.
 
         Args:
             video_id (str): The ID of the YouTube video.
-            nextPageToken (str): The token for the next page of comments.
+            next_page_token (str): The token of the page to start with.
+            last_time_fetched (str): The last time fetched for an incremental
+                refresh, or empty to fetch all pages.
+            pages (queue.Queue): The queue the pages are put into.
+            stop (threading.Event): Set when the consumer of the queue has stopped.
+        """
+        try:
+            for comments, next_page_token, response in self.fetch_comments(
+                video_id, next_page_token, last_time_fetched
+            ):
+                if stop.is_set():
+                    return
+                pages.put((video_id, comments, next_page_token, response))
+        finally:
+            pages.put((video_id, None, "", None))
+
+    def fetch_comments_of_videos(
+        self, video_ids: list[str], previous_fetches: dict[str, str]
+    ) -> Iterator[tuple[str, list | None, str]]:
+        """Fetches the comments of several videos page by page.
+
+        The comments of up to NUMBER_OF_WORKERS videos are fetched at the same time
+            by the thread pool of the App, also with a single worker, so the next
+            pages are fetched while the calling thread writes and commits the
+            previous ones.
+            The pages are passed through a queue of WRITE_QUEUE_SIZE pages to the
+            calling thread, which stays the only one writing to the database. A
+            full queue blocks the workers until the pages are written.
+        The ETag of a page is remembered when the calling thread asks for the
+            next page, after it wrote the page. The ETags of pages that are
+            discarded, because the calling thread stopped, are never saved.
+        Videos with a checkpoint are resumed from the stored page token.
 
-        Returns:
-            dict: A dictionary containing the response from the YouTube API.
+        Args:
+            video_ids (list[str]): The IDs of the YouTube videos.
+            previous_fetches (dict[str, str]): The last time fetched of the videos
+                to refresh incrementally.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
+        Yields:
+            tuple[str, list | None, str]: The ID of a video, the comment threads of
+                one page, or None after the last page of the video, and the token
+                of the next page.
         """
-        self.__number_of_api_requests_left = self.__number_of_api_requests_left - 1
-        request = self.__youtube.commentThreads().list(
-            part="snippet,replies",
-            videoId=video_id,
-            maxResults=500,
-            pageToken=next_page_token,
-        )
-        return request.execute()
+        checkpoints = self.get_checkpoints("video")
+        video_ids = iter(video_ids)
+        pages = queue.Queue(maxsize=self.__write_queue_size)
+        stop = threading.Event()
+        futures = {}
+        for video_id in islice(video_ids, self.__number_of_workers):
+            futures[video_id] = self.__executor.submit(
+                self.fetch_comments_into_queue,
+                video_id,
+                checkpoints.get(video_id, ""),
+                previous_fetches.get(video_id, ""),
+                pages,
+                stop,
+            )
+
+        # after an error, the pages the other workers already fetched are
+        # still yielded before the error is raised
+        error = None
+        try:
+            while futures:
+                video_id, comments, next_page_token, response = pages.get()
+                if comments is None:
+                    future = futures.pop(video_id)
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    if error is None:
+                        for next_video_id in islice(video_ids, 1):
+                            futures[next_video_id] = self.__executor.submit(
+                                self.fetch_comments_into_queue,
+                                next_video_id,
+                                checkpoints.get(next_video_id, ""),
+                                previous_fetches.get(next_video_id, ""),
+                                pages,
+                                stop,
+                            )
+                yield video_id, comments, next_page_token
+                if response is not None:
+                    self.put_etag(response)
+            if error is not None:
+                raise error
+        finally:
+            # unblock the workers still putting pages into the queue
+            stop.set()
+            while not all(future.done() for future in futures.values()):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def queue_incomplete_threads(self, threads: list) -> int:
+        """Queue the reply expansion of written comment threads with missing replies.
 
-    def is_comment_new(self, comment_id: str) -> bool:
-        """Check if a comment is new.
+        A comment thread holds at most five replies. If fewer replies of a thread
+            are stored than its totalReplyCount, a checkpoint of the kind "replies"
+            without a page token is stored, so the expansion survives a restart.
+            YouTube often counts replies it does not return, e.g. held for
+            review, so an expanded thread is only queued again once its
+            totalReplyCount grew beyond the count it was expanded at.
 
         Args:
-            comment_id (str): The ID of the comment.
+            threads (list): The written comment threads of one page.
 
         Returns:
-            bool: True if the comment is new, False otherwise.
+            int: The number of queued comment threads.
         """
-        query = """SELECT id 
+        expanded_query = """SELECT expanded_replyCount
                     FROM yt_comment
                     WHERE id = ?
                 """
+        query = """SELECT COUNT(*)
+                    FROM yt_comment
+                    WHERE parentId = ?
+                """
+        rows = []
+        for thread in threads:
+            total_reply_count = thread["snippet"].get("totalReplyCount", 0)
+            replies = thread.get("replies", {}).get("comments", [])
+            if total_reply_count <= len(replies):
+                continue
+            parent_id = thread["snippet"]["topLevelComment"]["id"]
+            expanded = self.__cursor.execute(expanded_query, (parent_id,)).fetchone()
+            if expanded is not None and total_reply_count <= (expanded[0] or 0):
+                continue
+            stored_replies = self.__cursor.execute(query, (parent_id,)).fetchone()[0]
+            if stored_replies < total_reply_count:
+                rows.append(("replies", parent_id, "", datetime.now()))
 
-        result = self.__cursor.execute(query, (comment_id,))
-        res = result.fetchone()
-        if res is None or len(res) == 0:
-            return True
-        return False
+        query = """INSERT INTO yt_checkpoint
+                    (
+                        kind,
+                        id,
+                        next_page_token,
+                        last_time_updated
+                    )
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(kind, id) DO NOTHING
+                """
+        self.__cursor.executemany(query, rows)
+        return len(rows)
 
-    def update_video(self, video: dict) -> None:
-        """Update video information in the database.
+    def expand_replies(self) -> None:
+        """Fetch all replies of the queued comment threads page by page.
 
-        Args:
-            video (dict): A dictionary containing the video information.
+        Every page is written with its checkpoint, so an expansion stopped by the
+            quota is resumed at the next start. A finished expansion keeps the
+            totalReplyCount of its thread, so the thread is only expanded again
+            once it has more replies.
 
-        Returns:
-            None
+        Raises:
+            QuotaExhausted: If no API requests are left.
         """
-        video_id = self.get_video_id_from_fetch(video)
-        snippet = video["snippet"]
-        query = """UPDATE yt_video
-                    SET
-                        title = ?,
-                        publishedAt = ?,
-                        description = ?,
-                        channel_id = ?
+        query = """SELECT video_id
+                    FROM yt_comment
                     WHERE id = ?
+                """
+        checkpoints = self.get_checkpoints("replies")
+        for parent_id in self.claim("replies", list(checkpoints)):
+            next_page_token = checkpoints[parent_id]
+            result = self.__cursor.execute(query, (parent_id,)).fetchone()
+            if result is None:
+                self.delete_checkpoint("replies", parent_id)
+                self.__leases.release("replies", parent_id)
+                continue
+            print(f"{datetime.now()} expand replies: {parent_id}")
+            for replies, next_page_token in self.fetch_replies(
+                parent_id, next_page_token
+            ):
+                for reply in replies:
+                    reply["snippet"].setdefault("videoId", result[0])
+                self.__writer.upsert_comments(replies)
+                self.save_checkpoint("replies", parent_id, next_page_token)
+                self.commit()
+            self.update_thread_expanded(parent_id)
+            self.delete_checkpoint("replies", parent_id)
+            self.__leases.release("replies", parent_id)
+            self.commit()
+
+    def update_thread_expanded(self, parent_id: str) -> None:
+        """Keep the totalReplyCount a comment thread was expanded at.
+
+        Args:
+            parent_id (str): The ID of the top level comment.
         """
-        published_at = snippet["publishedAt"][:19] + ".000000"
-        self.__cursor.execute(
-            query,
-            (
-                snippet["title"],
-                published_at,
-                snippet["description"],
-                snippet["channelId"],
-                video_id,
-            ),
-        )
+        query = """UPDATE yt_comment
+                    SET expanded_replyCount = totalReplyCount
+                    WHERE id = ?
+                """
+        self.__cursor.execute(query, (parent_id,))
+
+    def fetch_replies(
+        self, parent_id: str, next_page_token: str = ""
+    ) -> Iterator[tuple[list, str]]:
+        """Fetches the replies of a comment page by page.
+
+        Args:
+            parent_id (str): The ID of the top level comment.
+            next_page_token (str): The token of the page to start with, e.g. from a
+                checkpoint.
 
-    def insert_comment(self, comment: dict) -> None:
-        """Inserts a comment into the database.
+        Raises:
+            QuotaExhausted: If no API requests are left.
+
+        Yields:
+            tuple[list, str]: The replies of one page and the token of the next
+                page, which is empty after the last page.
+        """
+        while True:
+            response = self.send_request(
+                "comments",
+                self.request_youtube_comment_replies,
+                parent_id=parent_id,
+                next_page_token=next_page_token,
+            )
+            if "items" not in response:
+                return
+
+            next_page_token = response.get("nextPageToken", "")
+            yield response["items"], next_page_token
+            self.put_etag(response)
+            if next_page_token == "":
+                return
+
+    def request_youtube_comment_replies(
+        self, parent_id: str, next_page_token: str, api_key: str
+    ) -> dict:
+        """Request the replies of a YouTube comment.
 
         Args:
-            comment (dict): The comment data to be inserted.
+            parent_id (str): The ID of the top level comment.
+            next_page_token (str): The token for the next page of replies.
+            api_key (str): The API key to send the request with.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the quota of the API key is exceeded.
 
         Returns:
-            None
+            dict: A dictionary containing the response from the YouTube API.
         """
-        if "youtube#commentThread" in comment["kind"]:
-            snippet = comment["snippet"]["topLevelComment"]["snippet"]
-            id = comment["snippet"]["topLevelComment"]["id"]
-        else:
-            snippet = comment["snippet"]
-            id = comment["id"]
+        params = {
+            "part": "snippet",
+            "parentId": parent_id,
+            "maxResults": 100,
+            "pageToken": next_page_token,
+            "textFormat": "plainText",
+            **self.get_fields("comments"),
+        }
+        request = self.get_youtube_client(api_key).comments().list(**params)
+        try:
+            return self.execute_request("comments", request, params)
+        except googleapiclient.errors.HttpError as error:
+            if self.is_quota_exceeded(error):
+                raise
+            return {}
+        except Exception:
+            return {}
 
-        published_at = snippet["publishedAt"][:19] + ".000000"
-        updated_at = snippet["updatedAt"][:19] + ".000000"
-        if "totalReplyCount" not in snippet:
-            total_reply_count = 0
-        else:
-            total_reply_count = snippet["totalReplyCount"]
+    def is_page_known(self, comments: list, last_time_fetched: str) -> bool:
+        """Check if a page holds only known comment threads older than the last fetch.
 
-        if "parentId" not in snippet:
-            parent_id = ""
-        else:
-            parent_id = snippet["parentId"]
+        Args:
+            comments (list): The comment threads of one page.
+            last_time_fetched (str): The last time the video was fetched.
 
+        Returns:
+            bool: True if all comment threads are known and older, False otherwise.
+        """
         try:
-            author_channel_id = snippet["authorChannelId"]["value"]
-        except KeyError:
-            author_channel_id = ""
-
-        attributes = [
-            id,
-            author_channel_id,
-            snippet["authorDisplayName"],
-            parent_id,
-            published_at,
-            updated_at,
-            snippet["textOriginal"],
-            snippet["likeCount"],
-            total_reply_count,
-            datetime.now(),
-            snippet["videoId"],
-        ]
-
-        query = """INSERT INTO yt_comment (
-                    id, 
-                    authorChannelId, 
-                    authorDisplayName, 
-                    parentId, 
-                    publishedAt, 
-                    updatedAt, 
-                    textOriginal, 
-                    likecount, 
-                    totalReplyCount, 
-                    last_time_fetched, 
-                    video_id
-                    ) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            previous_fetch = datetime.fromisoformat(last_time_fetched).astimezone(
+                timezone.utc
+            )
+        except ValueError:
+            return False
+        comment_ids = []
+        for comment in comments:
+            top_level_comment = comment["snippet"]["topLevelComment"]
+            published_at = datetime.fromisoformat(
+                top_level_comment["snippet"]["publishedAt"].replace("Z", "+00:00")
+            )
+            if published_at >= previous_fetch:
+                return False
+            comment_ids.append(top_level_comment["id"])
+
+        query = f"""SELECT COUNT(*)
+                    FROM yt_comment
+                    WHERE id IN ({", ".join("?" * len(comment_ids))})
                 """
-        self.__cursor.execute(query, attributes)
+        result = self.get_database_cursor().execute(query, comment_ids)
+        return result.fetchone()[0] == len(comment_ids)
 
-    def get_video_id_from_fetch(self, video: dict) -> str:
-        """Extracts the video ID from the given video dictionary.
+    def get_previous_fetches(self, video_ids: list[str]) -> dict[str, str]:
+        """Returns the videos to refresh incrementally.
+
+        A video is refreshed incrementally if it was fetched before and its last
+            full sweep is more recent than TIME_BETWEEN_FULL_SWEEPS. Otherwise all
+            pages are fetched to update e.g. the like counts.
 
         Args:
-            video (dict): A dictionary containing video details.
+            video_ids (list[str]): The IDs of the videos to fetch.
 
         Returns:
-            str: The video ID extracted from the video dictionary.
+            dict[str, str]: The last time fetched by video ID.
         """
-        try:
-            return video["contentDetails"]["upload"]["videoId"]
-        except KeyError:
-            pass
+        time_between_full_sweeps = self.get_config_number(
+            "VIDEO", "TIME_BETWEEN_FULL_SWEEPS", 7 * 24 * 60 * 60
+        )
 
-        try:
-            return video["contentDetails"]["playlistItem"]["resourceId"]["videoId"]
-        except KeyError:
-            return ""
+        query = """SELECT id, last_time_fetched
+                    FROM yt_video
+                    WHERE
+                        id = ?
+                    AND
+                        last_time_fetched != ""
+                    AND
+                        last_time_swept != ""
+                    AND
+                        strftime('%s', ?) - strftime('%s', last_time_swept) < ?
+                """
+        previous_fetches = {}
+        now = datetime.now()
+        for video_id in video_ids:
+            result = self.__cursor.execute(
+                query, (video_id, now, time_between_full_sweeps)
+            )
+            for video in result.fetchall():
+                previous_fetches[video[0]] = video[1]
+        return previous_fetches
 
-    def get_comment_id_from_fetch(self, comment: dict) -> str:
-        """Get the comment ID from the fetched comment.
+    def request_youtube_video_comment(
+        self, video_id: str, next_page_token: str, api_key: str
+    ) -> dict:
+        """Request YouTube video comments.
 
-        This method retrieves the comment ID from the fetched comment dictionary.
-        It first tries to extract the ID from the 'topLevelComment' key, and if that fails,
-        it tries to extract the ID from the 'id' key. If both attempts fail, an empty string is returned.
+        This method sends a request to the YouTube API to retrieve comments for a specific video.
 
         Args:
-            comment (dict): The fetched comment dictionary.
+            video_id (str): The ID of the YouTube video.
+            nextPageToken (str): The token for the next page of comments.
+            api_key (str): The API key to send the request with.
 
         Returns:
-            str: The comment ID, or an empty string if the ID cannot be found.
+            dict: A dictionary containing the response from the YouTube API.
         """
-        try:
-            return comment["topLevelComment"]["id"]
-        except KeyError:
-            pass
+        params = {
+            "part": "snippet,replies",
+            "videoId": video_id,
+            "order": "time",
+            "maxResults": 500,
+            "pageToken": next_page_token,
+            **self.get_fields("commentThreads"),
+        }
+        request = self.get_youtube_client(api_key).commentThreads().list(**params)
+        return self.execute_request("commentThreads", request, params)
+
+    def execute_request(self, endpoint: str, request: object, params: dict) -> dict:
+        """Send a request, with the ETag of the previous response if it is cached.
+
+        If the page did not change, YouTube answers with 304 Not Modified and
+            neither a body is decoded nor written. The returned response then has
+            no items, the cached token of the next page and notModified set.
+        The ETag of a new response is only remembered with put_etag once its page
+            is written, so a page that is fetched but never written is not
+            skipped as unchanged later.
 
-        try:
-            return comment["id"]
-        except KeyError:
-            return ""
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            request (object): The prepared request of the YouTube API client.
+            params (dict): The parameters of the request.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request failed.
+
+        Returns:
+            dict: A dictionary containing the response from the YouTube API.
+        """
+        if not self.__etags.is_enabled():
+            return self.archive_response(endpoint, params, request.execute())
 
-    def update_comment(self, comment) -> None:
-        """Updates the information of a comment in the database.
+        key = self.__etags.get_key(endpoint, params)
+        cached = self.__etags.get(key, self.get_database_cursor())
+        if cached is not None:
+            request.headers["If-None-Match"] = cached[0]
+        try:
+            response = request.execute()
+        except googleapiclient.errors.HttpError as error:
+            if cached is None or error.resp.status != 304:
+                raise
+            self.__etags.put(key, cached[0], cached[1])
+            response = {"items": [], "notModified": True}
+            if cached[1] != "":
+                response["nextPageToken"] = cached[1]
+            return response
+
+        response = self.archive_response(endpoint, params, response)
+        if "etag" in response:
+            response["etagKey"] = key
+        return response
+
+    def put_etag(self, response: dict) -> None:
+        """Remember the ETag of a response after its page was written.
 
         Args:
-            comment (dict): The comment object containing the updated information.
+            response (dict): The response of execute_request.
         """
-        # comment_id = self.get_comment_id_from_fetch(comment)
-        if "youtube#commentThread" in comment["kind"]:
-            snippet = comment["snippet"]["topLevelComment"]["snippet"]
-            id = comment["snippet"]["topLevelComment"]["id"]
-        else:
-            snippet = comment["snippet"]
-            id = comment["id"]
+        if "etagKey" in response:
+            self.__etags.put(
+                response["etagKey"], response["etag"], response.get("nextPageToken", "")
+            )
 
-        query = """UPDATE yt_comment
-                    SET
-                        authorChannelId = ?,
-                        authorDisplayName = ?,
-                        parentId = ?,
-                        publishedAt = ?,
-                        updatedAt = ?,
-                        textOriginal = ?,
-                        likeCount = ?,
-                        totalReplyCount = ?,
-                        last_time_fetched = ?,
-                        video_id = ?
-                    WHERE id = ?
+    def get_fields(self, endpoint: str) -> dict[str, str]:
+        """Returns the fields parameter of a request.
+
+        While the full responses are archived, no fields mask is sent, so the
+            archive also holds the values without a column in the database.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+
+        Returns:
+            dict[str, str]: The fields parameter, or an empty dictionary.
         """
-        published_at = snippet["publishedAt"][:19] + ".000000"
-        updated_at = snippet["updatedAt"][:19] + ".000000"
-        if "totalReplyCount" not in snippet:
-            total_reply_count = 0
-        else:
-            total_reply_count = snippet["totalReplyCount"]
+        if self.__full_responses:
+            return {}
+        return {"fields": self.fields[endpoint]}
 
-        parent_id = ""
-        if "parentId" in snippet:
-            parent_id = snippet["parentId"]
+    def archive_response(self, endpoint: str, params: dict, response: dict) -> dict:
+        """Append a response to the archive if it is enabled.
 
-        author_channel_id = ""
-        if "authorChannelId" in snippet:
-            author_channel_id = snippet["authorChannelId"]["value"]
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            params (dict): The parameters of the request.
+            response (dict): The decoded response.
 
-        self.__cursor.execute(
-            query,
-            (
-                author_channel_id,
-                snippet["authorDisplayName"],
-                parent_id,
-                published_at,
-                updated_at,
-                snippet["textOriginal"],
-                snippet["likeCount"],
-                total_reply_count,
-                datetime.now(),
-                snippet["videoId"],
-                id,
-            ),
-        )
+        Returns:
+            dict: The response.
+        """
+        if self.__archive.is_enabled() and isinstance(response, dict):
+            self.__archive.write(endpoint, params, response)
+        return response
 
     def main(self):
         """
         This method is the main entry point of the application.
         It loads channels and videos, and then continuously processes the channels
             and videos.
-        It fetches videos for each channel, checks if the video is new, and inserts
-            or updates it accordingly.
-        It also fetches comments for each video, checks if the comment is new, and
-            inserts or updates it accordingly.
-        The process continues until interrupted by the user.
+        It fetches videos for each channel from its uploads playlist and inserts or
+            updates them in a single batch. A channel fetched before is only
+            refreshed up to the first known video.
+        It also fetches comments for each video page by page and inserts or updates
+            every page in a single batch. The pages are committed in groups every
+            COMMIT_INTERVAL seconds or COMMIT_ROWS rows of the STORAGE section.
+        Before, the metadata and statistics of the due channels and videos are
+            refreshed with one request per 50 IDs.
+        Recently swept videos are only refreshed up to the first known page, and
+            not at all if their comment count did not change.
+        Comment threads with more replies than stored are queued, and all their
+            replies are fetched after the videos.
+        Every written page stores the token of the next page as a checkpoint, so an
+            unfinished channel, video or reply expansion is resumed where it stopped.
+        The import directories are watched, so new or appended csv files are
+            loaded within seconds.
+        While nothing is due, it waits for new csv files. New channels and videos
+            end the running round, so they are fetched next. The videos of a round
+            are interrupted for due channels after TIME_SINCE_LAST_VIDEO_FETCH
+            seconds.
+        The process continues until interrupted by the user or until no API
+            requests are left.
+        """
+        try:
+            self.crawl()
+        except KeyboardInterrupt:
+            print(f"Tokens left: {self.__key_pool.get_left()}")
+            print(self.__model.get_statistics())
+            self.__close_database()
+            exit(0)
+        except QuotaExhausted:
+            print(f"{datetime.now()} no token requests left, unfinished fetches resume at the next start")
+            print(f"Tokens left: {self.__key_pool.get_left()}")
+            print(self.__model.get_statistics())
+            self.__close_database()
+            exit(0)
+
+    def crawl(self, once: bool = False) -> None:
+        """Process the due channels, videos and replies round by round.
+
+        Args:
+            once (bool): True to return as soon as nothing is due and no other
+                process works, without watching the import directories.
+
+        Raises:
+            QuotaExhausted: If no API requests are left.
+            DeadlineReached: If the time budget of a batch run is used up.
         """
+        if not once:
+            self.__watcher.start()
         self.load_channels()
         self.load_videos()
-        last_time_load_csv = datetime.now()
 
-        try:
-            while True:
-                if datetime.now() - last_time_load_csv > timedelta(minutes=5):
-                    self.load_channels()
-                    self.load_videos()
-                    last_time_load_csv = datetime.now()
-                    print(f"{datetime.now()} csv loaded")
-
-                # process channels
-                channel_ids = self.get_channels()
-                for channel_id in channel_ids:
-                    print(f"{datetime.now()} process channel: {channel_id}")
-                    videos = self.fetch_videos(channel_id)
-                    for video in videos:
-                        video_id = self.get_video_id_from_fetch(video)
-                        # if not type(video_id) == type(str) and not len(video_id) > 0:
-                        #    continue
-                        if self.is_video_new(video_id):
-                            self.insert_video(video)
-                            print(f"{datetime.now()} new video added: {video_id}")
-                        else:
-                            self.update_video(video)
-                    self.update_channel_last_time_fetched(channel_id)
-                    self.__connection.commit()
-                    if datetime.now() - last_time_load_csv > timedelta(minutes=5):
-                        break
-
-                # process videos
-                video_ids = self.get_videos()
-                for video_id in video_ids:
-                    print(f"{datetime.now()} process video: {video_id}")
-                    comments = self.fetch_comments(video_id)
-
-                    for comment in comments:
-                        if "error" in comments:
-                            print("no comments allowed")
-                            comments = []
-                            self.update_video_last_time_fetched(video_id)
-                            self.__connection.commit()
-                            continue
-
-                        if "snippet" in comment:
-                            comment_id = comment["snippet"]["topLevelComment"]["id"]
-                            if self.is_comment_new(comment_id):
-                                self.insert_comment(comment)
-                            else:
-                                self.update_comment(comment)
-
-                        if "replies" in comment:
-                            for reply in comment["replies"]["comments"]:
-                                reply_id = reply["id"]
-                                if self.is_comment_new(reply_id):
-                                    self.insert_comment(reply)
-                                else:
-                                    self.update_comment(reply)
+        while True:
+            self.__batch.check_deadline()
+            self.__batch.enter("seeds")
+            self.load_changed_seeds()
+
+            # process channels
+            self.__batch.enter("channels")
+            channel_ids = self.get_channels()
+            channel_checkpoints = self.get_checkpoints("channel")
+            fetched_channels = self.get_fetched_channels(channel_ids)
+            self.refresh_channel_metadata(channel_ids)
+            self.commit()
+            for channel_id in channel_ids:
+                print(f"{datetime.now()} process channel: {channel_id}")
+                for videos, next_page_token in self.fetch_videos(
+                    channel_id,
+                    channel_checkpoints.get(channel_id, ""),
+                    channel_id in fetched_channels
+                    and channel_id not in channel_checkpoints,
+                ):
+                    self.__writer.upsert_videos(videos)
+                    self.save_checkpoint("channel", channel_id, next_page_token)
+                    self.commit()
+                self.update_channel_last_time_fetched(channel_id)
+                self.delete_checkpoint("channel", channel_id)
+                self.__leases.release("channel", channel_id)
+                self.commit()
+                if self.load_changed_seeds() > 0:
+                    break
 
-                    self.update_video_last_time_fetched(video_id)
-                    self.__connection.commit()
-                    if datetime.now() - last_time_load_csv > timedelta(minutes=120):
-                        break
+            # process videos
+            self.__batch.enter("videos")
+            videos_started = time.monotonic()
+            video_ids = self.get_videos()
+            previous_fetches = self.get_previous_fetches(video_ids)
+            self.refresh_video_metadata(video_ids)
+            video_ids = self.skip_unchanged_videos(video_ids, previous_fetches)
+            self.commit()
+            for video_id, comments, next_page_token in self.fetch_comments_of_videos(
+                video_ids, previous_fetches
+            ):
+                if comments is not None:
+                    self.__scheduler.observe(video_id, comments)
+                    self.__writer.upsert_comment_threads(comments)
+                    if self.__expand_replies:
+                        self.queue_incomplete_threads(comments)
+                    self.save_checkpoint("video", video_id, next_page_token)
+                    self.commit()
+                    continue
+
+                print(f"{datetime.now()} process video: {video_id}")
+                self.update_video_last_time_fetched(video_id)
+                if video_id not in previous_fetches:
+                    self.update_video_last_time_swept(video_id)
+                self.delete_checkpoint("video", video_id)
+                self.__leases.release("video", video_id)
+                self.commit()
+                if self.load_changed_seeds() > 0:
+                    break
+                if (
+                    time.monotonic() - videos_started
+                    > self.get_time_since_last_video_fetch()
+                    and self.is_channel_due()
+                ):
+                    break
+
+            # process replies
+            self.__batch.enter("replies")
+            if self.__expand_replies:
+                self.expand_replies()
+            self.__leases.release_all()
+            self.commit(force=self.__leases.is_enabled())
+
+            # nothing is due, wait for new channels and videos
+            if len(channel_ids) == 0 and len(video_ids) == 0:
+                if once and not self.__leases.is_held_by_others():
+                    return
+                self.__watcher.wait(1)
+
+    def run_batch(
+        self, time_budget: float | None = None, quota_budget: int | None = None
+    ) -> dict:
+        """Run once within a time and a quota budget and return a summary.
+
+        The due channels and videos are processed as in `main`, the most
+            overdue videos first and no more than the quota budget allows. The
+            run ends when nothing is due or a budget is used up. Everything
+            fetched is committed before, and unfinished fetches resume from their
+            checkpoints at the next run.
 
+        Args:
+            time_budget (float | None): The seconds of the run, None for no limit.
+            quota_budget (int | None): The quota units of the run, None for no
+                limit.
+
+        Returns:
+            dict: Why the run stopped, its budgets and the seconds, changed rows,
+                requests and quota units in total and by phase.
+        """
+        self.__batch.start(time_budget, quota_budget)
+        stopped_by = "done"
+        try:
+            self.crawl(once=True)
+        except DeadlineReached:
+            stopped_by = "deadline"
+        except QuotaExhausted:
+            stopped_by = "quota"
         except KeyboardInterrupt:
-            print(f"Tokens left: {self.__number_of_api_requests_left}")
-            self.__close_database()
-            exit(0)
+            stopped_by = "interrupted"
+        summary = self.__batch.get_summary(stopped_by)
+        self.__close_database()
+        return summary
+
+    def reingest(self) -> None:
+        """Rebuild yt_video and yt_comment from the archive of the raw API responses.
+
+        The archived pages are written in the order they were fetched, with the
+            same write path as fetched pages, so newer pages overwrite older ones.
+            Unchanged comments are rewritten as well, so stored rows are repaired
+            after a parser fix. No API request is sent and no quota is spent.
+        """
+        started = time.monotonic()
+        number_of_pages = 0
+        number_of_rows = 0
+        query = """SELECT video_id
+                    FROM yt_comment
+                    WHERE id = ?
+                """
+        try:
+            for record in self.__archive.read():
+                items = record["response"].get("items", [])
+                endpoint = record["endpoint"]
+                try:
+                    if endpoint == "commentThreads":
+                        number_of_rows += self.__writer.upsert_comment_threads(
+                            items, skip_unchanged=False
+                        )
+                    elif endpoint == "comments":
+                        parent_id = record["params"].get("parentId", "")
+                        result = self.__cursor.execute(query, (parent_id,)).fetchone()
+                        for reply in items:
+                            if result is not None:
+                                reply["snippet"].setdefault("videoId", result[0])
+                        number_of_rows += self.__writer.upsert_comments(
+                            items, skip_unchanged=False
+                        )
+                    elif endpoint == "playlistItems":
+                        number_of_rows += self.__writer.upsert_videos(items)
+                    elif endpoint == "videos":
+                        number_of_rows += self.__writer.update_video_metadata(items)
+                    elif endpoint == "channels":
+                        number_of_rows += self.__writer.update_channel_metadata(items)
+                except (KeyError, TypeError, ValueError):
+                    print(f"{datetime.now()} skipped {endpoint} page of {record['time']}")
+                    continue
+                number_of_pages += 1
+                self.commit()
+                if number_of_pages % 1000 == 0:
+                    print(f"{datetime.now()} {number_of_pages} pages reingested")
+        except KeyboardInterrupt:
+            pass
+        self.__close_database()
+        duration = time.monotonic() - started
+        print(
+            f"{datetime.now()} {number_of_pages} pages reingested, "
+            f"{number_of_rows} rows written in {duration:.1f} s "
+            f"({number_of_pages / max(duration, 1e-9):,.0f} pages/s)"
+        )
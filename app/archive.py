@@ -0,0 +1,136 @@
+import gzip
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from typing import Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Archive:
+    """A class representing an append-only archive of the raw API responses.
+
+    Every response is appended as one JSON line with its endpoint and request
+    parameters to a gzip compressed segment. When a segment reaches the segment
+    size, a new one is started. The API key is never archived. The segments
+    can be re-ingested into the database without network access and quota.
+
+    Attributes:
+        __enabled (bool): True to archive the responses.
+        __path (str): The directory of the segments.
+        __segment_size (int): The compressed bytes after which a segment is rotated.
+        __file (gzip.GzipFile | None): The open segment, None until the first write.
+        __lock (threading.Lock): The lock guarding the open segment.
+    """
+
+    def __init__(
+        self, path: str, segment_size: int = 100 * 1024 * 1024, enabled: bool = True
+    ) -> None:
+        """Initialize the Archive object.
+
+        Args:
+            path (str): The directory of the segments.
+            segment_size (int): The compressed bytes after which a segment is
+                rotated.
+            enabled (bool): True to archive the responses. A disabled archive can
+                still be read.
+        """
+        self.__enabled = enabled
+        self.__path = path
+        self.__segment_size = segment_size
+        self.__file = None
+        self.__lock = threading.Lock()
+
+    def is_enabled(self) -> bool:
+        """Check if the responses are archived.
+
+        Returns:
+            bool: True if the archive is enabled, False otherwise.
+        """
+        return self.__enabled
+
+    def open_segment(self) -> gzip.GzipFile:
+        """Open a new segment named after the current time.
+
+        Returns:
+            gzip.GzipFile: The new segment.
+        """
+        if not os.path.exists(self.__path):
+            os.makedirs(self.__path)
+        name = datetime.now().strftime("archive-%Y%m%d-%H%M%S-%f.jsonl.gz")
+        return gzip.open(os.path.join(self.__path, name), "wb", compresslevel=6)
+
+    def write(self, endpoint: str, params: dict, response: dict) -> None:
+        """Append a response to the archive.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            params (dict): The parameters of the request without the API key.
+            response (dict): The decoded response.
+        """
+        record = {
+            "time": datetime.now().isoformat(),
+            "endpoint": endpoint,
+            "params": params,
+            "response": response,
+        }
+        if orjson is not None:
+            line = orjson.dumps(record) + b"\n"
+        else:
+            line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+        with self.__lock:
+            if self.__file is None:
+                self.__file = self.open_segment()
+            self.__file.write(line)
+            # the compressed bytes written so far
+            if self.__file.fileobj.tell() >= self.__segment_size:
+                self.__file.close()
+                self.__file = None
+
+    def close(self) -> None:
+        """Close the open segment."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def get_segments(self) -> list[str]:
+        """Returns the paths of all segments, the oldest first.
+
+        Returns:
+            list[str]: The paths of the segments.
+        """
+        if not os.path.exists(self.__path):
+            return []
+        segments = []
+        for name in sorted(os.listdir(self.__path)):
+            if name.startswith("archive-") and name.endswith(".jsonl.gz"):
+                segments.append(os.path.join(self.__path, name))
+        return segments
+
+    def read(self) -> Iterator[dict]:
+        """Read all archived responses, the oldest first.
+
+        The end of a segment that was not closed, e.g. after a crash, is skipped.
+
+        Yields:
+            dict: The archived record with time, endpoint, params and response.
+        """
+        for segment in self.get_segments():
+            file = gzip.open(segment, "rb")
+            try:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        print(f"{datetime.now()} skipped broken line in {segment}")
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                print(f"{datetime.now()} skipped unfinished end of {segment}")
+            finally:
+                file.close()
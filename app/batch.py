@@ -0,0 +1,202 @@
+import sqlite3
+import time
+
+from app.quota import KeyPool, QuotaExhausted
+
+
+class DeadlineReached(QuotaExhausted):
+    """Raised when the time budget of a batch run is used up.
+
+    It stops the fetches like an exhausted quota, so unfinished fetches resume
+    from their checkpoints at the next run.
+    """
+
+
+# the reasons a batch run stops, from the least to the most severe
+stop_reasons = ["done", "deadline", "quota", "interrupted", "failed"]
+
+
+class BatchSummary:
+    """A class representing the budgets and the summary of a one-shot batch run.
+
+    The run is split into the phases seeds, channels, videos and replies of
+    every round. The time, the changed rows of the database and the API
+    requests and quota units are added up per phase.
+
+    Attributes:
+        phases (list[str]): The phases of a round, in the order they run.
+        __connection (sqlite3.Connection): The connection whose changed rows are
+            counted.
+        __key_pool (KeyPool): The API keys whose requests are counted.
+        __time_budget (float | None): The seconds of the run, None for no limit.
+        __quota_budget (int | None): The quota units of the run, None for no limit.
+        __started (float): The time.monotonic() of the start of the run.
+        __phase (str | None): The running phase, None before the first phase.
+        __phase_started (float): The time.monotonic() of the start of the phase.
+        __rows_at (int): The changed rows of the connection at the start of the
+            phase.
+        __requests_at (dict[str, int]): The requests by endpoint at the start of
+            the phase.
+        __totals (dict[str, dict]): The seconds, rows, requests and units by phase.
+    """
+
+    phases = ["seeds", "channels", "videos", "replies"]
+
+    def __init__(self, connection: sqlite3.Connection, key_pool: KeyPool) -> None:
+        """Initialize the BatchSummary object.
+
+        Args:
+            connection (sqlite3.Connection): The connection whose changed rows are
+                counted.
+            key_pool (KeyPool): The API keys whose requests are counted.
+        """
+        self.__connection = connection
+        self.__key_pool = key_pool
+        self.__time_budget = None
+        self.__quota_budget = None
+        self.__started = time.monotonic()
+        self.__phase = None
+        self.__phase_started = self.__started
+        self.__rows_at = connection.total_changes
+        self.__requests_at = key_pool.get_requests()
+        self.__totals = {}
+        for phase in self.phases:
+            self.__totals[phase] = {"seconds": 0.0, "rows": 0, "requests": 0, "units": 0}
+
+    def start(self, time_budget: float | None, quota_budget: int | None) -> None:
+        """Start the run with its budgets.
+
+        The quota budget is set on the key pool, so the videos are planned
+            within it.
+
+        Args:
+            time_budget (float | None): The seconds of the run, None for no limit.
+            quota_budget (int | None): The quota units of the run, None for no
+                limit.
+        """
+        self.__time_budget = time_budget
+        self.__quota_budget = quota_budget
+        if quota_budget is not None:
+            self.__key_pool.limit(quota_budget)
+        self.__started = time.monotonic()
+        self.__phase = None
+        self.enter(self.phases[0])
+
+    def get_time_left(self) -> float | None:
+        """Returns the seconds left of the time budget.
+
+        Returns:
+            float | None: The seconds left, None without a time budget.
+        """
+        if self.__time_budget is None:
+            return None
+        return self.__time_budget - (time.monotonic() - self.__started)
+
+    def check_deadline(self) -> None:
+        """Check that the time budget is not used up.
+
+        Raises:
+            DeadlineReached: If the time budget is used up.
+        """
+        time_left = self.get_time_left()
+        if time_left is not None and time_left <= 0:
+            raise DeadlineReached()
+
+    def enter(self, phase: str | None) -> None:
+        """Add the time, rows and requests since the last call to the running
+            phase and start the next one.
+
+        Args:
+            phase (str | None): The phase that starts, one of phases, or None to
+                end the running phase.
+        """
+        now = time.monotonic()
+        rows = self.__connection.total_changes
+        requests = self.__key_pool.get_requests()
+        if self.__phase is not None:
+            totals = self.__totals[self.__phase]
+            totals["seconds"] += now - self.__phase_started
+            totals["rows"] += rows - self.__rows_at
+            for endpoint, number in requests.items():
+                number -= self.__requests_at.get(endpoint, 0)
+                totals["requests"] += number
+                totals["units"] += number * self.__key_pool.get_cost(endpoint)
+        self.__phase = phase
+        self.__phase_started = now
+        self.__rows_at = rows
+        self.__requests_at = requests
+
+    def get_summary(self, stopped_by: str) -> dict:
+        """Returns the summary of the run.
+
+        Args:
+            stopped_by (str): Why the run stopped, one of stop_reasons.
+
+        Returns:
+            dict: The budgets, the totals and the totals by phase, ready for
+                json.dumps.
+        """
+        self.enter(None)
+        summary = {
+            "stopped_by": stopped_by,
+            "time_budget": self.__time_budget,
+            "quota_budget": self.__quota_budget,
+            "seconds": round(time.monotonic() - self.__started, 3),
+            "rows": 0,
+            "requests": 0,
+            "units": 0,
+            "phases": {},
+        }
+        for phase, totals in self.__totals.items():
+            summary["phases"][phase] = dict(totals, seconds=round(totals["seconds"], 3))
+            for key in ["rows", "requests", "units"]:
+                summary[key] += totals[key]
+        return summary
+
+
+def merge_summaries(
+    summaries: list[dict], time_budget: float | None, quota_budget: int | None
+) -> dict:
+    """Merge the summaries of the worker processes of one batch run.
+
+    The merged summary has the keys of a single summary. It stopped by the most
+        severe reason of the workers, in the order of stop_reasons. Rows,
+        requests and units are added up, the seconds are those of the slowest
+        worker. The summaries of the workers are kept under workers.
+
+    Args:
+        summaries (list[dict]): The summaries of the workers.
+        time_budget (float | None): The seconds of the run, None for no limit.
+        quota_budget (int | None): The quota units of the run shared by the
+            workers, None for no limit.
+
+    Returns:
+        dict: The summary of the run with the summaries of the workers.
+    """
+    stopped_by = "done"
+    for summary in summaries:
+        if stop_reasons.index(summary["stopped_by"]) > stop_reasons.index(stopped_by):
+            stopped_by = summary["stopped_by"]
+    merged = {
+        "stopped_by": stopped_by,
+        "time_budget": time_budget,
+        "quota_budget": quota_budget,
+        "seconds": 0.0,
+        "rows": 0,
+        "requests": 0,
+        "units": 0,
+        "phases": {},
+        "workers": summaries,
+    }
+    for phase in BatchSummary.phases:
+        merged["phases"][phase] = {"seconds": 0.0, "rows": 0, "requests": 0, "units": 0}
+    for summary in summaries:
+        merged["seconds"] = max(merged["seconds"], summary["seconds"])
+        for key in ["rows", "requests", "units"]:
+            merged[key] += summary[key]
+        for phase, totals in summary["phases"].items():
+            phase_totals = merged["phases"][phase]
+            phase_totals["seconds"] = max(phase_totals["seconds"], totals["seconds"])
+            for key in ["rows", "requests", "units"]:
+                phase_totals[key] += totals[key]
+    return merged
@@ -0,0 +1,226 @@
+import gzip
+import http.client
+import socket
+from urllib.parse import urlencode, urlsplit
+import googleapiclient.errors
+from app.model import FastJsonModel
+
+
+class Response(dict):
+    """A class representing the status and headers of a response.
+
+    It has the attributes of an httplib2 response that
+    googleapiclient.errors.HttpError reads.
+
+    Attributes:
+        status (int): The HTTP status code.
+        reason (str): The HTTP reason phrase.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse) -> None:
+        """Initialize the Response object.
+
+        Args:
+            response (http.client.HTTPResponse): The response of the connection.
+        """
+        super().__init__((key.lower(), value) for key, value in response.getheaders())
+        self.status = response.status
+        self.reason = response.reason
+
+
+class Request:
+    """A class representing a prepared GET request of the YouTube Data API.
+
+    Attributes:
+        headers (dict[str, str]): The additional headers, e.g. If-None-Match.
+        __client (PooledClient): The client sending the request.
+        __endpoint (str): The endpoint of the request, e.g. commentThreads.
+        __params (dict): The query parameters of the request.
+    """
+
+    def __init__(self, client: "PooledClient", endpoint: str, params: dict) -> None:
+        """Initialize the Request object.
+
+        Args:
+            client (PooledClient): The client sending the request.
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            params (dict): The query parameters of the request.
+        """
+        self.headers = {}
+        self.__client = client
+        self.__endpoint = endpoint
+        self.__params = params
+
+    def execute(self) -> dict:
+        """Send the request.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the response is no success.
+
+        Returns:
+            dict: The decoded response.
+        """
+        return self.__client.get(self.__endpoint, self.__params, self.headers)
+
+
+class Resource:
+    """A class representing one endpoint of the YouTube Data API.
+
+    Attributes:
+        __client (PooledClient): The client sending the requests.
+        __endpoint (str): The endpoint, e.g. commentThreads.
+    """
+
+    def __init__(self, client: "PooledClient", endpoint: str) -> None:
+        """Initialize the Resource object.
+
+        Args:
+            client (PooledClient): The client sending the requests.
+            endpoint (str): The endpoint, e.g. commentThreads.
+        """
+        self.__client = client
+        self.__endpoint = endpoint
+
+    def list(self, **params) -> Request:
+        """Prepare a list request like googleapiclient does.
+
+        Args:
+            **params: The query parameters, e.g. part, videoId and pageToken.
+
+        Returns:
+            Request: The prepared request.
+        """
+        return Request(self.__client, self.__endpoint, params)
+
+
+class PooledClient:
+    """A thin client for the endpoints of the YouTube Data API used by the App.
+
+    It offers the same call sites as a client of googleapiclient.discovery, e.g.
+    ``client.commentThreads().list(...).execute()``, but skips loading the
+    discovery document and sends all requests over one keep-alive connection
+    of the standard library. A connection is not thread-safe, so every thread
+    needs its own client.
+
+    Attributes:
+        url (str): The URL of the YouTube Data API.
+        timeout (float): The seconds a connection waits for the server, like
+            the HTTP client of googleapiclient.
+        __api_key (str): The API key sent with every request.
+        __model (FastJsonModel): The JSON decoder of the responses.
+        __url (urllib.parse.SplitResult): The URL of the YouTube Data API used by
+            this client.
+        __connection (http.client.HTTPConnection | None): The keep-alive
+            connection, None until the first request.
+    """
+
+    url = "https://www.googleapis.com/youtube/v3/"
+    timeout = 60.0
+
+    def __init__(
+        self, api_key: str, model: FastJsonModel, url: str | None = None
+    ) -> None:
+        """Initialize the PooledClient object.
+
+        Args:
+            api_key (str): The API key sent with every request.
+            model (FastJsonModel): The JSON decoder of the responses.
+            url (str | None): The URL of the YouTube Data API, e.g. of a local
+                mock server, or None for the default.
+        """
+        self.__api_key = api_key
+        self.__model = model
+        url = url or self.url
+        if not url.endswith("/"):
+            url += "/"
+        self.__url = urlsplit(url)
+        self.__connection = None
+
+    def get_connection(self) -> http.client.HTTPConnection:
+        """Returns the keep-alive connection, opened on first use.
+
+        Returns:
+            http.client.HTTPConnection: The connection to the YouTube Data API.
+        """
+        if self.__connection is None:
+            if self.__url.scheme == "https":
+                self.__connection = http.client.HTTPSConnection(
+                    self.__url.netloc, timeout=self.timeout
+                )
+            else:
+                self.__connection = http.client.HTTPConnection(
+                    self.__url.netloc, timeout=self.timeout
+                )
+        return self.__connection
+
+    def get(self, endpoint: str, params: dict, headers: dict | None = None) -> dict:
+        """Send a GET request to an endpoint.
+
+        If the server closed the idle connection or did not answer within the
+            timeout, the request is sent once more over a new connection.
+
+        Args:
+            endpoint (str): The endpoint, e.g. commentThreads.
+            params (dict): The query parameters.
+            headers (dict | None): The additional headers, e.g. If-None-Match.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the response is no success.
+            socket.timeout: If the server did not answer twice.
+
+        Returns:
+            dict: The decoded response.
+        """
+        path = self.__url.path + endpoint + "?" + urlencode(
+            dict(params, key=self.__api_key)
+        )
+        headers = dict(headers or {}, **{"Accept-Encoding": "gzip"})
+        for attempt in range(2):
+            connection = self.get_connection()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, socket.timeout):
+                self.close()
+                if attempt == 1:
+                    raise
+
+        if response.getheader("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+        if response.status >= 300:
+            raise googleapiclient.errors.HttpError(
+                Response(response), content, uri=self.__url.geturl() + endpoint
+            )
+        return self.__model.deserialize(content)
+
+    def activities(self) -> Resource:
+        """Returns the activities endpoint."""
+        return Resource(self, "activities")
+
+    def channels(self) -> Resource:
+        """Returns the channels endpoint."""
+        return Resource(self, "channels")
+
+    def commentThreads(self) -> Resource:
+        """Returns the commentThreads endpoint."""
+        return Resource(self, "commentThreads")
+
+    def comments(self) -> Resource:
+        """Returns the comments endpoint."""
+        return Resource(self, "comments")
+
+    def playlistItems(self) -> Resource:
+        """Returns the playlistItems endpoint."""
+        return Resource(self, "playlistItems")
+
+    def videos(self) -> Resource:
+        """Returns the videos endpoint."""
+        return Resource(self, "videos")
+
+    def close(self) -> None:
+        """Close the keep-alive connection."""
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
@@ -10,9 +10,17 @@ CREATE TABLE IF NOT EXISTS yt_channel (
     channelTitle TEXT,
     last_time_fetched TEXT,
     about TEXT,
+    next_fetch_ts INTEGER DEFAULT 0,
+    uploads_playlist_id TEXT DEFAULT '',
+    subscriberCount INTEGER,
+    videoCount INTEGER,
+    viewCount INTEGER,
     PRIMARY KEY(channel_id)
 );
 
+CREATE INDEX IF NOT EXISTS yt_channel_next_fetch_ts
+    ON yt_channel (next_fetch_ts, channel_id);
+
 
 CREATE TABLE IF NOT EXISTS yt_video (
     id TEXT,
@@ -21,9 +29,20 @@ CREATE TABLE IF NOT EXISTS yt_video (
     last_time_fetched TEXT,
     description TEXT,
     channel_id TEXT,
+    last_time_swept TEXT DEFAULT '',
+    published_ts INTEGER,
+    next_fetch_ts INTEGER DEFAULT 0,
+    comment_velocity REAL DEFAULT 0,
+    viewCount INTEGER,
+    likeCount INTEGER,
+    commentCount INTEGER,
+    fetched_commentCount INTEGER,
     PRIMARY KEY(id)
 );
 
+CREATE INDEX IF NOT EXISTS yt_video_next_fetch_ts
+    ON yt_video (next_fetch_ts, id);
+
 CREATE TABLE IF NOT EXISTS yt_comment (
     id TEXT,
     authorChannelId TEXT,
@@ -36,7 +55,61 @@ CREATE TABLE IF NOT EXISTS yt_comment (
     totalReplyCount INTEGER,
     last_time_fetched TEXT,
     video_id TEXT,
+    expanded_replyCount INTEGER,
     PRIMARY KEY(id)
 );
 
+CREATE INDEX IF NOT EXISTS yt_comment_parent_id
+    ON yt_comment (parentId);
+
+
+CREATE TABLE IF NOT EXISTS yt_checkpoint (
+    kind TEXT,
+    id TEXT,
+    next_page_token TEXT,
+    last_time_updated TEXT,
+    PRIMARY KEY(kind, id)
+);
+
+
+CREATE TABLE IF NOT EXISTS yt_quota (
+    quota_day TEXT,
+    key_hash TEXT,
+    endpoint TEXT,
+    units INTEGER DEFAULT 0,
+    PRIMARY KEY(quota_day, key_hash, endpoint)
+);
+
+
+CREATE TABLE IF NOT EXISTS yt_etag (
+    key TEXT,
+    etag TEXT,
+    next_page_token TEXT,
+    last_used_ts INTEGER,
+    PRIMARY KEY(key)
+);
+
+CREATE INDEX IF NOT EXISTS yt_etag_last_used_ts
+    ON yt_etag (last_used_ts);
+
+
+CREATE TABLE IF NOT EXISTS yt_import (
+    path TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    byte_offset INTEGER,
+    content_hash TEXT,
+    PRIMARY KEY(path)
+);
+
+
+CREATE TABLE IF NOT EXISTS yt_lease (
+    kind TEXT,
+    id TEXT,
+    worker_id TEXT,
+    lease_until INTEGER,
+    PRIMARY KEY(kind, id)
+);
 
+CREATE INDEX IF NOT EXISTS yt_lease_worker_id
+    ON yt_lease (worker_id);
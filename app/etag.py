@@ -0,0 +1,126 @@
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlencode
+
+
+class EtagCache:
+    """A class representing the ETags of fetched pages persisted in the database.
+
+    A page is identified by its endpoint and request parameters, including the
+    page token. With the ETag of the previous response, a request is sent with
+    If-None-Match, and an unchanged page is answered with 304 Not Modified. The
+    token of the next page is cached as well, so paging continues without the
+    body of an unchanged page.
+
+    New and used ETags are collected until they are saved by the thread that
+    writes the database. The least recently used ETags beyond the size of the
+    cache are removed on save.
+
+    Attributes:
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        __size (int): The maximum number of cached ETags, 0 to disable the cache.
+        __unsaved (dict[str, tuple[str, str, int]]): The unsaved ETag, next page
+            token and time of use by key.
+        __lock (threading.Lock): The lock guarding the unsaved ETags.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, size: int) -> None:
+        """Initialize the EtagCache object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+            size (int): The maximum number of cached ETags, 0 to disable the cache.
+        """
+        self.__cursor = cursor
+        self.__size = size
+        self.__unsaved = {}
+        self.__lock = threading.Lock()
+
+    def is_enabled(self) -> bool:
+        """Check if ETags are cached.
+
+        Returns:
+            bool: True if the size of the cache is positive, False otherwise.
+        """
+        return self.__size > 0
+
+    def get_key(self, endpoint: str, params: dict) -> str:
+        """Returns the key of a page.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+            params (dict): The parameters of the request without the API key.
+
+        Returns:
+            str: The SHA-1 of the endpoint and the sorted parameters.
+        """
+        page = endpoint + "?" + urlencode(sorted(params.items()))
+        return hashlib.sha1(page.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, cursor: sqlite3.Cursor | None = None) -> tuple | None:
+        """Returns the cached ETag of a page.
+
+        Args:
+            key (str): The key of the page.
+            cursor (sqlite3.Cursor | None): The cursor of the calling thread, or
+                None for the cursor of the cache.
+
+        Returns:
+            tuple | None: The ETag and the token of the next page, or None if the
+                page is not cached.
+        """
+        with self.__lock:
+            if key in self.__unsaved:
+                return self.__unsaved[key][:2]
+        query = """SELECT etag, next_page_token
+                    FROM yt_etag
+                    WHERE key = ?
+                """
+        return (cursor or self.__cursor).execute(query, (key,)).fetchone()
+
+    def put(self, key: str, etag: str, next_page_token: str) -> None:
+        """Remember the ETag of a page, or that a cached ETag was used.
+
+        Args:
+            key (str): The key of the page.
+            etag (str): The ETag of the response.
+            next_page_token (str): The token of the next page.
+        """
+        with self.__lock:
+            self.__unsaved[key] = (
+                etag,
+                next_page_token,
+                int(datetime.now().timestamp()),
+            )
+
+    def save(self) -> None:
+        """Save the collected ETags and remove the least recently used ones."""
+        with self.__lock:
+            unsaved = self.__unsaved
+            self.__unsaved = {}
+        if len(unsaved) == 0:
+            return
+
+        rows = []
+        for key, (etag, next_page_token, last_used_ts) in unsaved.items():
+            rows.append((key, etag, next_page_token, last_used_ts))
+        query = """INSERT INTO yt_etag (key, etag, next_page_token, last_used_ts)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        etag = excluded.etag,
+                        next_page_token = excluded.next_page_token,
+                        last_used_ts = excluded.last_used_ts
+                """
+        self.__cursor.executemany(query, rows)
+
+        query = """DELETE FROM yt_etag
+                    WHERE last_used_ts < (
+                        SELECT last_used_ts
+                        FROM yt_etag
+                        ORDER BY last_used_ts DESC
+                        LIMIT 1 OFFSET ?
+                    )
+                """
+        self.__cursor.execute(query, (self.__size - 1,))
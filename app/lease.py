@@ -0,0 +1,172 @@
+import sqlite3
+import time
+
+
+class LeaseTable:
+    """A class representing the leases of channels, videos and reply expansions.
+
+    When several processes crawl the same database, every process claims the
+    channels, videos and comment threads it is about to fetch with a lease in
+    yt_lease. A lease belongs to a worker ID until its lease_until, so no two
+    processes fetch the same item at the same time. The leases of a running
+    process are renewed while it works on them. The leases of a crashed process
+    expire and are claimed by the other processes, or at once by the process
+    restarted with the same worker ID.
+
+    Without a worker ID, leases are disabled and every item is handed out as
+    before.
+
+    Attributes:
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        __worker_id (str): The ID of the process, empty to disable the leases.
+        __duration (int): The seconds a lease is valid after a claim or renewal.
+        __last_renewal (float): The time.monotonic() of the last renewal.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, worker_id: str, duration: int = 300) -> None:
+        """Initialize the LeaseTable object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+            worker_id (str): The ID of the process, empty to disable the leases.
+            duration (int): The seconds a lease is valid after a claim or renewal.
+        """
+        self.__cursor = cursor
+        self.__worker_id = worker_id
+        self.__duration = duration
+        self.__last_renewal = time.monotonic()
+
+    def is_enabled(self) -> bool:
+        """Check if leases are used.
+
+        Returns:
+            bool: True if the process has a worker ID, False otherwise.
+        """
+        return self.__worker_id != ""
+
+    def claim(self, kind: str, ids: list[str]) -> list[str]:
+        """Claim the leases of items that are free, expired or already claimed.
+
+        The claim has to be committed at once, so the other processes see it.
+
+        Args:
+            kind (str): Either channel, video or replies.
+            ids (list[str]): The IDs of the items.
+
+        Returns:
+            list[str]: The IDs of the claimed items, in the given order.
+        """
+        if not self.is_enabled() or len(ids) == 0:
+            return ids
+        now = int(time.time())
+        query = """INSERT INTO yt_lease (kind, id, worker_id, lease_until)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(kind, id) DO UPDATE SET
+                        worker_id = excluded.worker_id,
+                        lease_until = excluded.lease_until
+                    WHERE lease_until < ? OR worker_id = excluded.worker_id
+                """
+        self.__cursor.executemany(
+            query,
+            [(kind, id, self.__worker_id, now + self.__duration, now) for id in ids],
+        )
+
+        query = """SELECT id
+                    FROM yt_lease
+                    WHERE kind = ? AND worker_id = ?
+                """
+        claimed = set()
+        for row in self.__cursor.execute(query, (kind, self.__worker_id)):
+            claimed.add(row[0])
+        return [id for id in ids if id in claimed]
+
+    def get_leased(self, kind: str) -> set[str]:
+        """Returns the items leased by other processes.
+
+        Args:
+            kind (str): Either channel, video or replies.
+
+        Returns:
+            set[str]: The IDs of the items with a valid lease of another process.
+        """
+        if not self.is_enabled():
+            return set()
+        query = """SELECT id
+                    FROM yt_lease
+                    WHERE kind = ? AND worker_id != ? AND lease_until >= ?
+                """
+        leased = set()
+        for row in self.__cursor.execute(
+            query, (kind, self.__worker_id, int(time.time()))
+        ):
+            leased.add(row[0])
+        return leased
+
+    def is_held_by_others(self) -> bool:
+        """Check if another process holds a valid lease, e.g. while it fetches
+            channels whose videos become due.
+
+        Returns:
+            bool: True if another process holds a valid lease, False otherwise.
+        """
+        if not self.is_enabled():
+            return False
+        query = """SELECT 1
+                    FROM yt_lease
+                    WHERE worker_id != ? AND lease_until >= ?
+                    LIMIT 1
+                """
+        result = self.__cursor.execute(query, (self.__worker_id, int(time.time())))
+        return result.fetchone() is not None
+
+    def is_renewal_due(self) -> bool:
+        """Check if a third of the lease duration passed since the last renewal.
+
+        Returns:
+            bool: True if the leases should be renewed, False otherwise.
+        """
+        return (
+            self.is_enabled()
+            and time.monotonic() - self.__last_renewal >= self.__duration / 3
+        )
+
+    def renew(self) -> int:
+        """Extend all leases of the process in a single statement.
+
+        Returns:
+            int: The number of renewed leases.
+        """
+        if not self.is_enabled():
+            return 0
+        self.__last_renewal = time.monotonic()
+        query = """UPDATE yt_lease
+                    SET lease_until = ?
+                    WHERE worker_id = ?
+                """
+        self.__cursor.execute(
+            query, (int(time.time()) + self.__duration, self.__worker_id)
+        )
+        return self.__cursor.rowcount
+
+    def release(self, kind: str, id: str) -> None:
+        """Release the lease of a finished item.
+
+        Args:
+            kind (str): Either channel, video or replies.
+            id (str): The ID of the item.
+        """
+        if not self.is_enabled():
+            return
+        query = """DELETE FROM yt_lease
+                    WHERE kind = ? AND id = ? AND worker_id = ?
+                """
+        self.__cursor.execute(query, (kind, id, self.__worker_id))
+
+    def release_all(self) -> None:
+        """Release all leases of the process."""
+        if not self.is_enabled():
+            return
+        query = """DELETE FROM yt_lease
+                    WHERE worker_id = ?
+                """
+        self.__cursor.execute(query, (self.__worker_id,))
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+
+
+class ImportManifest:
+    """A class representing the imported state of the csv files persisted in the database.
+
+    For every imported file, its size, modification time, the byte offset after
+    the last complete line read and the SHA-256 of the content up to this offset
+    are stored. An unchanged file is skipped without reading it. A file that
+    only grew is read from the stored offset, if its content up to the offset is
+    unchanged. Any other file is read again from the start.
+
+    The manifest rows are written with the cursor of the App, so they are
+    committed together with the imported rows.
+
+    Attributes:
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor) -> None:
+        """Initialize the ImportManifest object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        """
+        self.__cursor = cursor
+
+    def get_entry(self, path: str) -> tuple | None:
+        """Returns the stored state of a file.
+
+        Args:
+            path (str): The absolute path of the file.
+
+        Returns:
+            tuple | None: The size, modification time in nanoseconds, offset and
+                content hash, or None if the file was never imported.
+        """
+        query = """SELECT size, mtime_ns, byte_offset, content_hash
+                    FROM yt_import
+                    WHERE path = ?
+                """
+        return self.__cursor.execute(query, (path,)).fetchone()
+
+    def read(self, path: str) -> list[str] | None:
+        """Read the new complete lines of a csv file and store its new state.
+
+        A last line without line break is still being written, it is read with
+            the next import.
+
+        Args:
+            path (str): The path of the csv file.
+
+        Returns:
+            list[str] | None: The new lines with their line breaks but without the
+                header, or None if the file did not change.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.get_entry(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return None
+
+        content_hash = hashlib.sha256()
+        offset = 0
+        file = open(path, "rb")
+        try:
+            if entry is not None and 0 < entry[2] <= stat.st_size:
+                # append-only if the content up to the offset is unchanged
+                content_hash.update(file.read(entry[2]))
+                if content_hash.hexdigest() == entry[3]:
+                    offset = entry[2]
+                else:
+                    content_hash = hashlib.sha256()
+                    file.seek(0)
+            content = file.read()
+        finally:
+            file.close()
+
+        end = content.rfind(b"\n") + 1
+        content_hash.update(content[:end])
+        lines = content[:end].decode("utf-8").splitlines(keepends=True)
+        if offset == 0:
+            lines = lines[1:]  # header
+
+        query = """INSERT INTO yt_import (path, size, mtime_ns, byte_offset, content_hash)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        size = excluded.size,
+                        mtime_ns = excluded.mtime_ns,
+                        byte_offset = excluded.byte_offset,
+                        content_hash = excluded.content_hash
+                """
+        self.__cursor.execute(
+            query,
+            (
+                path,
+                stat.st_size,
+                stat.st_mtime_ns,
+                offset + end,
+                content_hash.hexdigest(),
+            ),
+        )
+        return lines
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+import googleapiclient.model
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJsonModel(googleapiclient.model.JsonModel):
+    """A JSON model for the YouTube API client that decodes pages with orjson.
+
+    If orjson is not installed, the standard json module is used. The size of
+    every response body and the CPU time spent decoding it are counted, so the
+    effect of the fields masks and the decoder can be reported.
+
+    Attributes:
+        __pages (int): The number of decoded responses.
+        __bytes (int): The bytes of all decoded responses.
+        __parse_time (float): The CPU seconds spent decoding.
+        __lock (threading.Lock): The lock guarding the counters.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the FastJsonModel object."""
+        super().__init__(data_wrapper=False)
+        self.__pages = 0
+        self.__bytes = 0
+        self.__parse_time = 0.0
+        self.__lock = threading.Lock()
+
+    def get_decoder(self) -> str:
+        """Returns the name of the JSON decoder.
+
+        Returns:
+            str: Either orjson or json.
+        """
+        if orjson is None:
+            return "json"
+        return "orjson"
+
+    def decode(self, content: bytes | str) -> dict:
+        """Decode a response body.
+
+        Args:
+            content (bytes | str): The response body.
+
+        Returns:
+            dict: The decoded response.
+        """
+        if orjson is not None:
+            return orjson.loads(content)
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+    def deserialize(self, content: bytes | str) -> dict | str:
+        """Decode a response body and count its size and decode time.
+
+        Args:
+            content (bytes | str): The response body.
+
+        Returns:
+            dict | str: The decoded response, or the content if it is no JSON.
+        """
+        start = time.process_time()
+        try:
+            body = self.decode(content)
+        except ValueError:
+            return content
+        parse_time = time.process_time() - start
+
+        with self.__lock:
+            self.__pages += 1
+            self.__bytes += len(content)
+            self.__parse_time += parse_time
+        return body
+
+    def get_statistics(self) -> str:
+        """Returns the average size and decode time of the responses.
+
+        Returns:
+            str: The statistics for the console.
+        """
+        if self.__pages == 0:
+            return f"0 pages decoded with {self.get_decoder()}"
+        return (
+            f"{self.__pages} pages decoded with {self.get_decoder()}: "
+            f"{self.__bytes / self.__pages:,.0f} bytes/page, "
+            f"{self.__parse_time / self.__pages * 1000:.3f} ms CPU/page"
+        )
@@ -0,0 +1,331 @@
+import hashlib
+import sqlite3
+import threading
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+
+class QuotaExhausted(Exception):
+    """Raised when no API requests are left."""
+
+
+class Quota:
+    """A class representing the budget of API requests.
+
+    The budget is shared by all threads, so taking a request is guarded by a lock.
+
+    Attributes:
+        __number_of_requests (int): The daily number of API requests, -1 for unlimited.
+        __left (int): The number of remaining API requests, -1 for unlimited.
+        __lock (threading.Lock): The lock guarding the number of remaining requests.
+    """
+
+    def __init__(self, number_of_requests: int) -> None:
+        """Initialize the Quota object.
+
+        Args:
+            number_of_requests (int): The number of API requests, -1 for unlimited.
+        """
+        self.__number_of_requests = number_of_requests
+        self.__left = number_of_requests
+        self.__lock = threading.Lock()
+
+    def get_left(self) -> int:
+        """Returns the number of remaining API requests.
+
+        Returns:
+            int: The number of remaining API requests, negative for unlimited.
+        """
+        return self.__left
+
+    def take(self, units: int = 1) -> int:
+        """Take the units of one API request from the budget.
+
+        Args:
+            units (int): The quota cost of the request.
+
+        Raises:
+            QuotaExhausted: If fewer units than the cost are left.
+
+        Returns:
+            int: The number of remaining API requests, negative for unlimited.
+        """
+        with self.__lock:
+            if 0 <= self.__left < units:
+                raise QuotaExhausted()
+            if self.__left > 0:
+                self.__left -= units
+            return self.__left
+
+    def spend(self, units: int) -> None:
+        """Remove units spent before, e.g. by an earlier run on the same day.
+
+        Args:
+            units (int): The units already spent.
+        """
+        with self.__lock:
+            if self.__left > 0:
+                self.__left = max(self.__left - units, 0)
+
+    def exhaust(self) -> None:
+        """Set the number of remaining API requests to 0, e.g. after quotaExceeded."""
+        with self.__lock:
+            self.__left = 0
+
+    def reset(self) -> None:
+        """Restore the daily number of API requests."""
+        with self.__lock:
+            self.__left = self.__number_of_requests
+
+
+class KeyPool:
+    """A class representing several API keys with their own budget.
+
+    Every request is sent with the key that has the most requests left. A key
+    whose budget is used up, or which is rejected with quotaExceeded, drops out
+    of the rotation until the quota day of YouTube ends at midnight Pacific time.
+    The units spent per key and endpoint are collected until they are saved in
+    the QuotaLedger.
+
+    Attributes:
+        costs (dict[str, int]): The quota units of a request by endpoint.
+        timezone (ZoneInfo): The time zone of the quota day of YouTube.
+        __quotas (dict[str, Quota]): The budget by API key.
+        __day (date): The quota day of the budgets.
+        __spent (dict[tuple[str, str, str], int]): The unsaved units by quota day,
+            API key and endpoint.
+        __budget (Quota): The units of the run across all keys, unlimited unless
+            limited for a batch run.
+        __requests (dict[str, int]): The requests sent by endpoint.
+        __lock (threading.Lock): The lock guarding the choice of a key.
+    """
+
+    # https://developers.google.com/youtube/v3/determine_quota_cost
+    costs = {
+        "activities": 1,
+        "channels": 1,
+        "commentThreads": 1,
+        "comments": 1,
+        "playlistItems": 1,
+        "search": 100,
+        "videos": 1,
+    }
+    timezone = ZoneInfo("America/Los_Angeles")
+
+    def __init__(self, api_keys: list[str], number_of_requests: int) -> None:
+        """Initialize the KeyPool object.
+
+        Args:
+            api_keys (list[str]): The API keys.
+            number_of_requests (int): The daily number of API requests per key,
+                -1 for unlimited.
+        """
+        self.__quotas = {}
+        for api_key in api_keys:
+            self.__quotas[api_key] = Quota(number_of_requests)
+        self.__day = self.get_quota_day()
+        self.__spent = {}
+        self.__budget = Quota(-1)
+        self.__requests = {}
+        self.__lock = threading.Lock()
+
+    def get_quota_day(self) -> date:
+        """Returns the current quota day of YouTube.
+
+        Returns:
+            date: The current date in Pacific time.
+        """
+        return datetime.now(self.timezone).date()
+
+    def get_api_keys(self) -> list[str]:
+        """Returns all API keys of the pool.
+
+        Returns:
+            list[str]: The API keys.
+        """
+        return list(self.__quotas)
+
+    def get_cost(self, endpoint: str) -> int:
+        """Returns the quota units of a request.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+
+        Returns:
+            int: The quota units of the request.
+        """
+        return self.costs.get(endpoint, 1)
+
+    def spend(self, spent: dict[str, int]) -> None:
+        """Remove the units spent earlier on the current quota day.
+
+        Args:
+            spent (dict[str, int]): The spent units by API key.
+        """
+        for api_key, units in spent.items():
+            if api_key in self.__quotas:
+                self.__quotas[api_key].spend(units)
+
+    def limit(self, units: int) -> None:
+        """Limit the units of the run across all keys, e.g. for a batch run.
+
+        Args:
+            units (int): The units the run may spend, -1 for unlimited.
+        """
+        self.__budget = Quota(units)
+
+    def get_requests(self) -> dict[str, int]:
+        """Returns the requests sent since the start.
+
+        Returns:
+            dict[str, int]: The number of requests by endpoint.
+        """
+        with self.__lock:
+            return dict(self.__requests)
+
+    def pop_spent(self) -> dict[tuple[str, str, str], int]:
+        """Returns the units spent since the last call and forgets them.
+
+        Returns:
+            dict[tuple[str, str, str], int]: The units by quota day, API key and
+                endpoint.
+        """
+        with self.__lock:
+            spent = self.__spent
+            self.__spent = {}
+        return spent
+
+    def get_left(self) -> int:
+        """Returns the number of remaining API requests of all keys, at most the
+            budget of the run.
+
+        Returns:
+            int: The number of remaining API requests, negative if a key and the
+                run are unlimited.
+        """
+        left = 0
+        for quota in self.__quotas.values():
+            if quota.get_left() < 0:
+                left = -1
+                break
+            left += quota.get_left()
+        if left < 0 or 0 <= self.__budget.get_left() < left:
+            return self.__budget.get_left()
+        return left
+
+    def take(self, endpoint: str = "commentThreads") -> str:
+        """Take one API request from the key with the most requests left.
+
+        Args:
+            endpoint (str): The endpoint of the request, e.g. commentThreads.
+
+        Raises:
+            QuotaExhausted: If no key or the budget of the run has not enough
+                units left for the request.
+
+        Returns:
+            str: The API key to send the request with.
+        """
+        with self.__lock:
+            if self.get_quota_day() != self.__day:
+                self.__day = self.get_quota_day()
+                for quota in self.__quotas.values():
+                    quota.reset()
+
+            units = self.get_cost(endpoint)
+            api_key = None
+            most_left = units - 1
+            for key, quota in self.__quotas.items():
+                if quota.get_left() < 0:
+                    api_key = key
+                    break
+                if quota.get_left() > most_left:
+                    api_key = key
+                    most_left = quota.get_left()
+            if api_key is None:
+                raise QuotaExhausted()
+
+            self.__budget.take(units)
+            self.__quotas[api_key].take(units)
+            self.__requests[endpoint] = self.__requests.get(endpoint, 0) + 1
+            spent_key = (self.__day.isoformat(), api_key, endpoint)
+            self.__spent[spent_key] = self.__spent.get(spent_key, 0) + units
+            return api_key
+
+    def drop(self, api_key: str) -> None:
+        """Remove a key from the rotation until the next quota day.
+
+        Args:
+            api_key (str): The API key rejected with quotaExceeded.
+        """
+        self.__quotas[api_key].exhaust()
+
+
+class QuotaLedger:
+    """A class representing the spent quota units persisted in the database.
+
+    The units are stored per quota day, API key and endpoint, so a restart on the
+    same day continues with the units that are really left. The API keys are
+    stored as hashes only.
+
+    Attributes:
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor) -> None:
+        """Initialize the QuotaLedger object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        """
+        self.__cursor = cursor
+
+    def get_key_hash(self, api_key: str) -> str:
+        """Returns the hash an API key is stored with.
+
+        Args:
+            api_key (str): The API key.
+
+        Returns:
+            str: The first 16 hex digits of the SHA-256 of the key.
+        """
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def get_spent(self, quota_day: date, api_keys: list[str]) -> dict[str, int]:
+        """Returns the units spent on a quota day.
+
+        Args:
+            quota_day (date): The quota day.
+            api_keys (list[str]): The API keys.
+
+        Returns:
+            dict[str, int]: The spent units by API key.
+        """
+        query = """SELECT SUM(units)
+                    FROM yt_quota
+                    WHERE quota_day = ? AND key_hash = ?
+                """
+        spent = {}
+        for api_key in api_keys:
+            result = self.__cursor.execute(
+                query, (quota_day.isoformat(), self.get_key_hash(api_key))
+            ).fetchone()
+            spent[api_key] = result[0] or 0
+        return spent
+
+    def save(self, spent: dict[tuple[str, str, str], int]) -> None:
+        """Add spent units to the ledger.
+
+        Args:
+            spent (dict[tuple[str, str, str], int]): The units by quota day, API key
+                and endpoint.
+        """
+        rows = []
+        for (quota_day, api_key, endpoint), units in spent.items():
+            rows.append((quota_day, self.get_key_hash(api_key), endpoint, units))
+        query = """INSERT INTO yt_quota (quota_day, key_hash, endpoint, units)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(quota_day, key_hash, endpoint) DO UPDATE SET
+                        units = units + excluded.units
+                """
+        self.__cursor.executemany(query, rows)
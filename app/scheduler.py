@@ -0,0 +1,224 @@
+import sqlite3
+from datetime import datetime, timezone
+
+
+class Scheduler:
+    """A class representing the refresh schedule of the videos.
+
+    The schedule is a priority queue persisted in yt_video: every video is due at
+    its next_fetch_ts, and the due videos are handed out in that order. After a
+    fetch, the next due time follows from the observed comment velocity, so a
+    video with many new comments is refreshed more often than a dead one of the
+    same age.
+
+    Attributes:
+        refresh_intervals (list[list[int]]): The longest refresh interval of a video
+            by its age.
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        __target_new_comments (int): The number of new comments a fetch should find.
+        __min_refresh_interval (int): The shortest refresh interval in seconds.
+        __new_comments (dict[str, int]): The new comments per video of the running
+            fetches.
+        __previous_fetches (dict[str, str]): The previous fetch per video of the
+            running fetches, as UTC timestamp in the format of the YouTube API.
+    """
+
+    # age of a video in seconds up to which it is refreshed at least every n seconds
+    refresh_intervals = [
+        [3 * 24 * 60 * 60, 30 * 60],
+        [7 * 24 * 60 * 60, 1 * 24 * 60 * 60],
+        [30 * 24 * 60 * 60, 7 * 24 * 60 * 60],
+        [10 * 365 * 24 * 60 * 60, 30 * 24 * 60 * 60],
+    ]
+
+    def __init__(
+        self,
+        cursor: sqlite3.Cursor,
+        target_new_comments: int = 100,
+        min_refresh_interval: int = 5 * 60,
+    ) -> None:
+        """Initialize the Scheduler object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+            target_new_comments (int): The number of new comments a fetch should find.
+            min_refresh_interval (int): The shortest refresh interval in seconds.
+        """
+        self.__cursor = cursor
+        self.__target_new_comments = target_new_comments
+        self.__min_refresh_interval = min_refresh_interval
+        self.__new_comments = {}
+        self.__previous_fetches = {}
+
+    def get_refresh_interval_sql(self, fetched_ts: str) -> str:
+        """Returns an SQL expression for the longest refresh interval of a video.
+
+        The expression is NULL for videos older than the oldest refresh interval,
+            so they are never fetched again.
+
+        Args:
+            fetched_ts (str): An SQL expression for the epoch of the fetch.
+
+        Returns:
+            str: The SQL expression.
+        """
+        cases = ""
+        for age, interval in self.refresh_intervals:
+            cases += f" WHEN {fetched_ts} - published_ts < {age} THEN {interval}"
+        return f"(CASE{cases} END)"
+
+    def get_refresh_interval(self, age: int) -> int | None:
+        """Returns the longest refresh interval of a video.
+
+        Args:
+            age (int): The age of the video in seconds.
+
+        Returns:
+            int | None: The refresh interval in seconds, or None if the video is
+                never fetched again.
+        """
+        for max_age, interval in self.refresh_intervals:
+            if age < max_age:
+                return interval
+        return None
+
+    def get_due_videos(self, limit: int | None = None) -> list[str]:
+        """Returns the IDs of the due videos, the longest overdue first.
+
+        Videos leased by a running process are left out.
+
+        Args:
+            limit (int | None): The maximum number of videos, e.g. the requests
+                left in the quota, or None for all due videos.
+
+        Returns:
+            list[str]: The IDs of the due videos.
+        """
+        query = """SELECT id
+                    FROM yt_video
+                    WHERE next_fetch_ts <= ?
+                        AND NOT EXISTS (
+                            SELECT 1
+                            FROM yt_lease
+                            WHERE kind = 'video'
+                                AND yt_lease.id = yt_video.id
+                                AND lease_until >= ?
+                        )
+                    ORDER BY next_fetch_ts
+                    LIMIT ?
+                """
+        if limit is None:
+            limit = -1
+        now = int(datetime.now().timestamp())
+        result = self.__cursor.execute(query, (now, now, limit))
+        videos = []
+        for video in result.fetchall():
+            videos.append(video[0])
+        return videos
+
+    def observe(self, video_id: str, comments: list) -> None:
+        """Count the comments of a fetched page published since the previous fetch.
+
+        Args:
+            video_id (str): The ID of the video.
+            comments (list): The comment threads of one page.
+        """
+        if video_id not in self.__previous_fetches:
+            self.__previous_fetches[video_id] = self.get_previous_fetch(video_id)
+            self.__new_comments[video_id] = 0
+        previous_fetch = self.__previous_fetches[video_id]
+
+        new_comments = 0
+        for comment in comments:
+            snippet = comment["snippet"]["topLevelComment"]["snippet"]
+            if snippet["publishedAt"] > previous_fetch:
+                new_comments += 1
+            if "replies" in comment:
+                for reply in comment["replies"]["comments"]:
+                    if reply["snippet"]["publishedAt"] > previous_fetch:
+                        new_comments += 1
+        self.__new_comments[video_id] += new_comments
+
+    def get_previous_fetch(self, video_id: str) -> str:
+        """Returns the previous fetch of a video in the format of the YouTube API.
+
+        Args:
+            video_id (str): The ID of the video.
+
+        Returns:
+            str: The UTC timestamp of the previous fetch, or an empty string if the
+                video was never fetched.
+        """
+        query = """SELECT last_time_fetched
+                    FROM yt_video
+                    WHERE id = ?
+                """
+        result = self.__cursor.execute(query, (video_id,)).fetchone()
+        try:
+            previous_fetch = datetime.fromisoformat(result[0])
+        except (TypeError, ValueError):
+            return ""
+        return previous_fetch.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def schedule_video(self, video_id: str) -> None:
+        """Set the last fetch, the comment velocity and the next fetch of a fetched video.
+
+        The observed velocity is averaged with the stored one. The next fetch is
+            due when TARGET_NEW_COMMENTS_PER_FETCH new comments are expected, but
+            not earlier than MIN_REFRESH_INTERVAL and not later than the refresh
+            interval for the age of the video.
+
+        Args:
+            video_id (str): The ID of the video.
+        """
+        new_comments = self.__new_comments.pop(video_id, 0)
+        self.__previous_fetches.pop(video_id, None)
+
+        query = """SELECT published_ts, last_time_fetched, comment_velocity
+                    FROM yt_video
+                    WHERE id = ?
+                """
+        result = self.__cursor.execute(query, (video_id,)).fetchone()
+        if result is None:
+            return
+        published_ts, last_time_fetched, comment_velocity = result
+
+        now = datetime.now()
+        now_ts = int(now.timestamp())
+        try:
+            previous_fetch_ts = int(
+                datetime.fromisoformat(last_time_fetched).timestamp()
+            )
+        except (TypeError, ValueError):
+            previous_fetch_ts = published_ts
+
+        if previous_fetch_ts is not None and now_ts > previous_fetch_ts:
+            velocity = new_comments / (now_ts - previous_fetch_ts)
+            if comment_velocity:
+                velocity = (velocity + comment_velocity) / 2
+        else:
+            velocity = comment_velocity or 0
+
+        next_fetch_ts = None
+        if published_ts is not None:
+            max_refresh_interval = self.get_refresh_interval(now_ts - published_ts)
+            if max_refresh_interval is not None:
+                refresh_interval = max_refresh_interval
+                if velocity > 0:
+                    refresh_interval = min(
+                        max(
+                            int(self.__target_new_comments / velocity),
+                            self.__min_refresh_interval,
+                        ),
+                        max_refresh_interval,
+                    )
+                next_fetch_ts = now_ts + refresh_interval
+
+        query = """UPDATE yt_video
+                    SET
+                        last_time_fetched = ?,
+                        comment_velocity = ?,
+                        next_fetch_ts = ?
+                    WHERE id = ?
+                """
+        self.__cursor.execute(query, (now, velocity, next_fetch_ts, video_id))
@@ -0,0 +1,149 @@
+import csv
+import sqlite3
+from itertools import islice
+from typing import Iterable
+
+
+class SeedLoader:
+    """A class representing the bulk import of channel and video csv files.
+
+    The lines are parsed with the csv module, so quoted values may hold commas,
+    quotes and line breaks. The rows are streamed in chunks into a temporary
+    staging table and merged into yt_channel or yt_video with a single
+    ``INSERT ... SELECT``. A row whose number of values does not match the
+    columns, or without an ID, is rejected.
+
+    Attributes:
+        columns (dict[str, list[str]]): The columns of the csv files by kind.
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        __chunk_size (int): The number of rows per batch into the staging table.
+    """
+
+    columns = {
+        "channel": ["channel_id", "person", "channelTitle", "last_time_fetched", "about"],
+        "video": [
+            "id",
+            "title",
+            "publishedAt",
+            "last_time_fetched",
+            "description",
+            "channel_id",
+        ],
+    }
+
+    def __init__(self, cursor: sqlite3.Cursor, chunk_size: int = 10_000) -> None:
+        """Initialize the SeedLoader object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+            chunk_size (int): The number of rows per batch into the staging table.
+        """
+        self.__cursor = cursor
+        self.__chunk_size = chunk_size
+
+    def create_staging_table(self, kind: str) -> None:
+        """Create the empty staging table of a kind in the temporary database.
+
+        Args:
+            kind (str): Either channel or video.
+        """
+        self.__cursor.execute(
+            f"""CREATE TEMP TABLE IF NOT EXISTS yt_seed_{kind} (
+                    {", ".join(f"{column} TEXT" for column in self.columns[kind])}
+                )
+            """
+        )
+        self.__cursor.execute(f"DELETE FROM temp.yt_seed_{kind}")
+
+    def get_rows(self, kind: str, lines: Iterable[str], counts: dict[str, int]) -> Iterable[list]:
+        """Parse csv lines into valid rows and count the read and rejected rows.
+
+        Args:
+            kind (str): Either channel or video.
+            lines (Iterable[str]): The lines without the header, with or without
+                line breaks.
+            counts (dict[str, int]): The read and rejected rows, updated while the
+                rows are consumed.
+
+        Yields:
+            list: The values of a valid row.
+        """
+        number_of_columns = len(self.columns[kind])
+        for row in csv.reader(lines):
+            if len(row) == 0 or row == [""]:
+                continue
+            counts["read"] += 1
+            if len(row) != number_of_columns or row[0].strip() == "":
+                counts["rejected"] += 1
+                continue
+            yield row
+
+    def load(self, kind: str, lines: Iterable[str]) -> dict[str, int]:
+        """Import the lines of a channel or video csv file.
+
+        Known videos are kept unchanged. Empty values of a channel never
+            overwrite known values, and the last_time_fetched of a known channel
+            is kept.
+
+        Args:
+            kind (str): Either channel or video.
+            lines (Iterable[str]): The lines without the header, with or without
+                line breaks.
+
+        Returns:
+            dict[str, int]: The number of read, rejected and merged rows.
+        """
+        self.create_staging_table(kind)
+        counts = {"read": 0, "rejected": 0, "merged": 0}
+        rows = self.get_rows(kind, lines, counts)
+        query = f"""INSERT INTO temp.yt_seed_{kind}
+                    VALUES ({", ".join("?" * len(self.columns[kind]))})
+                """
+        while True:
+            chunk = list(islice(rows, self.__chunk_size))
+            if len(chunk) == 0:
+                break
+            self.__cursor.executemany(query, chunk)
+
+        if kind == "channel":
+            query = """INSERT INTO yt_channel
+                        (
+                            channel_id,
+                            person,
+                            channelTitle,
+                            last_time_fetched,
+                            about
+                        )
+                        SELECT channel_id, person, channelTitle, last_time_fetched, about
+                        FROM temp.yt_seed_channel
+                        WHERE true
+                        ON CONFLICT(channel_id) DO UPDATE SET
+                            person = COALESCE(NULLIF(excluded.person, ''), person),
+                            channelTitle = COALESCE(NULLIF(excluded.channelTitle, ''), channelTitle),
+                            about = COALESCE(NULLIF(excluded.about, ''), about)
+                    """
+        else:
+            query = """INSERT OR IGNORE INTO yt_video
+                        (
+                            id,
+                            title,
+                            publishedAt,
+                            last_time_fetched,
+                            description,
+                            channel_id,
+                            published_ts
+                        )
+                        SELECT
+                            id,
+                            title,
+                            publishedAt,
+                            last_time_fetched,
+                            description,
+                            channel_id,
+                            CAST(strftime('%s', publishedAt) AS INTEGER)
+                        FROM temp.yt_seed_video
+                    """
+        self.__cursor.execute(query)
+        counts["merged"] = self.__cursor.rowcount
+        self.__cursor.execute(f"DELETE FROM temp.yt_seed_{kind}")
+        return counts
@@ -0,0 +1,129 @@
+import configparser
+import sqlite3
+import time
+
+
+class StorageProfile:
+    """A class representing the SQLite settings of the database connections.
+
+    The settings are read from the STORAGE section of the configuration. A
+    missing value keeps the default of SQLite, so an older config.ini behaves as
+    before. PRAGMA statements take no parameters, so every value is checked
+    before it is used.
+
+    Attributes:
+        journal_modes (list[str]): The allowed values of JOURNAL_MODE.
+        synchronous_levels (list[str]): The allowed values of SYNCHRONOUS.
+        temp_stores (list[str]): The allowed values of TEMP_STORE.
+        __pragmas (list[str]): The PRAGMA statements run on every connection.
+        __commit_interval (float): The longest time in seconds between two group
+            commits, 0 to commit every time.
+        __commit_rows (int): The number of changed rows that forces a group commit,
+            0 for no limit.
+        __busy_timeout (float | None): The seconds a connection waits for a lock
+            held by another process, None for the default of sqlite3.
+    """
+
+    journal_modes = ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]
+    synchronous_levels = ["OFF", "NORMAL", "FULL", "EXTRA"]
+    temp_stores = ["DEFAULT", "FILE", "MEMORY"]
+
+    def __init__(self, config: configparser.ConfigParser) -> None:
+        """Initialize the StorageProfile object.
+
+        Args:
+            config (configparser.ConfigParser): The configuration object for the
+                application.
+
+        Raises:
+            ValueError: If a value of the STORAGE section is not allowed.
+        """
+        self.__pragmas = []
+        if "STORAGE" not in config:
+            config = configparser.ConfigParser()
+            config.add_section("STORAGE")
+        storage = config["STORAGE"]
+
+        journal_mode = storage.get("JOURNAL_MODE", "").upper()
+        if journal_mode != "":
+            self.check_value("JOURNAL_MODE", journal_mode, self.journal_modes)
+            self.__pragmas.append(f"PRAGMA journal_mode = {journal_mode}")
+
+        synchronous = storage.get("SYNCHRONOUS", "").upper()
+        if synchronous != "":
+            self.check_value("SYNCHRONOUS", synchronous, self.synchronous_levels)
+            self.__pragmas.append(f"PRAGMA synchronous = {synchronous}")
+
+        temp_store = storage.get("TEMP_STORE", "").upper()
+        if temp_store != "":
+            self.check_value("TEMP_STORE", temp_store, self.temp_stores)
+            self.__pragmas.append(f"PRAGMA temp_store = {temp_store}")
+
+        for key, pragma in (("MMAP_SIZE", "mmap_size"), ("CACHE_SIZE", "cache_size")):
+            value = storage.get(key, "")
+            if value != "":
+                self.__pragmas.append(f"PRAGMA {pragma} = {int(value)}")
+
+        self.__commit_interval = storage.getfloat("COMMIT_INTERVAL", fallback=0)
+        self.__commit_rows = storage.getint("COMMIT_ROWS", fallback=0)
+        self.__busy_timeout = storage.getfloat("BUSY_TIMEOUT", fallback=None)
+
+    def check_value(self, key: str, value: str, allowed: list[str]) -> None:
+        """Check if a value of the STORAGE section is allowed.
+
+        Args:
+            key (str): The key of the value.
+            value (str): The value in upper case.
+            allowed (list[str]): The allowed values.
+
+        Raises:
+            ValueError: If the value is not allowed.
+        """
+        if value not in allowed:
+            raise ValueError(f"{key}={value} is not one of {', '.join(allowed)}")
+
+    def connect(self, db_path: str, **kwargs) -> sqlite3.Connection:
+        """Connect to the database and apply the settings.
+
+        Transactions begin with BEGIN IMMEDIATE, so a write waits up to
+            BUSY_TIMEOUT seconds for the lock of another process instead of
+            failing on a snapshot read before the lock was taken.
+
+        Args:
+            db_path (str): The path of the SQLite database.
+            **kwargs: Further arguments of sqlite3.connect.
+
+        Returns:
+            sqlite3.Connection: The connection to the SQLite database.
+        """
+        if self.__busy_timeout is not None:
+            kwargs.setdefault("timeout", self.__busy_timeout)
+        kwargs.setdefault("isolation_level", "IMMEDIATE")
+        connection = sqlite3.connect(db_path, **kwargs)
+        for pragma in self.__pragmas:
+            connection.execute(pragma)
+        return connection
+
+    def get_pragmas(self) -> list[str]:
+        """Returns the PRAGMA statements run on every connection.
+
+        Returns:
+            list[str]: The PRAGMA statements.
+        """
+        return list(self.__pragmas)
+
+    def is_commit_due(self, last_commit: float, changed_rows: int) -> bool:
+        """Check if a group commit is due.
+
+        Args:
+            last_commit (float): The time.monotonic() of the last commit.
+            changed_rows (int): The number of rows changed since the last commit.
+
+        Returns:
+            bool: True if the interval passed or enough rows changed, False otherwise.
+        """
+        if self.__commit_interval <= 0:
+            return True
+        if 0 < self.__commit_rows <= changed_rows:
+            return True
+        return time.monotonic() - last_commit >= self.__commit_interval
@@ -0,0 +1,197 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from datetime import datetime
+
+
+class SeedWatcher:
+    """A class representing the watch of the import directories for changed csv files.
+
+    On Linux, the directories are watched with inotify, so a csv file that was
+    written, appended to or moved into a directory is reported within a moment
+    without listing the directories. Elsewhere, or if inotify is not available,
+    the directories are polled for a changed size or modification time.
+
+    The changes are collected by a background thread and taken by the thread
+    that writes the database.
+
+    Attributes:
+        event_mask (int): The inotify events of a changed file, IN_MODIFY,
+            IN_CLOSE_WRITE and IN_MOVED_TO.
+        __directories (list[str]): The watched directories.
+        __poll_interval (float): The seconds between two polls of the fallback.
+        __changed (set[str]): The paths of the changed csv files.
+        __lock (threading.Lock): The lock guarding the changed paths.
+        __has_changed (threading.Event): The event set while changed paths are
+            waiting to be taken.
+        __stop (threading.Event): The event that stops the background thread.
+        __thread (threading.Thread | None): The background thread, None until
+            started.
+    """
+
+    event_mask = 0x00000002 | 0x00000008 | 0x00000080
+
+    def __init__(self, directories: list[str], poll_interval: float = 2.0) -> None:
+        """Initialize the SeedWatcher object.
+
+        Args:
+            directories (list[str]): The directories to watch.
+            poll_interval (float): The seconds between two polls of the fallback.
+        """
+        self.__directories = directories
+        self.__poll_interval = poll_interval
+        self.__changed = set()
+        self.__lock = threading.Lock()
+        self.__has_changed = threading.Event()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def start(self) -> None:
+        """Start watching in a background thread."""
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        watches = self.add_inotify_watches()
+        if watches is None:
+            print(f"{datetime.now()} watch import directories: polling")
+            self.__thread = threading.Thread(target=self.poll, daemon=True)
+        else:
+            print(f"{datetime.now()} watch import directories: inotify")
+            self.__thread = threading.Thread(
+                target=self.read_inotify_events, args=watches, daemon=True
+            )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def pop_changed(self) -> list[str]:
+        """Returns and forgets the paths of the csv files changed since the last call.
+
+        Returns:
+            list[str]: The paths of the changed csv files.
+        """
+        with self.__lock:
+            changed = sorted(self.__changed)
+            self.__changed = set()
+            self.__has_changed.clear()
+        return changed
+
+    def wait(self, timeout: float) -> bool:
+        """Wait until a csv file changed.
+
+        Args:
+            timeout (float): The longest time to wait in seconds.
+
+        Returns:
+            bool: True if a csv file changed, False after the timeout.
+        """
+        return self.__has_changed.wait(timeout)
+
+    def add_changed(self, directory: str, name: str) -> None:
+        """Remember a changed file if it is a csv file.
+
+        Args:
+            directory (str): The watched directory of the file.
+            name (str): The name of the file.
+        """
+        if ".csv" in name:
+            with self.__lock:
+                self.__changed.add(os.path.join(directory, name))
+                self.__has_changed.set()
+
+    def add_inotify_watches(self) -> tuple[int, dict[int, str]] | None:
+        """Create an inotify instance watching all directories.
+
+        Returns:
+            tuple[int, dict[int, str]] | None: The file descriptor of the inotify
+                instance and the directories by watch descriptor, or None if
+                inotify is not available.
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError, TypeError):
+            return None
+        if fd < 0:
+            return None
+
+        directories = {}
+        for directory in self.__directories:
+            wd = libc.inotify_add_watch(
+                fd, os.fsencode(directory), ctypes.c_uint32(self.event_mask)
+            )
+            if wd < 0:
+                os.close(fd)
+                return None
+            directories[wd] = directory
+        return fd, directories
+
+    def read_inotify_events(self, fd: int, directories: dict[int, str]) -> None:
+        """Collect the changed files from inotify events until stopped.
+
+        Args:
+            fd (int): The file descriptor of the inotify instance.
+            directories (dict[int, str]): The directories by watch descriptor.
+        """
+        header = struct.Struct("iIII")
+        try:
+            while not self.__stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    buffer = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                position = 0
+                while position < len(buffer):
+                    wd, _, _, length = header.unpack_from(buffer, position)
+                    position += header.size
+                    name = buffer[position:position + length].rstrip(b"\0")
+                    position += length
+                    if wd in directories:
+                        self.add_changed(directories[wd], os.fsdecode(name))
+        finally:
+            os.close(fd)
+
+    def get_snapshot(self) -> dict[tuple[str, str], tuple[int, int]]:
+        """Returns the size and modification time of the csv files.
+
+        Returns:
+            dict[tuple[str, str], tuple[int, int]]: The size and modification time
+                in nanoseconds by directory and file name.
+        """
+        snapshot = {}
+        for directory in self.__directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if ".csv" not in entry.name:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[(directory, entry.name)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self) -> None:
+        """Collect the changed files by polling the directories until stopped."""
+        snapshot = self.get_snapshot()
+        while not self.__stop.wait(self.__poll_interval):
+            current = self.get_snapshot()
+            for (directory, name), state in current.items():
+                if snapshot.get((directory, name)) != state:
+                    self.add_changed(directory, name)
+            snapshot = current
@@ -0,0 +1,299 @@
+import sqlite3
+from datetime import datetime
+
+
+class Writer:
+    """A class representing the batched write path into the database.
+
+    Instead of one SELECT followed by one INSERT or UPDATE per row, every batch
+    of fetched items is written with a single ``executemany`` using
+    ``INSERT ... ON CONFLICT DO UPDATE``.
+
+    Attributes:
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor) -> None:
+        """Initialize the Writer object.
+
+        Args:
+            cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+        """
+        self.__cursor = cursor
+
+    def get_comment_row(self, comment: dict) -> tuple:
+        """Convert a fetched comment or comment thread into a yt_comment row.
+
+        Args:
+            comment (dict): A comment or comment thread from the YouTube API.
+
+        Returns:
+            tuple: The values in the column order of yt_comment.
+        """
+        if "youtube#commentThread" in comment["kind"]:
+            snippet = comment["snippet"]["topLevelComment"]["snippet"]
+            id = comment["snippet"]["topLevelComment"]["id"]
+            # the replies are counted on the thread, not on its top level comment
+            total_reply_count = comment["snippet"].get("totalReplyCount", 0)
+        else:
+            snippet = comment["snippet"]
+            id = comment["id"]
+            total_reply_count = 0
+
+        try:
+            author_channel_id = snippet["authorChannelId"]["value"]
+        except KeyError:
+            author_channel_id = ""
+
+        return (
+            id,
+            author_channel_id,
+            snippet["authorDisplayName"],
+            snippet.get("parentId", ""),
+            snippet["publishedAt"][:19] + ".000000",
+            snippet["updatedAt"][:19] + ".000000",
+            snippet["textOriginal"],
+            snippet["likeCount"],
+            total_reply_count,
+            datetime.now(),
+            snippet["videoId"],
+        )
+
+    def get_video_row(self, video: dict) -> tuple:
+        """Convert a fetched playlist item of an uploads playlist into a yt_video row.
+
+        Args:
+            video (dict): A playlist item from the YouTube API.
+
+        Returns:
+            tuple: The values in the column order of yt_video.
+        """
+        content_details = video["contentDetails"]
+        snippet = video["snippet"]
+        video_id = content_details["videoId"]
+        # playlist items are published in the playlist at publishedAt
+        published = content_details.get("videoPublishedAt", snippet["publishedAt"])
+
+        published_at = datetime.fromisoformat(published.replace("Z", "+00:00"))
+        return (
+            video_id,
+            snippet["title"],
+            published[:19] + ".000000",
+            "",
+            snippet["description"],
+            snippet["channelId"],
+            int(published_at.timestamp()),
+        )
+
+    def flatten_comment_threads(self, threads: list[dict]) -> list[dict]:
+        """Flatten comment threads into top level comments followed by their replies.
+
+        Args:
+            threads (list[dict]): The comment threads from the YouTube API.
+
+        Returns:
+            list[dict]: The top level comments and replies.
+        """
+        comments = []
+        for thread in threads:
+            if "snippet" in thread:
+                comments.append(thread)
+            if "replies" in thread:
+                comments.extend(thread["replies"]["comments"])
+        return comments
+
+    def upsert_comments(
+        self, comments: list[dict], skip_unchanged: bool = True
+    ) -> int:
+        """Insert or update comments in a single batch.
+
+        A known comment is only rewritten if its updatedAt, likeCount or
+            totalReplyCount changed, so last_time_fetched of a comment is the last
+            time it changed. When the comments of a video were last checked is
+            kept once per video in yt_video.
+
+        Args:
+            comments (list[dict]): Comments or comment threads from the YouTube API.
+            skip_unchanged (bool): False to rewrite known comments even if they did
+                not change, e.g. to repair them after a parser fix.
+
+        Returns:
+            int: The number of rows inserted or changed.
+        """
+        rows = [self.get_comment_row(comment) for comment in comments]
+        query = """INSERT INTO yt_comment (
+                    id,
+                    authorChannelId,
+                    authorDisplayName,
+                    parentId,
+                    publishedAt,
+                    updatedAt,
+                    textOriginal,
+                    likecount,
+                    totalReplyCount,
+                    last_time_fetched,
+                    video_id
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        authorChannelId = excluded.authorChannelId,
+                        authorDisplayName = excluded.authorDisplayName,
+                        parentId = excluded.parentId,
+                        publishedAt = excluded.publishedAt,
+                        updatedAt = excluded.updatedAt,
+                        textOriginal = excluded.textOriginal,
+                        likecount = excluded.likecount,
+                        totalReplyCount = excluded.totalReplyCount,
+                        last_time_fetched = excluded.last_time_fetched,
+                        video_id = excluded.video_id
+                """
+        if skip_unchanged:
+            query += """WHERE
+                        updatedAt IS NOT excluded.updatedAt
+                        OR likecount IS NOT excluded.likecount
+                        OR totalReplyCount IS NOT excluded.totalReplyCount
+                """
+        self.__cursor.executemany(query, rows)
+        return self.__cursor.rowcount
+
+    def upsert_comment_threads(
+        self, threads: list[dict], skip_unchanged: bool = True
+    ) -> int:
+        """Insert or update comment threads including their replies in a single batch.
+
+        Args:
+            threads (list[dict]): The comment threads from the YouTube API.
+            skip_unchanged (bool): False to rewrite known comments even if they did
+                not change.
+
+        Returns:
+            int: The number of rows inserted or changed.
+        """
+        return self.upsert_comments(
+            self.flatten_comment_threads(threads), skip_unchanged
+        )
+
+    def upsert_videos(self, videos: list[dict]) -> int:
+        """Insert or update videos in a single batch.
+
+        The last_time_fetched and next_fetch_ts of a known video are kept, so
+            that the comments of a video are still scheduled as before.
+
+        Args:
+            videos (list[dict]): Playlist items of uploads playlists from the
+                YouTube API.
+
+        Returns:
+            int: The number of rows written.
+        """
+        rows = [self.get_video_row(video) for video in videos]
+        query = """INSERT INTO yt_video
+                    (
+                        id,
+                        title,
+                        publishedAt,
+                        last_time_fetched,
+                        description,
+                        channel_id,
+                        published_ts
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        title = excluded.title,
+                        publishedAt = excluded.publishedAt,
+                        description = excluded.description,
+                        channel_id = excluded.channel_id,
+                        published_ts = excluded.published_ts
+                """
+        self.__cursor.executemany(query, rows)
+        return len(rows)
+
+    def get_statistic(self, item: dict, name: str) -> int | None:
+        """Returns a statistic of a fetched video or channel.
+
+        Args:
+            item (dict): A video or channel from the YouTube API.
+            name (str): The name of the statistic, e.g. commentCount.
+
+        Returns:
+            int | None: The statistic, or None if it is hidden or disabled.
+        """
+        try:
+            return int(item["statistics"][name])
+        except (KeyError, ValueError):
+            return None
+
+    def update_video_metadata(self, videos: list[dict]) -> int:
+        """Update the metadata and statistics of known videos in a single batch.
+
+        Args:
+            videos (list[dict]): Videos from videos.list of the YouTube API.
+
+        Returns:
+            int: The number of rows written.
+        """
+        rows = []
+        for video in videos:
+            rows.append(
+                (
+                    video["snippet"]["title"],
+                    video["snippet"]["description"],
+                    self.get_statistic(video, "viewCount"),
+                    self.get_statistic(video, "likeCount"),
+                    self.get_statistic(video, "commentCount"),
+                    video["id"],
+                )
+            )
+        query = """UPDATE yt_video
+                    SET
+                        title = ?,
+                        description = ?,
+                        viewCount = ?,
+                        likeCount = ?,
+                        commentCount = ?
+                    WHERE id = ?
+                """
+        self.__cursor.executemany(query, rows)
+        return len(rows)
+
+    def update_channel_metadata(self, channels: list[dict]) -> int:
+        """Update the uploads playlist and statistics of known channels in a single batch.
+
+        The title and the about text from the channel files are kept, only
+            empty values are filled.
+
+        Args:
+            channels (list[dict]): Channels from channels.list of the YouTube API.
+
+        Returns:
+            int: The number of rows written.
+        """
+        rows = []
+        for channel in channels:
+            try:
+                uploads = channel["contentDetails"]["relatedPlaylists"]["uploads"]
+            except KeyError:
+                uploads = ""
+            rows.append(
+                (
+                    channel["snippet"]["title"],
+                    channel["snippet"]["description"],
+                    uploads,
+                    self.get_statistic(channel, "subscriberCount"),
+                    self.get_statistic(channel, "videoCount"),
+                    self.get_statistic(channel, "viewCount"),
+                    channel["id"],
+                )
+            )
+        query = """UPDATE yt_channel
+                    SET
+                        channelTitle = COALESCE(NULLIF(channelTitle, ''), ?),
+                        about = COALESCE(NULLIF(about, ''), ?),
+                        uploads_playlist_id = ?,
+                        subscriberCount = ?,
+                        videoCount = ?,
+                        viewCount = ?
+                    WHERE channel_id = ?
+                """
+        self.__cursor.executemany(query, rows)
+        return len(rows)
@@ -0,0 +1,573 @@
+import argparse
+import configparser
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta
+from app.model import FastJsonModel, orjson
+from app.scheduler import Scheduler
+from app.storage import StorageProfile
+from app.writer import Writer
+
+
+
+class Benchmark:
+    """A class that measures the throughput of the application on synthetic data.
+
+    Every benchmark works on a temporary SQLite database created from the DDL,
+    so no API key and no quota is needed.
+
+    Attributes:
+        __directory (tempfile.TemporaryDirectory): The directory of the database.
+        __connection (sqlite3.Connection): The connection to the SQLite database.
+        __cursor (sqlite3.Cursor): The cursor for executing SQL queries.
+    """
+
+    def __init__(self, ddl_path: str = 'app/ddl.sql') -> None:
+        """Initializes the Benchmark object and creates the database.
+
+        Args:
+            ddl_path (str): The path of the DDL file.
+        """
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__connection = sqlite3.connect(
+            os.path.join(self.__directory.name, 'benchmark.db')
+        )
+        self.__cursor = self.__connection.cursor()
+        ddl = open(ddl_path, 'r', encoding='utf-8')
+        self.__cursor.executescript(ddl.read())
+        ddl.close()
+
+    def close(self) -> None:
+        """Closes the database and removes the temporary directory."""
+        self.__cursor.close()
+        self.__connection.close()
+        self.__directory.cleanup()
+
+    def make_comment(self, number: int, video_id: str) -> dict:
+        """Create a synthetic comment shaped like a YouTube API response.
+
+        Args:
+            number (int): The number used for the comment ID.
+            video_id (str): The ID of the video.
+
+        Returns:
+            dict: The synthetic comment.
+        """
+        return {
+            'kind': 'youtube#comment',
+            'id': f'comment{number:012d}',
+            'snippet': {
+                'authorChannelId': {'value': f'author{number % 50_000}'},
+                'authorDisplayName': f'Author {number % 50_000}',
+                'publishedAt': '2024-03-01T12:00:00Z',
+                'updatedAt': '2024-03-01T12:00:00Z',
+                'textOriginal': 'Lorem ipsum dolor sit amet ' * 4,
+                'likeCount': number % 97,
+                'videoId': video_id,
+            },
+        }
+
+    def fill_comments(self, number_of_comments: int, page_size: int = 10_000) -> None:
+        """Fill yt_comment with synthetic comments.
+
+        Args:
+            number_of_comments (int): The number of comments to insert.
+            page_size (int): The number of comments per batch.
+        """
+        writer = Writer(self.__cursor)
+        for start in range(0, number_of_comments, page_size):
+            end = min(start + page_size, number_of_comments)
+            writer.upsert_comments(
+                [self.make_comment(i, f'video{i // 1_000}') for i in range(start, end)]
+            )
+        self.__connection.commit()
+
+    def fill_videos(self, number_of_videos: int) -> None:
+        """Fill yt_video with synthetic videos published within the last 10 years.
+
+        The last fetch of a video lies within twice its refresh interval, so about
+            half of the videos are due.
+
+        Args:
+            number_of_videos (int): The number of videos to insert.
+        """
+        now = int(datetime.now().timestamp())
+        # published_ts, then the last fetch within twice the refresh interval of
+        # Scheduler.refresh_intervals, then the next fetch
+        query = """WITH RECURSIVE
+                    numbers(i) AS (
+                        SELECT 0 UNION ALL SELECT i + 1 FROM numbers WHERE i + 1 < :n
+                    ),
+                    published(i, published_ts) AS (
+                        SELECT i, :now - (i * 7919) % (10 * 365 * 86400) FROM numbers
+                    ),
+                    intervals(i, published_ts, interval) AS (
+                        SELECT i, published_ts, CASE
+                            WHEN :now - published_ts < 3 * 86400 THEN 30 * 60
+                            WHEN :now - published_ts < 7 * 86400 THEN 86400
+                            WHEN :now - published_ts < 30 * 86400 THEN 7 * 86400
+                            ELSE 30 * 86400
+                        END
+                        FROM published
+                    ),
+                    fetched(i, published_ts, interval, fetched_ts) AS (
+                        SELECT i, published_ts, interval, :now - (i * 104729) % (2 * interval)
+                        FROM intervals
+                    )
+                    INSERT INTO yt_video (
+                        id,
+                        title,
+                        publishedAt,
+                        last_time_fetched,
+                        description,
+                        channel_id,
+                        published_ts,
+                        next_fetch_ts
+                    )
+                    SELECT
+                        printf('video%011d', i),
+                        'title',
+                        strftime('%Y-%m-%dT%H:%M:%S.000000', published_ts, 'unixepoch'),
+                        strftime('%Y-%m-%d %H:%M:%S.000000', fetched_ts, 'unixepoch'),
+                        'description',
+                        printf('channel%06d', i % 10000),
+                        published_ts,
+                        fetched_ts + interval
+                    FROM fetched
+                """
+        self.__cursor.execute(query, {'n': number_of_videos, 'now': now})
+        self.__connection.commit()
+
+    def schedule(self, number_of_videos: int, repeat: int) -> dict:
+        """Compare the former strftime scans of get_videos with Scheduler.get_due_videos.
+
+        The plan of get_due_videos is explained from the statement it runs.
+
+        Args:
+            number_of_videos (int): The size of the synthetic database.
+            repeat (int): The number of times each query is run.
+
+        Returns:
+            dict: The seconds per scheduling query, the due videos and the query plans.
+        """
+        self.fill_videos(number_of_videos)
+        legacy_query = """SELECT id
+            FROM yt_video
+            WHERE
+                (
+                    (publishedAt BETWEEN ? AND ?)
+                    AND
+                    strftime('%s', ?) - strftime('%s', last_time_fetched) > ?
+                )
+                OR
+                    last_time_fetched = ""
+        """
+        deltas = [
+            [timedelta(days=3), timedelta(minutes=15), 30 * 60],
+            [timedelta(days=7), timedelta(days=3), 1 * 24 * 60 * 60],
+            [timedelta(days=30), timedelta(days=7), 7 * 24 * 60 * 60],
+            [timedelta(days=10 * 365), timedelta(days=30), 30 * 24 * 60 * 60],
+        ]
+        scheduler = Scheduler(self.__cursor)
+
+        results = {}
+        start = time.perf_counter()
+        for _ in range(repeat):
+            videos = set()
+            for delta in deltas:
+                now = datetime.now()
+                result = self.__cursor.execute(
+                    legacy_query, (now - delta[0], now - delta[1], now, delta[2])
+                )
+                for video in result.fetchall():
+                    videos.add(video[0])
+        results['before'] = (time.perf_counter() - start) / repeat
+        results['before_videos'] = len(videos)
+
+        statements = []
+        self.__connection.set_trace_callback(statements.append)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            videos = set(scheduler.get_due_videos())
+        results['after'] = (time.perf_counter() - start) / repeat
+        results['after_videos'] = len(videos)
+        self.__connection.set_trace_callback(None)
+
+        result = self.__cursor.execute(
+            'EXPLAIN QUERY PLAN ' + legacy_query, (now, now, now, 0)
+        )
+        results['before_plan'] = result.fetchall()[-1][-1]
+        result = self.__cursor.execute('EXPLAIN QUERY PLAN ' + statements[-1])
+        results['after_plan'] = ' / '.join(row[-1] for row in result.fetchall())
+        return results
+
+    def write_legacy(self, comments: list[dict]) -> None:
+        """Write comments row by row like the former is_comment_new/insert/update path.
+
+        Args:
+            comments (list[dict]): The comments to write.
+        """
+        writer = Writer(self.__cursor)
+        for comment in comments:
+            row = writer.get_comment_row(comment)
+            result = self.__cursor.execute(
+                'SELECT id FROM yt_comment WHERE id = ?', (row[0],)
+            )
+            if result.fetchone() is None:
+                self.__cursor.execute(
+                    """INSERT INTO yt_comment (
+                        id, authorChannelId, authorDisplayName, parentId,
+                        publishedAt, updatedAt, textOriginal, likeCount,
+                        totalReplyCount, last_time_fetched, video_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    row,
+                )
+            else:
+                self.__cursor.execute(
+                    """UPDATE yt_comment SET
+                        authorChannelId = ?, authorDisplayName = ?, parentId = ?,
+                        publishedAt = ?, updatedAt = ?, textOriginal = ?,
+                        likeCount = ?, totalReplyCount = ?, last_time_fetched = ?,
+                        video_id = ?
+                    WHERE id = ?""",
+                    row[1:] + row[:1],
+                )
+
+    def upsert(self, number_of_comments: int, sample: int, page_size: int) -> dict:
+        """Compare the per-row write path with the batched UPSERT write path.
+
+        Half of every sample refreshes known comments, the other half are new.
+        Afterwards the sample of the UPSERT is written once more unchanged, which
+        the write-skip turns into reads only.
+
+        Args:
+            number_of_comments (int): The size of the synthetic database.
+            sample (int): The number of comments written by each write path.
+            page_size (int): The number of comments per page.
+
+        Returns:
+            dict: The rows per second of both write paths and of the unchanged
+                refresh, and the rows written by the unchanged refresh.
+        """
+        self.fill_comments(number_of_comments)
+        writer = Writer(self.__cursor)
+        results = {}
+        for name, offset in (('before', 0), ('after', sample)):
+            numbers = list(range(offset, offset + sample // 2))
+            numbers += list(range(
+                number_of_comments + offset, number_of_comments + offset + sample // 2
+            ))
+            comments = [self.make_comment(i, 'video') for i in numbers]
+
+            start = time.perf_counter()
+            for i in range(0, len(comments), page_size):
+                page = comments[i:i + page_size]
+                if name == 'before':
+                    self.write_legacy(page)
+                else:
+                    writer.upsert_comments(page)
+            self.__connection.commit()
+            results[name] = len(comments) / (time.perf_counter() - start)
+
+        written = 0
+        start = time.perf_counter()
+        for i in range(0, len(comments), page_size):
+            written += writer.upsert_comments(comments[i:i + page_size])
+        self.__connection.commit()
+        results['unchanged'] = len(comments) / (time.perf_counter() - start)
+        results['unchanged_written'] = written
+        return results
+
+    def make_comment_thread(self, number: int, full: bool) -> dict:
+        """Create a synthetic comment thread shaped like a commentThreads page item.
+
+        Args:
+            number (int): The number used for the comment ID.
+            full (bool): True for the full response, False for the response
+                limited by App.fields.
+
+        Returns:
+            dict: The synthetic comment thread.
+        """
+        comment = self.make_comment(number, 'video')
+        reply = self.make_comment(number + 1, 'video')
+        reply['snippet']['parentId'] = comment['id']
+        thread = {
+            'kind': 'youtube#commentThread',
+            'snippet': {
+                'videoId': 'video',
+                'topLevelComment': comment,
+                'totalReplyCount': 1,
+            },
+            'replies': {'comments': [reply]},
+        }
+        if not full:
+            return thread
+
+        thread['etag'] = 'Xq3J0bQk1q6pZ9nV0a2ZJ4m9v1E'
+        thread['id'] = comment['id']
+        thread['snippet'].update(
+            {'channelId': 'channel', 'canReply': True, 'isPublic': True}
+        )
+        for item in (comment, reply):
+            item['etag'] = 'b1uD0gXz8sZ7v2kQ3c9fJ5t1a0M'
+            item['snippet'].update({
+                'channelId': 'channel',
+                'textDisplay': item['snippet']['textOriginal'].replace(' ', '&nbsp;'),
+                'authorProfileImageUrl': 'https://yt3.ggpht.com/ytc/' + 'A' * 80 + '=s48-c-k-c0x00ffffff-no-rj',
+                'authorChannelUrl': 'http://www.youtube.com/channel/' + item['snippet']['authorChannelId']['value'],
+                'canRate': True,
+                'viewerRating': 'none',
+            })
+        return thread
+
+    def decode(self, number_of_pages: int, page_size: int) -> dict:
+        """Compare the bytes and the decode time of full and partial pages.
+
+        Args:
+            number_of_pages (int): The number of pages decoded per variant.
+            page_size (int): The number of comment threads per page.
+
+        Returns:
+            dict: The bytes and milliseconds per page by response and decoder.
+        """
+        decoders = {'json': json.loads}
+        if orjson is not None:
+            decoders['orjson'] = FastJsonModel().decode
+
+        results = {}
+        for name, full in (('full', True), ('fields', False)):
+            page = {
+                'kind': 'youtube#commentThreadListResponse',
+                'nextPageToken': 'Z2V0X25ld2VzdF9maXJzdC0tQ2dnSWdBUVZGN2ZST1JJRkNJZ2dHQUFTQlFpSUlCZ0FHQUE',
+                'items': [
+                    self.make_comment_thread(i * 2, full) for i in range(page_size)
+                ],
+            }
+            if not full:
+                del page['kind']
+            content = json.dumps(page).encode('utf-8')
+            for decoder, loads in decoders.items():
+                start = time.process_time()
+                for _ in range(number_of_pages):
+                    loads(content)
+                results[(name, decoder)] = (
+                    len(content),
+                    (time.process_time() - start) / number_of_pages * 1000,
+                )
+        return results
+
+    def start_server(self, body: bytes) -> ThreadingHTTPServer:
+        """Start a local HTTP server that answers every GET request with the same page.
+
+        Args:
+            body (bytes): The JSON page.
+
+        Returns:
+            ThreadingHTTPServer: The running server, shut it down after use.
+        """
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def client(self, number_of_requests: int) -> dict:
+        """Compare googleapiclient.discovery with the pooled client on a local server.
+
+        The cold start is measured in a new interpreter, from the first import
+        until the client is built.
+
+        Args:
+            number_of_requests (int): The number of commentThreads requests per client.
+
+        Returns:
+            dict: The seconds of the cold start and the requests per second by client.
+        """
+        cold_starts = {
+            'discovery': (
+                'import googleapiclient.discovery\n'
+                'from app.model import FastJsonModel\n'
+                'googleapiclient.discovery.build('
+                '"youtube", "v3", developerKey="key", model=FastJsonModel())'
+            ),
+            'pooled': (
+                'from app.client import PooledClient\n'
+                'from app.model import FastJsonModel\n'
+                'PooledClient("key", FastJsonModel())'
+            ),
+        }
+        page = {
+            'nextPageToken': 'token',
+            'items': [self.make_comment_thread(i * 2, False) for i in range(20)],
+        }
+        server = self.start_server(json.dumps(page).encode('utf-8'))
+        url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+        import googleapiclient.discovery
+        from app.client import PooledClient
+
+        clients = {
+            'discovery': googleapiclient.discovery.build(
+                'youtube', 'v3', developerKey='key', model=FastJsonModel(),
+                client_options={'api_endpoint': url},
+            ),
+            'pooled': PooledClient('key', FastJsonModel(), url + 'youtube/v3/'),
+        }
+
+        results = {}
+        for name, client in clients.items():
+            code = f'import time\nstart = time.perf_counter()\n{cold_starts[name]}\nprint(time.perf_counter() - start)'
+            result = subprocess.run(
+                [sys.executable, '-c', code], capture_output=True, text=True, check=True
+            )
+            cold_start = float(result.stdout)
+
+            start = time.perf_counter()
+            for _ in range(number_of_requests):
+                client.commentThreads().list(
+                    part='snippet,replies', videoId='video', pageToken='token'
+                ).execute()
+            results[name] = (cold_start, number_of_requests / (time.perf_counter() - start))
+        server.shutdown()
+        return results
+
+    def storage(self, number_of_comments: int, page_size: int, config_path: str) -> dict:
+        """Compare the default SQLite settings with the STORAGE section of a config file.
+
+        Both write the same comments page by page into a new database, the
+        default commits every page, the profile uses its group commits.
+
+        Args:
+            number_of_comments (int): The number of comments to insert.
+            page_size (int): The number of comments per page.
+            config_path (str): The config file with the STORAGE section.
+
+        Returns:
+            dict: The rows per second and the number of commits by profile.
+        """
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        profiles = {
+            'default': StorageProfile(configparser.ConfigParser()),
+            'profile': StorageProfile(config),
+        }
+        ddl = open('app/ddl.sql', 'r', encoding='utf-8')
+        ddl_script = ddl.read()
+        ddl.close()
+
+        results = {}
+        for name, profile in profiles.items():
+            connection = profile.connect(
+                os.path.join(self.__directory.name, f'storage-{name}.db')
+            )
+            connection.executescript(ddl_script)
+            cursor = connection.cursor()
+            writer = Writer(cursor)
+            commits = 0
+            last_commit = time.monotonic()
+            changes_at_commit = 0
+
+            start = time.perf_counter()
+            for i in range(0, number_of_comments, page_size):
+                writer.upsert_comments([
+                    self.make_comment(j, f'video{j // 1_000}')
+                    for j in range(i, min(i + page_size, number_of_comments))
+                ])
+                changed_rows = connection.total_changes - changes_at_commit
+                if profile.is_commit_due(last_commit, changed_rows):
+                    connection.commit()
+                    commits += 1
+                    last_commit = time.monotonic()
+                    changes_at_commit = connection.total_changes
+            connection.commit()
+            results[name] = (
+                number_of_comments / (time.perf_counter() - start),
+                commits + 1,
+                profile.get_pragmas(),
+            )
+            cursor.close()
+            connection.close()
+        return results
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks on synthetic data')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    upsert_parser = subparsers.add_parser(
+        'upsert', help='per-row writes vs. batched UPSERT into yt_comment'
+    )
+    upsert_parser.add_argument('--comments', type=int, default=1_000_000)
+    upsert_parser.add_argument('--sample', type=int, default=100_000)
+    upsert_parser.add_argument('--page-size', type=int, default=100)
+
+    schedule_parser = subparsers.add_parser(
+        'schedule', help='strftime scans vs. Scheduler.get_due_videos in get_videos'
+    )
+    schedule_parser.add_argument('--videos', type=int, default=10_000_000)
+    schedule_parser.add_argument('--repeat', type=int, default=3)
+
+    decode_parser = subparsers.add_parser(
+        'decode', help='full vs. partial commentThreads pages, json vs. orjson'
+    )
+    decode_parser.add_argument('--pages', type=int, default=1_000)
+    decode_parser.add_argument('--page-size', type=int, default=100)
+
+    client_parser = subparsers.add_parser(
+        'client', help='googleapiclient.discovery vs. pooled client on a local server'
+    )
+    client_parser.add_argument('--requests', type=int, default=2_000)
+
+    storage_parser = subparsers.add_parser(
+        'storage', help='default SQLite settings vs. the STORAGE section of a config'
+    )
+    storage_parser.add_argument('--comments', type=int, default=500_000)
+    storage_parser.add_argument('--page-size', type=int, default=100)
+    storage_parser.add_argument('--config', default='template/template-config.ini')
+
+    args = parser.parse_args()
+    benchmark = Benchmark()
+    print(f'{datetime.now()} benchmark {args.benchmark} started')
+    if args.benchmark == 'upsert':
+        result = benchmark.upsert(args.comments, args.sample, args.page_size)
+        print(f'before: {result["before"]:>12,.0f} rows/s')
+        print(f'after:  {result["after"]:>12,.0f} rows/s')
+        print(f'unchanged refresh: {result["unchanged"]:>12,.0f} rows/s  {result["unchanged_written"]:,} rows written')
+    elif args.benchmark == 'schedule':
+        result = benchmark.schedule(args.videos, args.repeat)
+        print(f'before: {result["before"]:>9.3f} s/query  {result["before_videos"]:>10,} videos due  {result["before_plan"]}')
+        print(f'after:  {result["after"]:>9.3f} s/query  {result["after_videos"]:>10,} videos due  {result["after_plan"]}')
+    elif args.benchmark == 'decode':
+        result = benchmark.decode(args.pages, args.page_size)
+        for (response, decoder), (size, parse_time) in result.items():
+            print(f'{response:<7}{decoder:<7}{size:>10,} bytes/page  {parse_time:>8.3f} ms CPU/page')
+    elif args.benchmark == 'client':
+        result = benchmark.client(args.requests)
+        for name, (cold_start, requests_per_second) in result.items():
+            print(f'{name:<10}{cold_start:>8.3f} s cold start  {requests_per_second:>8,.0f} requests/s')
+    elif args.benchmark == 'storage':
+        result = benchmark.storage(args.comments, args.page_size, args.config)
+        for name, (rows_per_second, commits, pragmas) in result.items():
+            print(f'{name:<8}{rows_per_second:>10,.0f} rows/s  {commits:>6,} commits  {"; ".join(pragmas)}')
+    benchmark.close()
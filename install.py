@@ -1,6 +1,7 @@
 from configparser import ConfigParser
 import os
 import sqlite3
+from app.storage import StorageProfile
 
 class Install:
     """This class represents the installation process for the YouTube Comments Scraper.
@@ -23,7 +24,7 @@ class Install:
         """Connects to the database.
 
         This method establishes a connection to the SQLite database using the database path
-        specified in the configuration file.
+        specified in the configuration file, with the settings of the STORAGE section.
 
         Raises:
             sqlite3.OperationalError: If the connection to the database fails.
@@ -33,7 +34,7 @@ class Install:
             + self.__config["APP"]["DATABASE_FILE"]
         )
         try:
-            self.__connection = sqlite3.connect(db_path)
+            self.__connection = StorageProfile(self.__config).connect(db_path)
             self.__cursor = self.__connection.cursor()
         except sqlite3.OperationalError:
             print("Connection to database: failed")
@@ -0,0 +1,58 @@
+import argparse
+import time
+from app import app
+from configparser import ConfigParser
+
+
+
+class LoadSeeds:
+    """A class representing the bulk import of large seed lists.
+
+    This class imports channel or video csv files into the database of the
+    configuration and reports the rows per second and the rejected lines.
+
+    Attributes:
+        __config (ConfigParser): The configuration parser object.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize the LoadSeeds class.
+
+        Reads the configuration file.
+
+        """
+        self.__config = ConfigParser()
+        self.__config.read('config.ini')
+
+    def run(self, kind: str, paths: list[str]) -> None:
+        """Run the import.
+
+        Calls the import_seeds method of the app module.
+
+        Args:
+            kind (str): Either channel or video.
+            paths (list[str]): The paths of the csv files.
+
+        """
+        start = time.perf_counter()
+        counts = app.App(self.__config).import_seeds(kind, paths)
+        duration = time.perf_counter() - start
+        print(f'rows read:     {counts["read"]:>12,}')
+        print(f'rows rejected: {counts["rejected"]:>12,}')
+        print(f'rows merged:   {counts["merged"]:>12,}')
+        print(f'rows/s:        {counts["read"] / max(duration, 1e-9):>12,.0f}')
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Bulk import of channel or video csv files with a header line'
+    )
+    parser.add_argument('kind', choices=['channel', 'video'])
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+    print(f'Seed import is running')
+    LoadSeeds().run(args.kind, args.paths)
+    print(f'\nSeed import has stopped working')
@@ -0,0 +1,567 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from app.archive import Archive
+
+
+
+class MockYouTube:
+    """A class representing a local stand-in for the YouTube Data API.
+
+    It answers the list requests of the endpoints used by the App with
+    pagination, ETags and a quota per API key, so App.main can be measured
+    end to end without network access and without spending real quota.
+
+    The pages are either synthetic, generated on demand from the configured
+    sizes (channels x videos x comment threads x replies), or replayed from an
+    archive recorded with the ARCHIVE section of the App. The fields parameter
+    is ignored, synthetic items only hold the values the App stores.
+
+    Attributes:
+        endpoints (list[str]): The endpoints answered by the server.
+        published (datetime): The time the newest synthetic video was published.
+        __channels (int): The number of synthetic channels.
+        __videos (int): The number of videos per channel.
+        __comments (int): The number of comment threads per video.
+        __replies (int): The number of replies per comment thread.
+        __quota (int): The units per API key, -1 for no limit.
+        __latency (float): The seconds every response is delayed.
+        __pages (dict[str, dict] | None): The recorded responses by page key, or
+            None for synthetic pages.
+        __spent (Counter): The spent units by API key.
+        __statistics (Counter): The number of responses by endpoint and status.
+        __lock (threading.Lock): The lock guarding the counters.
+    """
+
+    endpoints = [
+        'activities',
+        'channels',
+        'commentThreads',
+        'comments',
+        'playlistItems',
+        'videos',
+    ]
+    published = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+
+    def __init__(
+        self,
+        channels: int = 10,
+        videos: int = 20,
+        comments: int = 500,
+        replies: int = 2,
+        quota: int = -1,
+        latency: float = 0.0,
+        replay_path: str | None = None,
+    ) -> None:
+        """Initializes the MockYouTube object.
+
+        Args:
+            channels (int): The number of synthetic channels.
+            videos (int): The number of videos per channel.
+            comments (int): The number of comment threads per video.
+            replies (int): The number of replies per comment thread.
+            quota (int): The units per API key, -1 for no limit.
+            latency (float): The seconds every response is delayed.
+            replay_path (str | None): The directory of a recorded archive to
+                replay instead of synthetic pages.
+        """
+        self.__channels = channels
+        self.__videos = videos
+        self.__comments = comments
+        self.__replies = replies
+        self.__quota = quota
+        self.__latency = latency
+        self.__pages = None
+        if replay_path is not None:
+            self.__pages = {}
+            for record in Archive(replay_path, enabled=False).read():
+                key = self.get_page_key(record['endpoint'], record['params'])
+                self.__pages[key] = record['response']
+        self.__spent = Counter()
+        self.__statistics = Counter()
+        self.__lock = threading.Lock()
+
+    def get_page_key(self, endpoint: str, params: dict) -> str:
+        """Returns the key of a page, independent of the client that requested it.
+
+        Args:
+            endpoint (str): The endpoint, e.g. commentThreads.
+            params (dict): The query parameters.
+
+        Returns:
+            str: The endpoint and the sorted non-empty parameters, without the
+                API key and the response format.
+        """
+        params = {
+            key: str(value)
+            for key, value in params.items()
+            if key not in ('key', 'fields', 'alt', 'prettyPrint') and str(value) != ''
+        }
+        return endpoint + '?' + urlencode(sorted(params.items()))
+
+    def get_channel_ids(self) -> list[str]:
+        """Returns the IDs of the synthetic channels.
+
+        Returns:
+            list[str]: The channel IDs.
+        """
+        return [f'UCmock{channel:018d}' for channel in range(self.__channels)]
+
+    def get_channel_number(self, channel_id: str) -> int | None:
+        """Returns the number of a synthetic channel or of its uploads playlist.
+
+        Args:
+            channel_id (str): The ID of the channel or the uploads playlist.
+
+        Returns:
+            int | None: The number of the channel, or None if it does not exist.
+        """
+        try:
+            channel = int(channel_id[6:])
+        except ValueError:
+            return None
+        if channel_id[2:6] != 'mock' or not 0 <= channel < self.__channels:
+            return None
+        return channel
+
+    def get_video_number(self, video_id: str) -> tuple[int, int] | None:
+        """Returns the numbers of the channel and the video of a synthetic video.
+
+        Args:
+            video_id (str): The ID of the video.
+
+        Returns:
+            tuple[int, int] | None: The channel and the video number, or None if
+                the video does not exist.
+        """
+        try:
+            channel, video = int(video_id[1:6]), int(video_id[6:11])
+        except ValueError:
+            return None
+        if len(video_id) != 11 or not (
+            0 <= channel < self.__channels and 0 <= video < self.__videos
+        ):
+            return None
+        return channel, video
+
+    def get_timestamp(self, minutes: int) -> str:
+        """Returns a timestamp before the newest synthetic video.
+
+        Args:
+            minutes (int): The minutes before the newest video.
+
+        Returns:
+            str: The timestamp in the format of the YouTube API.
+        """
+        return (self.published - timedelta(minutes=minutes)).strftime(
+            '%Y-%m-%dT%H:%M:%SZ'
+        )
+
+    def make_channel(self, channel: int) -> dict:
+        """Create a synthetic channel.
+
+        Args:
+            channel (int): The number of the channel.
+
+        Returns:
+            dict: The channel shaped like a channels item.
+        """
+        channel_id = self.get_channel_ids()[channel]
+        return {
+            'kind': 'youtube#channel',
+            'id': channel_id,
+            'snippet': {'title': f'Channel {channel}', 'description': 'Mock channel'},
+            'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}},
+            'statistics': {
+                'subscriberCount': str(1000 * (channel + 1)),
+                'videoCount': str(self.__videos),
+                'viewCount': str(100_000 * (channel + 1)),
+            },
+        }
+
+    def make_video_snippet(self, channel: int, video: int) -> dict:
+        """Create the snippet of a synthetic video, the newest video first.
+
+        Args:
+            channel (int): The number of the channel.
+            video (int): The number of the video.
+
+        Returns:
+            dict: The snippet of the video.
+        """
+        return {
+            'publishedAt': self.get_timestamp(video * 24 * 60),
+            'channelId': self.get_channel_ids()[channel],
+            'title': f'Video {video} of channel {channel}',
+            'description': 'Mock video ' * 10,
+        }
+
+    def make_video(self, channel: int, video: int) -> dict:
+        """Create a synthetic video.
+
+        Args:
+            channel (int): The number of the channel.
+            video (int): The number of the video.
+
+        Returns:
+            dict: The video shaped like a videos item.
+        """
+        return {
+            'kind': 'youtube#video',
+            'id': f'v{channel:05d}{video:05d}',
+            'snippet': self.make_video_snippet(channel, video),
+            'statistics': {
+                'viewCount': str(10_000 + video),
+                'likeCount': str(100 + video),
+                'commentCount': str(self.__comments * (1 + self.__replies)),
+            },
+        }
+
+    def make_comment(self, comment_id: str, video_id: str, number: int) -> dict:
+        """Create a synthetic comment, the newest comment first.
+
+        Args:
+            comment_id (str): The ID of the comment.
+            video_id (str): The ID of the video.
+            number (int): The position of the comment, used for its timestamp.
+
+        Returns:
+            dict: The comment shaped like a comments item.
+        """
+        published_at = self.get_timestamp(number)
+        return {
+            'kind': 'youtube#comment',
+            'id': comment_id,
+            'snippet': {
+                'authorChannelId': {'value': f'UCauthor{number % 50_000:016d}'},
+                'authorDisplayName': f'Author {number % 50_000}',
+                'publishedAt': published_at,
+                'updatedAt': published_at,
+                'textOriginal': 'Lorem ipsum dolor sit amet ' * 4,
+                'likeCount': number % 97,
+                'videoId': video_id,
+            },
+        }
+
+    def make_reply(self, thread_id: str, video_id: str, reply: int) -> dict:
+        """Create a synthetic reply.
+
+        Args:
+            thread_id (str): The ID of the top level comment.
+            video_id (str): The ID of the video.
+            reply (int): The number of the reply.
+
+        Returns:
+            dict: The reply shaped like a comments item.
+        """
+        comment = self.make_comment(f'{thread_id}.r{reply:05d}', video_id, reply)
+        comment['snippet']['parentId'] = thread_id
+        return comment
+
+    def make_comment_thread(self, video_id: str, thread: int) -> dict:
+        """Create a synthetic comment thread with at most five of its replies.
+
+        Args:
+            video_id (str): The ID of the video.
+            thread (int): The number of the comment thread.
+
+        Returns:
+            dict: The comment thread shaped like a commentThreads item.
+        """
+        thread_id = f'{video_id}.t{thread:07d}'
+        item = {
+            'kind': 'youtube#commentThread',
+            'id': thread_id,
+            'snippet': {
+                'videoId': video_id,
+                'topLevelComment': self.make_comment(thread_id, video_id, thread),
+                'totalReplyCount': self.__replies,
+            },
+        }
+        if self.__replies > 0:
+            item['replies'] = {
+                'comments': [
+                    self.make_reply(thread_id, video_id, reply)
+                    for reply in range(min(self.__replies, 5))
+                ]
+            }
+        return item
+
+    def get_page(self, count: int, params: dict, default_size: int, max_size: int) -> range:
+        """Returns the positions of the requested page.
+
+        The page token is the position of the first item of the page.
+
+        Args:
+            count (int): The number of items of all pages.
+            params (dict): The query parameters with pageToken and maxResults.
+            default_size (int): The page size without maxResults.
+            max_size (int): The largest allowed page size.
+
+        Returns:
+            range: The positions of the items of the page.
+        """
+        start = int(params.get('pageToken') or 0)
+        size = min(int(params.get('maxResults') or default_size), max_size)
+        return range(start, min(start + size, count))
+
+    def make_response(self, items: list, page: range | None = None, count: int = 0) -> dict:
+        """Create a response with the token of the next page and an ETag.
+
+        Args:
+            items (list): The items of the page.
+            page (range | None): The positions of the page, or None without paging.
+            count (int): The number of items of all pages.
+
+        Returns:
+            dict: The response.
+        """
+        response = {'items': items}
+        if page is not None and page.stop < count:
+            response['nextPageToken'] = str(page.stop)
+        body = json.dumps(response, sort_keys=True).encode('utf-8')
+        response['etag'] = hashlib.sha1(body).hexdigest()[:27]
+        return response
+
+    def list_synthetic(self, endpoint: str, params: dict) -> dict | None:
+        """Answer a list request with synthetic items.
+
+        Args:
+            endpoint (str): The endpoint, e.g. commentThreads.
+            params (dict): The query parameters.
+
+        Returns:
+            dict | None: The response, or None if the parent resource does not exist.
+        """
+        if endpoint in ('channels', 'videos'):
+            items = []
+            for id in params.get('id', '').split(',')[:50]:
+                if endpoint == 'channels' and self.get_channel_number(id) is not None:
+                    items.append(self.make_channel(self.get_channel_number(id)))
+                elif endpoint == 'videos' and self.get_video_number(id) is not None:
+                    items.append(self.make_video(*self.get_video_number(id)))
+            return self.make_response(items)
+
+        if endpoint in ('activities', 'playlistItems'):
+            if endpoint == 'activities':
+                channel = self.get_channel_number(params.get('channelId', ''))
+            else:
+                channel = self.get_channel_number(params.get('playlistId', ''))
+            if channel is None:
+                return None
+            page = self.get_page(self.__videos, params, 5, 50)
+            items = []
+            for video in page:
+                video_id = f'v{channel:05d}{video:05d}'
+                snippet = self.make_video_snippet(channel, video)
+                if endpoint == 'activities':
+                    items.append({
+                        'kind': 'youtube#activity',
+                        'snippet': dict(snippet, type='upload'),
+                        'contentDetails': {'upload': {'videoId': video_id}},
+                    })
+                else:
+                    items.append({
+                        'kind': 'youtube#playlistItem',
+                        'snippet': snippet,
+                        'contentDetails': {
+                            'videoId': video_id,
+                            'videoPublishedAt': snippet['publishedAt'],
+                        },
+                    })
+            return self.make_response(items, page, self.__videos)
+
+        if endpoint == 'commentThreads':
+            video_id = params.get('videoId', '')
+            if self.get_video_number(video_id) is None:
+                return None
+            page = self.get_page(self.__comments, params, 20, 100)
+            items = [self.make_comment_thread(video_id, thread) for thread in page]
+            return self.make_response(items, page, self.__comments)
+
+        # comments
+        thread_id = params.get('parentId', '')
+        video_id = thread_id.split('.t')[0]
+        if self.get_video_number(video_id) is None:
+            return None
+        page = self.get_page(self.__replies, params, 20, 100)
+        items = [self.make_reply(thread_id, video_id, reply) for reply in page]
+        return self.make_response(items, page, self.__replies)
+
+    def make_error(self, status: int, reason: str, message: str) -> tuple[int, dict]:
+        """Create an error response of the YouTube API.
+
+        Args:
+            status (int): The HTTP status code.
+            reason (str): The reason of the error, e.g. quotaExceeded.
+            message (str): The message of the error.
+
+        Returns:
+            tuple[int, dict]: The status code and the response.
+        """
+        return status, {
+            'error': {
+                'code': status,
+                'message': message,
+                'errors': [{'reason': reason, 'message': message}],
+            }
+        }
+
+    def handle(self, endpoint: str, params: dict, etag: str | None) -> tuple[int, dict | None]:
+        """Answer a list request and count its quota units.
+
+        Args:
+            endpoint (str): The endpoint, e.g. commentThreads.
+            params (dict): The query parameters.
+            etag (str | None): The ETag of If-None-Match, or None.
+
+        Returns:
+            tuple[int, dict | None]: The status code and the response, None for
+                304 Not Modified.
+        """
+        api_key = params.get('key', '')
+        with self.__lock:
+            if 0 <= self.__quota <= self.__spent[api_key]:
+                status, response = self.make_error(
+                    403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.'
+                )
+            else:
+                self.__spent[api_key] += 1
+                status = 200
+
+        if status == 200:
+            if endpoint not in self.endpoints:
+                status, response = self.make_error(404, 'notFound', f'Unknown endpoint {endpoint}.')
+            elif self.__pages is not None:
+                response = self.__pages.get(self.get_page_key(endpoint, params))
+            else:
+                response = self.list_synthetic(endpoint, params)
+            if status == 200 and response is None:
+                status, response = self.make_error(404, 'notFound', 'The resource was not found.')
+            elif status == 200 and etag is not None and etag == response.get('etag'):
+                status, response = 304, None
+
+        if self.__latency > 0:
+            time.sleep(self.__latency)
+        with self.__lock:
+            self.__statistics[(endpoint, status)] += 1
+        return status, response
+
+    def get_statistics(self) -> list[str]:
+        """Returns the number of responses by endpoint and status, and the spent units.
+
+        Returns:
+            list[str]: The statistics for the console.
+        """
+        with self.__lock:
+            lines = [
+                f'{endpoint:<15}{status:>4}{count:>12,}'
+                for (endpoint, status), count in sorted(self.__statistics.items())
+            ]
+            lines.append(f'{sum(self.__spent.values()):,} units spent by {len(self.__spent)} keys')
+        return lines
+
+    def write_channels_file(self, path: str) -> None:
+        """Write the synthetic channels as a channels csv file of the App.
+
+        Args:
+            path (str): The path of the csv file.
+        """
+        directory = os.path.dirname(path)
+        if directory != '' and not os.path.exists(directory):
+            os.makedirs(directory)
+        file = open(path, 'w', encoding='utf-8')
+        file.write('channel_id,person,channelTitle,last_time_fetched,about\n')
+        for channel_id in self.get_channel_ids():
+            file.write(f'{channel_id},,,,\n')
+        file.close()
+
+    def start_server(self, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+        """Start the server in a background thread.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on, 0 for a free port.
+
+        Returns:
+            ThreadingHTTPServer: The running server, shut it down after use.
+        """
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+                status, response = mock.handle(
+                    endpoint, dict(parse_qsl(url.query)), self.headers.get('If-None-Match')
+                )
+                self.send_response(status)
+                if response is None:
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps(response).encode('utf-8')
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                if 'etag' in response:
+                    self.send_header('ETag', response['etag'])
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Local YouTube Data API for load tests, set API_URL of the YOUTUBE section to its URL'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--videos', type=int, default=20, help='videos per channel')
+    parser.add_argument('--comments', type=int, default=500, help='comment threads per video')
+    parser.add_argument('--replies', type=int, default=2, help='replies per comment thread')
+    parser.add_argument('--quota', type=int, default=-1, help='units per API key, -1 for no limit')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per response')
+    parser.add_argument('--replay', default=None, help='directory of a recorded archive')
+    parser.add_argument('--channels-file', default=None, help='write the synthetic channels to this csv file')
+
+    args = parser.parse_args()
+    mock = MockYouTube(
+        args.channels,
+        args.videos,
+        args.comments,
+        args.replies,
+        args.quota,
+        args.latency,
+        args.replay,
+    )
+    if args.channels_file is not None:
+        mock.write_channels_file(args.channels_file)
+    server = mock.start_server(args.host, args.port)
+    print(f'{datetime.now()} mock YouTube API on http://{args.host}:{server.server_address[1]}/')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+    for line in mock.get_statistics():
+        print(line)
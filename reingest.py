@@ -0,0 +1,40 @@
+from app import app
+from configparser import ConfigParser
+
+
+
+class Reingest:
+    """A class representing the offline re-ingest of the archived API responses.
+
+    This class rebuilds yt_video and yt_comment from the archive of the ARCHIVE
+    section without network access and without quota.
+
+    Attributes:
+        __config (ConfigParser): The configuration parser object.
+
+    """
+
+    def __init__(self) -> None:
+        """Initialize the Reingest class.
+
+        Reads the configuration file.
+
+        """
+        self.__config = ConfigParser()
+        self.__config.read('config.ini')
+
+    def run(self) -> None:
+        """Run the re-ingest.
+
+        Calls the reingest method of the app module.
+
+        """
+        app.App(self.__config).reingest()
+
+
+
+
+if __name__ == '__main__':
+    print(f'Reingest is running')
+    Reingest().run()
+    print(f'\nReingest has stopped working')
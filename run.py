@@ -1,12 +1,41 @@
+import argparse
+import json
+import multiprocessing
+import queue
+import socket
 from app import app
+from app.batch import merge_summaries
 from configparser import ConfigParser
 
 
+def run_worker(
+    sections: dict,
+    budgets: tuple | None = None,
+    summaries: 'multiprocessing.queues.Queue | None' = None,
+) -> None:
+    """Run the application in a worker process.
+
+    Args:
+        sections (dict): The sections of the configuration of the worker.
+        budgets (tuple | None): The time and quota budget of a batch run, or
+            None to run until interrupted.
+        summaries (multiprocessing.queues.Queue | None): The queue receiving the
+            summary of a batch run.
+
+    """
+    config = ConfigParser()
+    config.read_dict(sections)
+    if budgets is None:
+        app.App(config).main()
+        return
+    summaries.put(app.App(config).run_batch(*budgets))
+
 
 class App:
     """A class representing the main application.
 
-    This class initializes the application and runs it.
+    This class initializes the application and runs it, in one process or in
+    several processes sharing the database.
 
     Attributes:
         __config (ConfigParser): The configuration parser object.
@@ -22,19 +51,176 @@ class App:
         self.__config = ConfigParser()
         self.__config.read('config.ini')
 
-    def run(self) -> None:
+    def get_worker_configs(self, number_of_processes: int) -> list[dict]:
+        """Returns the configuration of every worker process.
+
+        Every worker gets its own WORKER_ID. The API keys are split among the
+        workers; if there are fewer keys than workers, the workers sharing a key
+        split its quota with KEY_SHARES. The workers commit every page instead
+        of group commits.
+
+        Args:
+            number_of_processes (int): The number of worker processes.
+
+        Raises:
+            ValueError: If API_SECRET holds no API key.
+
+        Returns:
+            list[dict]: The sections of the configuration by worker.
+
+        """
+        api_keys = []
+        for api_key in self.__config['YOUTUBE']['API_SECRET'].split(','):
+            if api_key.strip() != '':
+                api_keys.append(api_key.strip())
+        if len(api_keys) == 0:
+            raise ValueError('API_SECRET of the YOUTUBE section holds no API key')
+
+        configs = []
+        for worker in range(number_of_processes):
+            config = ConfigParser()
+            config.read_dict(self.__config)
+            if len(api_keys) >= number_of_processes:
+                worker_keys = api_keys[worker::number_of_processes]
+                key_shares = 1
+            else:
+                worker_keys = [api_keys[worker % len(api_keys)]]
+                key_shares = len(range(worker % len(api_keys), number_of_processes, len(api_keys)))
+            config['YOUTUBE']['API_SECRET'] = ','.join(worker_keys)
+            config['YOUTUBE']['KEY_SHARES'] = str(key_shares)
+            config['APP']['WORKER_ID'] = f'{socket.gethostname()}-{worker}'
+            # an open group commit holds the write lock of the database
+            # and blocks the other processes, so every page is committed
+            if not config.has_section('STORAGE'):
+                config.add_section('STORAGE')
+            config['STORAGE']['COMMIT_INTERVAL'] = '0'
+            configs.append(
+                {section: dict(config[section]) for section in config.sections()}
+            )
+        return configs
+
+    def run(self, number_of_processes: int | None = None) -> None:
         """Run the application.
 
-        Calls the main method of the app module.
+        Calls the main method of the app module, in one process or in
+        NUMBER_OF_PROCESSES worker processes.
+
+        Args:
+            number_of_processes (int | None): The number of worker processes, or
+                None for NUMBER_OF_PROCESSES of the configuration.
 
         """
-        app.App(self.__config).main()
-        
+        if number_of_processes is None:
+            number_of_processes = self.__config.getint('APP', 'NUMBER_OF_PROCESSES', fallback=1)
+        if number_of_processes <= 1:
+            app.App(self.__config).main()
+            return
+
+        processes = []
+        for sections in self.get_worker_configs(number_of_processes):
+            process = multiprocessing.Process(target=run_worker, args=(sections,))
+            process.start()
+            processes.append(process)
+        for process in processes:
+            try:
+                process.join()
+            except KeyboardInterrupt:
+                # the workers stop on their own interrupt
+                process.join()
+
+    def run_batch(
+        self,
+        time_budget: float | None,
+        quota_budget: int | None,
+        number_of_processes: int | None = None,
+    ) -> dict:
+        """Run the application once within a time and a quota budget.
+
+        The quota budget is split among the worker processes, the time budget
+        applies to every worker. The summaries of the workers are merged; the run
+        stopped by failed if a worker crashed without a summary.
+
+        Args:
+            time_budget (float | None): The seconds of the run, None for no limit.
+            quota_budget (int | None): The quota units of the run, None for no limit.
+            number_of_processes (int | None): The number of worker processes, or
+                None for NUMBER_OF_PROCESSES of the configuration.
+
+        Returns:
+            dict: The summary of the run.
+
+        """
+        if number_of_processes is None:
+            number_of_processes = self.__config.getint('APP', 'NUMBER_OF_PROCESSES', fallback=1)
+        if number_of_processes <= 1:
+            return app.App(self.__config).run_batch(time_budget, quota_budget)
+
+        summaries = multiprocessing.Queue()
+        processes = []
+        for worker, sections in enumerate(self.get_worker_configs(number_of_processes)):
+            worker_budget = None
+            if quota_budget is not None:
+                worker_budget = quota_budget // number_of_processes
+                if worker < quota_budget % number_of_processes:
+                    worker_budget += 1
+            process = multiprocessing.Process(
+                target=run_worker, args=(sections, (time_budget, worker_budget), summaries)
+            )
+            process.start()
+            processes.append(process)
+
+        results = []
+        while len(results) < number_of_processes:
+            try:
+                results.append(summaries.get(timeout=1))
+            except queue.Empty:
+                # a crashed worker sends no summary
+                if not any(process.is_alive() for process in processes) and summaries.empty():
+                    break
+            except KeyboardInterrupt:
+                # the workers stop on their own interrupt and send their summary
+                continue
+        for process in processes:
+            process.join()
+        summary = merge_summaries(results, time_budget, quota_budget)
+        if len(results) < number_of_processes:
+            summary['stopped_by'] = 'failed'
+        return summary
 
 
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='YouTube comments scraper')
+    parser.add_argument(
+        '--processes', type=int, default=None,
+        help='number of worker processes sharing the database (default: NUMBER_OF_PROCESSES)'
+    )
+    parser.add_argument(
+        '--once', action='store_true',
+        help='run once until nothing is due or a budget is used up, then print a JSON summary'
+    )
+    parser.add_argument('--time-budget', type=float, default=None, help='seconds of a run with --once')
+    parser.add_argument('--quota-budget', type=int, default=None, help='quota units of a run with --once')
+    parser.add_argument('--summary', default=None, help='file of the JSON summary (default: stdout)')
+    args = parser.parse_args()
     print(f'App is running')
-    App().run()
+    if not (args.once or args.time_budget is not None or args.quota_budget is not None):
+        App().run(args.processes)
+        print(f'\nApp has stopped working')
+        exit(0)
+
+    summary = App().run_batch(args.time_budget, args.quota_budget, args.processes)
     print(f'\nApp has stopped working')
+    # the summary is the last line of the output
+    if args.summary is None:
+        print(json.dumps(summary))
+    else:
+        with open(args.summary, 'w') as file:
+            json.dump(summary, file, indent=2)
+    # a crashed worker or an interrupt is visible without parsing the summary
+    if summary['stopped_by'] == 'failed':
+        exit(1)
+    if summary['stopped_by'] == 'interrupted':
+        exit(130)
+    exit(0)
@@ -0,0 +1,34 @@
+import os
+import socket
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.client import PooledClient  # noqa: E402
+from app.model import FastJsonModel  # noqa: E402
+
+
+class PooledClientTest(unittest.TestCase):
+    """A server that accepts the connection but never answers must not block forever."""
+
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(5)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_stalled_server_times_out(self):
+        url = f"http://127.0.0.1:{self.server.getsockname()[1]}/"
+        client = PooledClient("key", FastJsonModel(), url)
+        with mock.patch.object(PooledClient, "timeout", 0.2):
+            with self.assertRaises(socket.timeout):
+                client.commentThreads().list(videoId="video").execute()
+
+
+if __name__ == "__main__":
+    unittest.main()
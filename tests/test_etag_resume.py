@@ -0,0 +1,81 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: E402
+from mockserver import MockYouTube  # noqa: E402
+
+
+class EtagResumeTest(unittest.TestCase):
+    """An interrupted fetch must not leave ETags of pages that were never written."""
+
+    comments = 2000
+
+    def setUp(self):
+        self.mock = MockYouTube(channels=1, videos=3, comments=self.comments, replies=0)
+        self.server = self.mock.start_server()
+        self.directory = tempfile.mkdtemp()
+        for name in ["db", "channels", "videos"]:
+            os.makedirs(os.path.join(self.directory, name))
+        self.mock.write_channels_file(os.path.join(self.directory, "channels", "mock.csv"))
+
+        self.config = ConfigParser()
+        self.config.read(os.path.join(ROOT, "template", "template-config.ini"))
+        self.config["YOUTUBE"]["API_SECRET"] = "key"
+        self.config["YOUTUBE"]["NUMBER_OF_TOKENS"] = "-1"
+        self.config["YOUTUBE"]["CLIENT"] = "pooled"
+        self.config["YOUTUBE"]["API_URL"] = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.config["APP"]["DATABASE_PATH"] = os.path.join(self.directory, "db", "")
+        self.config["APP"]["NUMBER_OF_WORKERS"] = "3"
+        self.config["DATA"]["IMPORT_CHANNELS_PATH"] = os.path.join(self.directory, "channels", "")
+        self.config["DATA"]["IMPORT_VIDEOS_PATH"] = os.path.join(self.directory, "videos", "")
+        self.config["SETUP"]["DATABASE_DDL"] = os.path.join(ROOT, "app", "ddl.sql")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_interrupted_videos_are_complete_after_resume(self):
+        crawler = app.App(self.config)
+        writer = crawler._App__writer
+        upsert_comment_threads = writer.upsert_comment_threads
+        written_pages = []
+
+        def interrupt_after_some_pages(threads):
+            # the workers have fetched further pages into the queue by now
+            if len(written_pages) == 5:
+                raise KeyboardInterrupt()
+            written_pages.append(threads)
+            return upsert_comment_threads(threads)
+
+        writer.upsert_comment_threads = interrupt_after_some_pages
+        with self.assertRaises(SystemExit):
+            crawler.main()
+
+        summary = app.App(self.config).run_batch()
+        self.assertEqual(summary["stopped_by"], "done")
+
+        connection = sqlite3.connect(self.config["APP"]["DATABASE_PATH"] + "database.db")
+        counts = connection.execute(
+            """SELECT video_id, COUNT(*)
+                FROM yt_comment
+                WHERE parentId IS NULL OR parentId = ''
+                GROUP BY video_id
+            """
+        ).fetchall()
+        connection.close()
+        self.assertEqual(len(counts), 3)
+        for video_id, count in counts:
+            self.assertEqual(count, self.comments, video_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import run  # noqa: E402
+from app.lease import LeaseTable  # noqa: E402
+
+
+class LeaseTableTest(unittest.TestCase):
+    """Two processes share a database through the leases in yt_lease."""
+
+    now = 1_700_000_000
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "database.db")
+        self.connections = [sqlite3.connect(path), sqlite3.connect(path)]
+        ddl = open(os.path.join(ROOT, "app", "ddl.sql"), "r", encoding="utf-8")
+        self.connections[0].executescript(ddl.read())
+        ddl.close()
+        self.a = LeaseTable(self.connections[0].cursor(), "a", 300)
+        self.b = LeaseTable(self.connections[1].cursor(), "b", 300)
+        self.time = mock.patch("time.time", return_value=self.now)
+        self.time.start()
+
+    def tearDown(self):
+        self.time.stop()
+        for connection in self.connections:
+            connection.close()
+        shutil.rmtree(self.directory)
+
+    def claim(
+        self, leases: LeaseTable, worker: int, kind: str, ids: list[str]
+    ) -> list[str]:
+        claimed = leases.claim(kind, ids)
+        self.connections[worker].commit()
+        return claimed
+
+    def test_claimed_items_are_not_claimed_by_another_worker(self):
+        self.assertEqual(self.claim(self.a, 0, "video", ["v1", "v2"]), ["v1", "v2"])
+        self.assertEqual(self.claim(self.b, 1, "video", ["v1", "v2", "v3"]), ["v3"])
+        self.assertEqual(self.b.get_leased("video"), {"v1", "v2"})
+        self.assertEqual(self.a.get_leased("video"), {"v3"})
+        self.assertEqual(self.a.get_leased("channel"), set())
+        self.assertTrue(self.a.is_held_by_others())
+
+    def test_same_worker_claims_its_leases_again(self):
+        self.claim(self.a, 0, "video", ["v1"])
+        # e.g. the process restarted with the same worker ID
+        restarted = LeaseTable(self.connections[0].cursor(), "a", 300)
+        self.assertEqual(self.claim(restarted, 0, "video", ["v1", "v2"]), ["v1", "v2"])
+
+    def test_expired_lease_is_claimed_by_another_worker(self):
+        self.claim(self.a, 0, "video", ["v1"])
+        self.time.stop()
+        self.time = mock.patch("time.time", return_value=self.now + 301)
+        self.time.start()
+        self.assertEqual(self.b.get_leased("video"), set())
+        self.assertEqual(self.claim(self.b, 1, "video", ["v1"]), ["v1"])
+        self.assertEqual(self.a.get_leased("video"), {"v1"})
+
+    def test_renewed_lease_does_not_expire(self):
+        self.claim(self.a, 0, "video", ["v1", "v2"])
+        self.time.stop()
+        self.time = mock.patch("time.time", return_value=self.now + 200)
+        self.time.start()
+        self.assertEqual(self.a.renew(), 2)
+        self.connections[0].commit()
+
+        self.time.stop()
+        self.time = mock.patch("time.time", return_value=self.now + 400)
+        self.time.start()
+        self.assertEqual(self.claim(self.b, 1, "video", ["v1", "v2"]), [])
+
+    def test_renewal_is_due_after_a_third_of_the_duration(self):
+        with mock.patch("time.monotonic", return_value=0.0):
+            leases = LeaseTable(self.connections[0].cursor(), "a", 300)
+        with mock.patch("time.monotonic", return_value=99.0):
+            self.assertFalse(leases.is_renewal_due())
+        with mock.patch("time.monotonic", return_value=100.0):
+            self.assertTrue(leases.is_renewal_due())
+
+    def test_release_all_frees_the_leases_of_the_worker_only(self):
+        self.claim(self.a, 0, "video", ["v1"])
+        self.claim(self.a, 0, "channel", ["c1"])
+        self.claim(self.b, 1, "video", ["v2"])
+        self.a.release_all()
+        self.connections[0].commit()
+        self.assertEqual(self.b.get_leased("video"), set())
+        self.assertEqual(self.b.get_leased("channel"), set())
+        self.assertEqual(self.a.get_leased("video"), {"v2"})
+        self.assertFalse(self.b.is_held_by_others())
+
+    def test_release_frees_one_lease(self):
+        self.claim(self.a, 0, "video", ["v1", "v2"])
+        self.a.release("video", "v1")
+        self.connections[0].commit()
+        self.assertEqual(self.claim(self.b, 1, "video", ["v1", "v2"]), ["v1"])
+
+    def test_disabled_without_worker_id(self):
+        leases = LeaseTable(self.connections[0].cursor(), "")
+        self.claim(self.a, 0, "video", ["v1"])
+        self.assertFalse(leases.is_enabled())
+        self.assertEqual(leases.claim("video", ["v1"]), ["v1"])
+        self.assertEqual(leases.get_leased("video"), set())
+
+
+class WorkerConfigTest(unittest.TestCase):
+    """The worker processes split the API keys of the configuration."""
+
+    def get_worker_configs(
+        self, api_secret: str, number_of_processes: int
+    ) -> list[ConfigParser]:
+        config = ConfigParser()
+        config.read(os.path.join(ROOT, "template", "template-config.ini"))
+        config["YOUTUBE"]["API_SECRET"] = api_secret
+        application = run.App()
+        application._App__config = config
+        configs = []
+        # like run_worker
+        for sections in application.get_worker_configs(number_of_processes):
+            config = ConfigParser()
+            config.read_dict(sections)
+            configs.append(config)
+        return configs
+
+    def test_workers_sharing_a_key_split_its_quota(self):
+        configs = self.get_worker_configs("k1,k2", 3)
+        self.assertEqual(
+            [config["YOUTUBE"]["API_SECRET"] for config in configs], ["k1", "k2", "k1"]
+        )
+        self.assertEqual(
+            [config["YOUTUBE"]["KEY_SHARES"] for config in configs], ["2", "1", "2"]
+        )
+        self.assertEqual(len({config["APP"]["WORKER_ID"] for config in configs}), 3)
+
+    def test_no_api_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.get_worker_configs(" , ", 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
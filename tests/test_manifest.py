@@ -0,0 +1,66 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.manifest import ImportManifest  # noqa: E402
+
+
+class ImportManifestTest(unittest.TestCase):
+    """Only the new complete lines of a csv file are read."""
+
+    header = "id,title,publishedAt,last_time_fetched,description,channel_id\n"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "videos.csv")
+        self.connection = sqlite3.connect(":memory:")
+        ddl = open(os.path.join(ROOT, "app", "ddl.sql"), "r", encoding="utf-8")
+        self.connection.executescript(ddl.read())
+        ddl.close()
+        self.manifest = ImportManifest(self.connection.cursor())
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, content: str, mode: str = "w") -> None:
+        file = open(self.path, mode, encoding="utf-8", newline="")
+        file.write(content)
+        file.close()
+
+    def test_unchanged_file_is_skipped(self):
+        self.write(self.header + "v1,a,,,,c\n")
+        self.assertEqual(self.manifest.read(self.path), ["v1,a,,,,c\n"])
+        self.assertIsNone(self.manifest.read(self.path))
+
+    def test_appended_lines_are_read_from_the_offset(self):
+        self.write(self.header + "v1,a,,,,c\n")
+        self.manifest.read(self.path)
+        self.write('v2,"b, with ""quotes""\nand a line break",,,,c\n', "a")
+        self.assertEqual(
+            self.manifest.read(self.path),
+            ['v2,"b, with ""quotes""\n', 'and a line break",,,,c\n'],
+        )
+
+    def test_incomplete_last_line_is_read_once_complete(self):
+        self.write(self.header + "v1,a,,,,c\nv2,b")
+        self.assertEqual(self.manifest.read(self.path), ["v1,a,,,,c\n"])
+        self.write(",,,,c\n", "a")
+        self.assertEqual(self.manifest.read(self.path), ["v2,b,,,,c\n"])
+
+    def test_rewritten_file_is_read_again_from_the_start(self):
+        self.write(self.header + "v1,a,,,,c\n")
+        self.manifest.read(self.path)
+        # the file grew, but its content up to the offset changed
+        self.write(self.header + "v9,z,,,,c\nv3,c,,,,c\n")
+        self.assertEqual(self.manifest.read(self.path), ["v9,z,,,,c\n", "v3,c,,,,c\n"])
+
+
+if __name__ == "__main__":
+    unittest.main()
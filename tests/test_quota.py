@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import sys
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import quota  # noqa: E402
+from app.quota import KeyPool, QuotaExhausted, QuotaLedger  # noqa: E402
+
+
+class KeyPoolTest(unittest.TestCase):
+    """Every request takes its units from the key with the most units left."""
+
+    day = date(2024, 3, 1)
+
+    def setUp(self):
+        self.quota_day = mock.patch.object(
+            KeyPool, "get_quota_day", return_value=self.day
+        )
+        self.quota_day.start()
+
+    def tearDown(self):
+        self.quota_day.stop()
+
+    def next_day(self) -> None:
+        self.quota_day.stop()
+        self.quota_day = mock.patch.object(
+            KeyPool, "get_quota_day", return_value=date(2024, 3, 2)
+        )
+        self.quota_day.start()
+
+    def test_key_with_most_units_left_is_taken(self):
+        pool = KeyPool(["a", "b"], 3)
+        pool.spend({"a": 1})
+        self.assertEqual([pool.take() for _ in range(5)], ["b", "a", "b", "a", "b"])
+        self.assertEqual(pool.get_left(), 0)
+        with self.assertRaises(QuotaExhausted):
+            pool.take()
+
+    def test_dropped_key_is_skipped_until_reset(self):
+        pool = KeyPool(["a", "b"], 10)
+        pool.drop("a")
+        self.assertEqual([pool.take() for _ in range(3)], ["b", "b", "b"])
+        self.assertEqual(pool.get_left(), 7)
+
+        self.next_day()
+        self.assertEqual(pool.take(), "a")
+        self.assertEqual(pool.get_left(), 19)
+
+    def test_exhausted_pool_is_reset_at_the_next_quota_day(self):
+        pool = KeyPool(["a"], 1)
+        pool.take()
+        with self.assertRaises(QuotaExhausted):
+            pool.take()
+        self.next_day()
+        self.assertEqual(pool.take(), "a")
+
+    def test_cost_of_the_endpoint_is_taken(self):
+        pool = KeyPool(["a"], 150)
+        pool.take("search")
+        self.assertEqual(pool.get_left(), 50)
+        with self.assertRaises(QuotaExhausted):
+            pool.take("search")
+        self.assertEqual(pool.take("videos"), "a")
+        self.assertEqual(pool.get_requests(), {"search": 1, "videos": 1})
+
+    def test_budget_of_the_run_limits_all_keys(self):
+        pool = KeyPool(["a", "b"], 10)
+        pool.limit(3)
+        self.assertEqual(pool.get_left(), 3)
+        for _ in range(3):
+            pool.take()
+        with self.assertRaises(QuotaExhausted):
+            pool.take()
+
+
+class QuotaDayTest(unittest.TestCase):
+    """The quota day of YouTube ends at midnight Pacific time."""
+
+    def get_quota_day(self, now: datetime) -> date:
+        class Now(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now.astimezone(tz)
+
+        with mock.patch.object(quota, "datetime", Now):
+            return KeyPool([], -1).get_quota_day()
+
+    def test_quota_day_is_the_date_in_pacific_time(self):
+        # 07:59 UTC is 23:59 of the day before in Pacific standard time
+        self.assertEqual(
+            self.get_quota_day(datetime(2024, 3, 1, 7, 59, tzinfo=timezone.utc)),
+            date(2024, 2, 29),
+        )
+        self.assertEqual(
+            self.get_quota_day(datetime(2024, 3, 1, 8, 0, tzinfo=timezone.utc)),
+            date(2024, 3, 1),
+        )
+
+
+class QuotaLedgerTest(unittest.TestCase):
+    """A restart on the same quota day continues with the units really left."""
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        ddl = open(os.path.join(ROOT, "app", "ddl.sql"), "r", encoding="utf-8")
+        self.connection.executescript(ddl.read())
+        ddl.close()
+        self.ledger = QuotaLedger(self.connection.cursor())
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_spent_units_are_subtracted_after_a_restart(self):
+        day = date(2024, 3, 1)
+        with mock.patch.object(KeyPool, "get_quota_day", return_value=day):
+            pool = KeyPool(["a", "b"], 10)
+            for _ in range(3):
+                pool.take("commentThreads")
+            pool.take("videos")
+            self.ledger.save(pool.pop_spent())
+            self.assertEqual(pool.pop_spent(), {})
+
+            restarted = KeyPool(["a", "b"], 10)
+            restarted.spend(self.ledger.get_spent(day, ["a", "b"]))
+            self.assertEqual(restarted.get_left(), 16)
+
+        self.assertEqual(
+            self.ledger.get_spent(date(2024, 3, 2), ["a", "b"]), {"a": 0, "b": 0}
+        )
+        key_hashes = self.connection.execute("SELECT key_hash FROM yt_quota").fetchall()
+        self.assertNotIn(("a",), key_hashes)
+
+
+if __name__ == "__main__":
+    unittest.main()
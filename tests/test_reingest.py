@@ -0,0 +1,68 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: E402
+from mockserver import MockYouTube  # noqa: E402
+
+
+class ReingestTest(unittest.TestCase):
+    """A re-ingest must repair stored rows even if the comments did not change."""
+
+    def setUp(self):
+        self.mock = MockYouTube(channels=1, videos=2, comments=50, replies=2)
+        self.server = self.mock.start_server()
+        self.directory = tempfile.mkdtemp()
+        for name in ["db", "channels", "videos"]:
+            os.makedirs(os.path.join(self.directory, name))
+        self.mock.write_channels_file(os.path.join(self.directory, "channels", "mock.csv"))
+
+        self.config = ConfigParser()
+        self.config.read(os.path.join(ROOT, "template", "template-config.ini"))
+        self.config["YOUTUBE"]["API_SECRET"] = "key"
+        self.config["YOUTUBE"]["NUMBER_OF_TOKENS"] = "-1"
+        self.config["YOUTUBE"]["CLIENT"] = "pooled"
+        self.config["YOUTUBE"]["API_URL"] = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.config["APP"]["DATABASE_PATH"] = os.path.join(self.directory, "db", "")
+        self.config["DATA"]["IMPORT_CHANNELS_PATH"] = os.path.join(self.directory, "channels", "")
+        self.config["DATA"]["IMPORT_VIDEOS_PATH"] = os.path.join(self.directory, "videos", "")
+        self.config["SETUP"]["DATABASE_DDL"] = os.path.join(ROOT, "app", "ddl.sql")
+        self.config["ARCHIVE"]["ENABLED"] = "yes"
+        self.config["ARCHIVE"]["PATH"] = os.path.join(self.directory, "db", "archive", "")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_reingest_rewrites_unchanged_comments(self):
+        summary = app.App(self.config).run_batch()
+        self.assertEqual(summary["stopped_by"], "done")
+
+        database = self.config["APP"]["DATABASE_PATH"] + "database.db"
+        connection = sqlite3.connect(database)
+        connection.execute("UPDATE yt_comment SET authorDisplayName = 'BROKEN'")
+        connection.commit()
+        number_of_comments = connection.execute("SELECT COUNT(*) FROM yt_comment").fetchone()[0]
+        connection.close()
+        self.assertEqual(number_of_comments, 2 * 50 * 3)
+
+        app.App(self.config).reingest()
+
+        connection = sqlite3.connect(database)
+        broken = connection.execute(
+            "SELECT COUNT(*) FROM yt_comment WHERE authorDisplayName = 'BROKEN'"
+        ).fetchone()[0]
+        connection.close()
+        self.assertEqual(broken, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: E402
+from mockserver import MockYouTube  # noqa: E402
+
+
+class HeldReplyMock(MockYouTube):
+    """Counts one reply more per thread than it returns, like a reply held for review."""
+
+    def make_comment_thread(self, video_id: str, thread: int) -> dict:
+        item = super().make_comment_thread(video_id, thread)
+        item["snippet"]["totalReplyCount"] += 1
+        return item
+
+
+class ReplyExpansionTest(unittest.TestCase):
+    """An expanded thread is only expanded again once it has more replies."""
+
+    def setUp(self):
+        self.mock = HeldReplyMock(channels=1, videos=1, comments=10, replies=7)
+        self.server = self.mock.start_server()
+        self.directory = tempfile.mkdtemp()
+        for name in ["db", "channels", "videos"]:
+            os.makedirs(os.path.join(self.directory, name))
+        self.mock.write_channels_file(os.path.join(self.directory, "channels", "mock.csv"))
+
+        self.config = ConfigParser()
+        self.config.read(os.path.join(ROOT, "template", "template-config.ini"))
+        self.config["YOUTUBE"]["API_SECRET"] = "key"
+        self.config["YOUTUBE"]["NUMBER_OF_TOKENS"] = "-1"
+        self.config["YOUTUBE"]["CLIENT"] = "pooled"
+        self.config["YOUTUBE"]["API_URL"] = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.config["APP"]["DATABASE_PATH"] = os.path.join(self.directory, "db", "")
+        self.config["DATA"]["IMPORT_CHANNELS_PATH"] = os.path.join(self.directory, "channels", "")
+        self.config["DATA"]["IMPORT_VIDEOS_PATH"] = os.path.join(self.directory, "videos", "")
+        self.config["SETUP"]["DATABASE_DDL"] = os.path.join(ROOT, "app", "ddl.sql")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_thread_with_held_replies_is_not_queued_again(self):
+        summary = app.App(self.config).run_batch()
+        self.assertEqual(summary["stopped_by"], "done")
+        self.assertEqual(summary["phases"]["replies"]["requests"], 10)
+
+        threads = [
+            self.mock.make_comment_thread("v0000000000", thread) for thread in range(10)
+        ]
+        crawler = app.App(self.config)
+        self.assertEqual(crawler.queue_incomplete_threads(threads), 0)
+
+        threads[0]["snippet"]["totalReplyCount"] += 1
+        self.assertEqual(crawler.queue_incomplete_threads(threads), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
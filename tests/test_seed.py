@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.seed import SeedLoader  # noqa: E402
+
+
+class SeedLoaderTest(unittest.TestCase):
+    """Channel and video csv files are parsed like RFC 4180 and merged in bulk."""
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        ddl = open(os.path.join(ROOT, "app", "ddl.sql"), "r", encoding="utf-8")
+        self.connection.executescript(ddl.read())
+        ddl.close()
+        self.cursor = self.connection.cursor()
+        self.seeds = SeedLoader(self.cursor, chunk_size=2)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_quoted_values_hold_commas_quotes_and_line_breaks(self):
+        lines = [
+            'v1,"a, b",2024-03-01T12:00:00,,"say ""hi""",c1\n',
+            'v2,title,2024-03-01T12:00:00,,"first line\n',
+            'second line",c1\n',
+        ]
+        counts = self.seeds.load("video", lines)
+        self.assertEqual(counts, {"read": 2, "rejected": 0, "merged": 2})
+        rows = self.cursor.execute(
+            "SELECT id, title, description, published_ts FROM yt_video ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                ("v1", "a, b", 'say "hi"', 1709294400),
+                ("v2", "title", "first line\nsecond line", 1709294400),
+            ],
+        )
+
+    def test_rows_with_wrong_columns_or_without_id_are_rejected(self):
+        lines = [
+            "v1,title,,,,c1\n",
+            "v2,too,few\n",
+            "v3,too,many,,,c1,x\n",
+            " ,no id,,,,c1\n",
+            "\n",
+        ]
+        counts = self.seeds.load("video", lines)
+        self.assertEqual(counts, {"read": 4, "rejected": 3, "merged": 1})
+
+    def test_known_videos_are_kept(self):
+        self.seeds.load("video", ["v1,old,,,,c1\n"])
+        counts = self.seeds.load("video", ["v1,new,,,,c1\n", "v2,new,,,,c1\n"])
+        self.assertEqual(counts["merged"], 1)
+        titles = self.cursor.execute("SELECT title FROM yt_video ORDER BY id").fetchall()
+        self.assertEqual(titles, [("old",), ("new",)])
+
+    def test_empty_channel_values_do_not_overwrite_known_values(self):
+        self.seeds.load("channel", ["c1,person,title,,about\n"])
+        self.cursor.execute(
+            "UPDATE yt_channel SET last_time_fetched = 'fetched' WHERE channel_id = 'c1'"
+        )
+        self.seeds.load("channel", ["c1,,new title,,\n"])
+        row = self.cursor.execute(
+            "SELECT person, channelTitle, last_time_fetched, about FROM yt_channel"
+        ).fetchone()
+        self.assertEqual(row, ("person", "new title", "fetched", "about"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from configparser import ConfigParser
+
+import googleapiclient.errors
+import httplib2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: E402
+from app.quota import QuotaExhausted  # noqa: E402
+
+
+def make_error(status: int, reason: str) -> googleapiclient.errors.HttpError:
+    content = f'{{"error": {{"errors": [{{"reason": "{reason}"}}]}}}}'.encode()
+    return googleapiclient.errors.HttpError(
+        httplib2.Response({"status": status}), content
+    )
+
+
+class SendRequestTest(unittest.TestCase):
+    """Only a key rejected with quotaExceeded is dropped from the rotation."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ["db", "channels", "videos"]:
+            os.makedirs(os.path.join(self.directory, name))
+        config = ConfigParser()
+        config.read(os.path.join(ROOT, "template", "template-config.ini"))
+        config["YOUTUBE"]["API_SECRET"] = "a,b"
+        config["YOUTUBE"]["NUMBER_OF_TOKENS"] = "10"
+        config["APP"]["DATABASE_PATH"] = os.path.join(self.directory, "db", "")
+        config["DATA"]["IMPORT_CHANNELS_PATH"] = os.path.join(self.directory, "channels", "")
+        config["DATA"]["IMPORT_VIDEOS_PATH"] = os.path.join(self.directory, "videos", "")
+        config["SETUP"]["DATABASE_DDL"] = os.path.join(ROOT, "app", "ddl.sql")
+        self.crawler = app.App(config)
+        self.api_keys = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_with_exceeded_quota_is_dropped(self):
+        def request(video_id: str, api_key: str) -> dict:
+            self.api_keys.append(api_key)
+            if api_key == "a":
+                raise make_error(403, "quotaExceeded")
+            return {"items": [video_id]}
+
+        response = self.crawler.send_request("commentThreads", request, "video")
+        self.assertEqual(response, {"items": ["video"]})
+        self.assertEqual(self.api_keys, ["a", "b"])
+        # a is dropped, b has 9 units left
+        response = self.crawler.send_request("videos", request, "video")
+        self.assertEqual(response, {"items": ["video"]})
+        self.assertEqual(self.api_keys[-1], "b")
+
+    def test_other_errors_are_raised_without_dropping_the_key(self):
+        def request(api_key: str) -> dict:
+            self.api_keys.append(api_key)
+            raise make_error(404, "notFound")
+
+        with self.assertRaises(googleapiclient.errors.HttpError):
+            self.crawler.send_request("commentThreads", request)
+        with self.assertRaises(googleapiclient.errors.HttpError):
+            self.crawler.send_request("commentThreads", request)
+        # the keys take turns, none was dropped
+        self.assertEqual(self.api_keys, ["a", "b"])
+
+    def test_exhausted_keys_raise(self):
+        def request(api_key: str) -> dict:
+            raise make_error(403, "quotaExceeded")
+
+        with self.assertRaises(QuotaExhausted):
+            self.crawler.send_request("commentThreads", request)
+
+
+if __name__ == "__main__":
+    unittest.main()
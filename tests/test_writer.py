@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.writer import Writer  # noqa: E402
+from mockserver import MockYouTube  # noqa: E402
+
+
+class WriterTest(unittest.TestCase):
+    """Comment threads are stored with the reply count of the thread."""
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        ddl = open(os.path.join(ROOT, "app", "ddl.sql"), "r", encoding="utf-8")
+        self.connection.executescript(ddl.read())
+        ddl.close()
+        self.cursor = self.connection.cursor()
+        self.writer = Writer(self.cursor)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def get_total_reply_counts(self) -> list[tuple]:
+        return self.cursor.execute(
+            """SELECT totalReplyCount, COUNT(*)
+                FROM yt_comment
+                WHERE parentId = ''
+                GROUP BY totalReplyCount
+            """
+        ).fetchall()
+
+    def test_thread_stores_total_reply_count_of_thread(self):
+        mock = MockYouTube(replies=7)
+        threads = [mock.make_comment_thread("video", thread) for thread in range(3)]
+        self.writer.upsert_comment_threads(threads)
+        self.assertEqual(self.get_total_reply_counts(), [(7, 3)])
+
+    def test_grown_total_reply_count_rewrites_thread(self):
+        mock = MockYouTube(replies=2)
+        threads = [mock.make_comment_thread("video", thread) for thread in range(3)]
+        self.writer.upsert_comment_threads(threads)
+        self.assertEqual(self.writer.upsert_comment_threads(threads), 0)
+
+        threads[0]["snippet"]["totalReplyCount"] = 3
+        self.assertEqual(self.writer.upsert_comment_threads(threads), 1)
+        self.assertEqual(self.get_total_reply_counts(), [(2, 2), (3, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()